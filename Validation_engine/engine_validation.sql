@@ -3,36 +3,20 @@
 -- =========================================================
 -- 1. CONSERVATION OF DEMAND (The Funnel Ceiling)
 CREATE OR REPLACE VIEW validation.violation_physics_demand_overflow AS
-WITH daily_traffic AS (
-    SELECT 
-        date_id, 
-        channel, 
-        SUM(clicks) as traffic_in
-    FROM validation.snap_fact_marketing
-    GROUP BY 1, 2
-),
-daily_conversions AS (
-    SELECT 
-        date_id, 
-        marketing_channel, 
-        COUNT(order_id) as conversions_out
-    FROM validation.snap_fact_financials
-    GROUP BY 1, 2
-)
 SELECT 
     t.date_id,
     t.channel,
-    t.traffic_in,
-    c.conversions_out,
-    (c.conversions_out::decimal / NULLIF(t.traffic_in, 0)) as conversion_rate
-FROM daily_traffic t
-JOIN daily_conversions c 
+    t.clicks as traffic_in,
+    c.conversions as conversions_out,
+    (c.conversions::decimal / NULLIF(t.clicks, 0)) as conversion_rate
+FROM validation.rollup_marketing_daily t
+JOIN validation.rollup_financials_daily c 
     ON t.date_id = c.date_id 
     AND t.channel = c.marketing_channel
 WHERE 
-    c.conversions_out > t.traffic_in 
+    c.conversions > t.clicks 
     OR 
-    (c.conversions_out::decimal / NULLIF(t.traffic_in, 0)) > 0.40; 
+    (c.conversions::decimal / NULLIF(t.clicks, 0)) > 0.40; 
 
 -- 2. CHANNEL SATURATION SANITY (Diminishing Returns)
 
@@ -45,7 +29,7 @@ WITH metrics AS (
         clicks,
         LAG(spend) OVER (PARTITION BY channel ORDER BY date_id) as prev_spend,
         LAG(clicks) OVER (PARTITION BY channel ORDER BY date_id) as prev_clicks
-    FROM validation.snap_fact_marketing
+    FROM validation.rollup_marketing_daily
     WHERE spend > 500 
 )
 SELECT 
@@ -57,30 +41,26 @@ WHERE
     spend > (prev_spend * 1.5) 
     AND 
     (clicks - prev_clicks) > (prev_clicks * 1.5) 
-    AND channel NOT IN ('Email'); 
+    AND channel NOT IN ('Email_Marketing'); 
 
 -- 3. CROSS-CHANNEL LEAKAGE (Share of Voice vs. Share of Attribution)
 CREATE OR REPLACE VIEW validation.violation_physics_attribution_skew AS
-WITH total_daily AS (
-    SELECT date_id, SUM(spend) as total_spend, SUM(clicks) as total_clicks FROM validation.snap_fact_marketing GROUP BY 1
-),
-channel_share AS (
+WITH channel_share AS (
     SELECT 
         m.date_id,
         m.channel,
-        (m.spend / NULLIF(t.total_spend, 1)) as share_of_spend,
-        (m.clicks / NULLIF(t.total_clicks, 1)) as share_of_clicks
-    FROM validation.snap_fact_marketing m
-    JOIN total_daily t ON m.date_id = t.date_id
+        (m.spend / NULLIF(t.spend, 1)) as share_of_spend,
+        (m.clicks / NULLIF(t.clicks, 1)) as share_of_clicks
+    FROM validation.rollup_marketing_daily m
+    JOIN validation.rollup_daily_totals t ON m.date_id = t.date_id
 ),
 attribution_share AS (
     SELECT 
         f.date_id,
         f.marketing_channel,
-        COUNT(*) / NULLIF(SUM(COUNT(*)) OVER (PARTITION BY f.date_id), 1)::decimal as share_of_orders
-    FROM validation.snap_fact_financials f
+        f.item_rows / NULLIF(SUM(f.item_rows) OVER (PARTITION BY f.date_id), 1)::decimal as share_of_orders
+    FROM validation.rollup_financials_daily f
     WHERE f.marketing_channel NOT IN ('Direct/Organic', 'Unknown')
-    GROUP BY 1, 2
 )
 SELECT 
     s.date_id,
@@ -100,11 +80,9 @@ WHERE
 CREATE OR REPLACE VIEW validation.violation_physics_rolling_mass_balance AS
 WITH daily_bal AS (
     SELECT 
-        COALESCE(m.date_id, f.date_id) as date_id,
-        (COALESCE(m.spend, 0) - COALESCE(f.cac, 0)) as daily_diff
-    FROM (SELECT date_id, SUM(spend) as spend FROM validation.snap_fact_marketing GROUP BY 1) m
-    FULL OUTER JOIN (SELECT date_id, SUM(acquisition_cost) as cac FROM validation.snap_fact_financials GROUP BY 1) f
-    ON m.date_id = f.date_id
+        date_id,
+        (COALESCE(spend, 0) - COALESCE(acquisition_cost, 0)) as daily_diff
+    FROM validation.rollup_daily_totals
 )
 SELECT 
     date_id,
@@ -0,0 +1,222 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import duckdb
+
+# ==========================================
+# SETUP PATHS
+# ==========================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+from validation_runner import SETUP_FILES, CHECKS, BLOCKING, split_statements, check_query, verdict, is_failure
+
+# ==========================================
+# LOCAL VALIDATION (NO DATABASE SERVICE)
+# ==========================================
+# Runs the validation suites against exported batch folders
+# (generator_app/Training_Output/<batch>/) with an in-process DuckDB engine that
+# reads the CSV / Parquet files directly. The snap_* views point at the files,
+# the rollup materialized views become plain tables, and the violation views and
+# judgment rows are the same SQL the Postgres runner uses.
+# One connection per batch, batches spread over a process pool.
+
+DEFAULT_ROOT = os.path.join(project_root, "generator_app", "Training_Output")
+REPORT_NAME = "validation_report.json"
+# Batches carry their data-quality chaos by design (duplicate_rows, 'Unknown' channel
+# labels, API outages): duplicated grain and orders without ad-stock are findings here
+BATCH_BLOCKING = tuple(v for v in BLOCKING if v not in ('violation_grain_duplication', 'violation_causal_impossible_orders'))
+SNAP_TABLES = {  # snap view -> exported table
+    'snap_fact_marketing': 'fact_marketing_daily',
+    'snap_fact_financials': 'fact_financials',
+    'snap_fact_orders': 'fact_orders',
+}
+
+# ==========================================
+# SOURCES
+# ==========================================
+
+def _quote(path):
+    return "'" + path.replace("'", "''") + "'"
+
+def table_source(folder, name):
+    # export_sink layouts: <name>.csv | <name>.csv.gz | <name>.parquet | <name>/month=*/part-0.parquet
+    path = os.path.join(folder, name)
+    if os.path.isdir(path):
+        return f"read_parquet({_quote(os.path.join(path, '**', '*.parquet'))}, hive_partitioning = true)"
+    if os.path.exists(f"{path}.parquet"):
+        return f"read_parquet({_quote(path + '.parquet')})"
+    for ext in (".csv", ".csv.gz"):
+        if os.path.exists(path + ext):
+            return f"read_csv({_quote(path + ext)}, header = true, auto_detect = true)"
+    return None
+
+def is_batch(folder):
+    return table_source(folder, 'fact_financials') is not None and table_source(folder, 'fact_marketing_daily') is not None
+
+# ==========================================
+# DIALECT
+# ==========================================
+
+def to_duckdb(stmt):
+    # Postgres suite statement -> DuckDB statement, or None when it has no local meaning
+    head = stmt.lstrip('( \n').upper()
+    if head.startswith(('SELECT', 'REFRESH', 'ANALYZE', 'CREATE INDEX', 'CREATE UNIQUE INDEX')):
+        return None  # report queries, refresh / stats / indexes of the rollups
+    if head.startswith('CREATE MATERIALIZED VIEW'):
+        # Rollups are computed once per batch: a table is the local materialization
+        stmt = stmt.replace('CREATE MATERIALIZED VIEW IF NOT EXISTS', 'CREATE TABLE', 1)
+        stmt = stmt.replace('CREATE MATERIALIZED VIEW', 'CREATE TABLE', 1)
+        return stmt.replace('WITH NO DATA', '')
+    return stmt
+
+# ==========================================
+# ONE BATCH
+# ==========================================
+
+def connect(folder, threads=None):
+    conn = duckdb.connect(database=':memory:')
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    conn.execute("CREATE SCHEMA validation")
+    for snap, table in SNAP_TABLES.items():
+        src = table_source(folder, table)
+        if src is None and snap == 'snap_fact_orders':
+            # Batch folders only carry the order-grain ledger: one item per order
+            src = f"(SELECT *, 1 as order_item_id FROM {table_source(folder, 'fact_financials')})"
+        if src is None:
+            raise FileNotFoundError(f"{folder}: no export of {table}")
+        conn.execute(f"CREATE VIEW validation.{snap} AS SELECT * FROM {src}")
+    return conn
+
+def install_suites(conn):
+    # -> {view: error} for statements that do not bind on this batch's columns
+    failed = {}
+    for path in SETUP_FILES:
+        with open(path, encoding="utf-8") as f:
+            for stmt in split_statements(f.read()):
+                stmt = to_duckdb(stmt)
+                if stmt is None:
+                    continue
+                try:
+                    conn.execute(stmt)
+                except duckdb.Error as e:
+                    failed[f"{os.path.basename(path)}: {stmt.split(' AS', 1)[0][:80]}"] = str(e).splitlines()[0]
+    return failed
+
+def discover(conn):
+    rows = conn.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'validation' AND table_type = 'VIEW' AND table_name LIKE 'violation\\_%' ESCAPE '\\'
+        ORDER BY table_name
+    """).fetchall()
+    return [r[0] for r in rows]
+
+def run_check(conn, view):
+    started = time.time()
+    result = {'check': view, 'status': 'pass', 'rows': 0, 'seconds': None, 'judgment': [], 'error': None}
+    try:
+        cur = conn.execute(check_query(view))
+        cols = [d[0] for d in cur.description]
+        action = CHECKS.get(view, {}).get('action', "Investigate")
+        for values in cur.fetchall():
+            row = dict(zip(cols, values))
+            result['judgment'].append({'violation_type': row['violation_type'], 'incident_count': int(row['incident_count'] or 0),
+                                       'financial_impact_value': float(row['financial_impact_value'] or 0),
+                                       'recommended_action': action})
+        result['rows'] = sum(r['incident_count'] for r in result['judgment'])
+        result['status'] = verdict(view, result['rows'], BATCH_BLOCKING)
+    except duckdb.Error as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+    result['seconds'] = round(time.time() - started, 3)
+    return result
+
+def validate_batch(folder, threads=None, write_report=True):
+    # Worker entry point (top level so it pickles under spawn as well as fork)
+    started = time.time()
+    try:
+        conn = connect(folder, threads)
+        try:
+            setup_errors = install_suites(conn)
+            results = [run_check(conn, v) for v in discover(conn)]
+        finally:
+            conn.close()
+        report = {
+            'run_id': os.path.basename(os.path.normpath(folder)),
+            'folder': folder,
+            'engine': f"duckdb {duckdb.__version__}",
+            'started_at': started,
+            'seconds': round(time.time() - started, 3),
+            'status': 'fail' if any(is_failure(r['status']) for r in results) or setup_errors else 'pass',
+            'warnings': sorted(r['check'] for r in results if r['status'] == 'warn'),
+            'setup_errors': setup_errors,
+            'checks': [{k: v for k, v in r.items() if k != 'judgment'} for r in results],
+            'judgment': [row for r in results for row in r['judgment']],
+        }
+    except Exception as e:
+        report = {'run_id': os.path.basename(os.path.normpath(folder)), 'folder': folder, 'status': 'error',
+                  'seconds': round(time.time() - started, 3), 'error': f"{type(e).__name__}: {e}",
+                  'traceback': traceback.format_exc()}
+    if write_report:
+        with open(os.path.join(folder, REPORT_NAME), "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+# ==========================================
+# MANY BATCHES
+# ==========================================
+
+def find_batches(paths=None, root=DEFAULT_ROOT):
+    # Explicit folders / globs, or every batch folder under root
+    candidates = []
+    for p in (paths or [os.path.join(root, "*")]):
+        candidates.extend(sorted(glob.glob(p)) or [p])
+    return [c for c in candidates if os.path.isdir(c) and is_batch(c)]
+
+def validate_batches(folders, workers=None):
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    threads = 1 if workers > 1 else None  # parallelism comes from the pool, not inside DuckDB
+    print(f"🦆 Validating {len(folders)} batches on {workers} workers (DuckDB, no database service)...")
+    started = time.time()
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(validate_batch, folder, threads): folder for folder in folders}
+        for done, future in enumerate(as_completed(futures), 1):
+            rep = future.result()
+            reports.append(rep)
+            icon = {'pass': "✅", 'fail': "❌"}.get(rep['status'], "⚠️")
+            detail = rep.get('error') or ", ".join(f"{c['check']}={c['rows']}" for c in rep['checks'] if c['status'] != 'pass')
+            print(f"   {icon} [{done}/{len(folders)}] {rep['folder']} ({rep['seconds']:.2f}s)" + (f" -> {detail}" if detail else ""))
+    failed = sum(r['status'] != 'pass' for r in reports)
+    print(f"🏁 Validated in {time.time() - started:.1f}s | {len(reports) - failed} pass, {failed} fail")
+    return sorted(reports, key=lambda r: r['folder'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate exported batch folders locally with DuckDB (no Postgres).")
+    parser.add_argument("folders", nargs="*", help="Batch folders or globs (default: every batch under --root)")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--summary", default=None, help="Write all batch reports to this JSON file")
+    args = parser.parse_args()
+
+    folders = find_batches(args.folders, args.root)
+    if not folders:
+        print(f"⚠️ No batch folders found (looked for fact_financials + fact_marketing_daily exports)")
+        sys.exit(1)
+    reports = validate_batches(folders, args.workers)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump([{k: v for k, v in r.items() if k != 'traceback'} for r in reports], f, indent=2)
+        print(f"📄 Summary: {args.summary}")
+    sys.exit(0 if all(r['status'] == 'pass' for r in reports) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,11 @@
 CREATE OR REPLACE VIEW validation.violation_financial_drift_analysis AS
 WITH drift_base AS (
     SELECT 
-        COALESCE(m.date_id, f.date_id) as date_id,
-        COALESCE(m.spend, 0) as platform_spend,
-        COALESCE(f.acquisition_cost, 0) as ledger_cost,
-        (COALESCE(m.spend, 0) - COALESCE(f.acquisition_cost, 0)) as drift_amount
-    FROM (SELECT date_id, SUM(spend) as spend FROM validation.snap_fact_marketing GROUP BY 1) m
-    FULL OUTER JOIN (SELECT date_id, SUM(acquisition_cost) as acquisition_cost FROM validation.snap_fact_financials GROUP BY 1) f
-        ON m.date_id = f.date_id
+        date_id,
+        COALESCE(spend, 0) as platform_spend,
+        COALESCE(acquisition_cost, 0) as ledger_cost,
+        (COALESCE(spend, 0) - COALESCE(acquisition_cost, 0)) as drift_amount
+    FROM validation.rollup_daily_totals
 )
 SELECT 
     date_id,
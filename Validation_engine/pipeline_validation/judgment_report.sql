@@ -9,7 +9,7 @@ UNION ALL
 
 SELECT 
     'Temporal: Future Leakage',
-    COUNT(*),
+    COALESCE(SUM(order_count), 0),
     0 as financial_impact_value,
     'Fix Timezone/ETL Logic'
 FROM validation.violation_temporal_future_leakage
@@ -0,0 +1,76 @@
+-- =========================================================
+-- VALIDATION PREP: SHARED DAILY ROLLUPS
+-- =========================================================
+-- Every physics / causality check reads these instead of the snapshot facts, so
+-- the raw tables are aggregated once per validation run and the checks cost
+-- days x channels. Run after the snapshot is taken (snapshots.sql).
+
+-- Marketing: date x channel
+CREATE MATERIALIZED VIEW IF NOT EXISTS validation.rollup_marketing_daily AS
+SELECT
+    date_id,
+    channel,
+    SUM(spend) as spend,
+    SUM(clicks) as clicks
+FROM validation.snap_fact_marketing
+GROUP BY 1, 2
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_marketing_daily ON validation.rollup_marketing_daily (channel, date_id);
+
+-- Orders (item grain, as in fact_orders): date x channel
+CREATE MATERIALIZED VIEW IF NOT EXISTS validation.rollup_orders_daily AS
+SELECT
+    date_id,
+    marketing_channel,
+    COUNT(order_id) as order_count,
+    SUM(price) as revenue
+FROM validation.snap_fact_orders
+GROUP BY 1, 2
+WITH NO DATA;
+CREATE INDEX IF NOT EXISTS idx_rollup_orders_daily ON validation.rollup_orders_daily (marketing_channel, date_id);
+
+-- Financials: date x channel
+CREATE MATERIALIZED VIEW IF NOT EXISTS validation.rollup_financials_daily AS
+SELECT
+    date_id,
+    marketing_channel,
+    COUNT(order_id) as conversions,
+    COUNT(*) as item_rows,
+    SUM(acquisition_cost) as acquisition_cost
+FROM validation.snap_fact_financials
+GROUP BY 1, 2
+WITH NO DATA;
+CREATE INDEX IF NOT EXISTS idx_rollup_financials_daily ON validation.rollup_financials_daily (marketing_channel, date_id);
+
+-- Per day: platform spend vs ledger cost (built from the two rollups above)
+CREATE MATERIALIZED VIEW IF NOT EXISTS validation.rollup_daily_totals AS
+SELECT
+    COALESCE(m.date_id, f.date_id) as date_id,
+    m.spend,
+    m.clicks,
+    f.acquisition_cost
+FROM (SELECT date_id, SUM(spend) as spend, SUM(clicks) as clicks FROM validation.rollup_marketing_daily GROUP BY 1) m
+FULL OUTER JOIN (SELECT date_id, SUM(acquisition_cost) as acquisition_cost FROM validation.rollup_financials_daily GROUP BY 1) f
+    ON m.date_id = f.date_id
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_daily_totals ON validation.rollup_daily_totals (date_id);
+
+-- Per channel: first day with any marketing activity
+CREATE MATERIALIZED VIEW IF NOT EXISTS validation.rollup_channel_first_activity AS
+SELECT channel, MIN(date_id) as first_activity_date
+FROM validation.rollup_marketing_daily
+GROUP BY 1
+WITH NO DATA;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_channel_first_activity ON validation.rollup_channel_first_activity (channel);
+
+-- Refresh in dependency order
+REFRESH MATERIALIZED VIEW validation.rollup_marketing_daily;
+REFRESH MATERIALIZED VIEW validation.rollup_orders_daily;
+REFRESH MATERIALIZED VIEW validation.rollup_financials_daily;
+REFRESH MATERIALIZED VIEW validation.rollup_daily_totals;
+REFRESH MATERIALIZED VIEW validation.rollup_channel_first_activity;
+ANALYZE validation.rollup_marketing_daily;
+ANALYZE validation.rollup_orders_daily;
+ANALYZE validation.rollup_financials_daily;
+ANALYZE validation.rollup_daily_totals;
+ANALYZE validation.rollup_channel_first_activity;
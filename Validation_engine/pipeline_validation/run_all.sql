@@ -1,16 +1,12 @@
 CREATE SCHEMA IF NOT EXISTS validation;
 
 -- =========================================================
--- 0. SNAPSHOTS
+-- 0. SNAPSHOTS (zero-copy, tagged with a run_id: see snapshots.sql)
 -- =========================================================
-DROP TABLE IF EXISTS validation.snap_fact_orders CASCADE;
-CREATE TABLE validation.snap_fact_orders AS SELECT * FROM dwh.fact_orders;
+\ir snapshots.sql
 
-DROP TABLE IF EXISTS validation.snap_fact_marketing CASCADE;
-CREATE TABLE validation.snap_fact_marketing AS SELECT * FROM dwh.fact_marketing_daily;
-
-DROP TABLE IF EXISTS validation.snap_fact_financials CASCADE;
-CREATE TABLE validation.snap_fact_financials AS SELECT * FROM dwh.fact_financials;
+-- Shared date x channel rollups every check below reads (see rollups.sql)
+\ir rollups.sql
 
 -- =========================================================
 -- 1. STATEFUL CAUSALITY CHECKS
@@ -28,17 +24,16 @@ WITH marketing_memory AS (
             ORDER BY date_id 
             ROWS BETWEEN 30 PRECEDING AND CURRENT ROW
         ) as adstock_pool
-    FROM validation.snap_fact_marketing
+    FROM validation.rollup_marketing_daily
 ),
 daily_orders AS (
     SELECT 
         date_id, 
         marketing_channel, 
-        COUNT(order_id) as order_count,
-        SUM(price) as revenue_at_risk 
-    FROM validation.snap_fact_orders
+        order_count,
+        revenue as revenue_at_risk 
+    FROM validation.rollup_orders_daily
     WHERE marketing_channel NOT IN ('Direct/Organic', 'Organic_SEO')
-    GROUP BY 1, 2
 )
 SELECT 
     o.date_id,
@@ -54,19 +49,20 @@ WHERE
     COALESCE(m.adstock_pool, 0) = 0;
 
 -- CHECK B: Temporal Causality (Future Leakage)
-CREATE OR REPLACE VIEW validation.violation_temporal_future_leakage AS
+-- One row per order day & channel; order_count carries the leaked orders.
+DROP VIEW IF EXISTS validation.violation_temporal_future_leakage;
+CREATE VIEW validation.violation_temporal_future_leakage AS
 SELECT 
-    o.order_id,
     o.date_id as order_date,
     o.marketing_channel,
-    MIN(m.date_id) as first_channel_activity_date
-FROM validation.snap_fact_orders o
-JOIN validation.snap_fact_marketing m 
-    ON o.marketing_channel = m.channel
+    o.order_count,
+    f.first_activity_date as first_channel_activity_date
+FROM validation.rollup_orders_daily o
+JOIN validation.rollup_channel_first_activity f 
+    ON o.marketing_channel = f.channel
 WHERE 
     o.marketing_channel NOT IN ('Direct/Organic', 'Organic_SEO')
-GROUP BY 1, 2, 3
-HAVING o.date_id < MIN(m.date_id);
+    AND o.date_id < f.first_activity_date;
 
 -- =========================================================
 -- 2. FINANCIAL PHYSICS (DRIFT CLASSIFICATION)
@@ -76,13 +72,11 @@ HAVING o.date_id < MIN(m.date_id);
 CREATE OR REPLACE VIEW validation.violation_financial_drift_analysis AS
 WITH drift_base AS (
     SELECT 
-        COALESCE(m.date_id, f.date_id) as date_id,
-        COALESCE(m.spend, 0) as platform_spend,
-        COALESCE(f.acquisition_cost, 0) as ledger_cost,
-        (COALESCE(m.spend, 0) - COALESCE(f.acquisition_cost, 0)) as drift_amount
-    FROM (SELECT date_id, SUM(spend) as spend FROM validation.snap_fact_marketing GROUP BY 1) m
-    FULL OUTER JOIN (SELECT date_id, SUM(acquisition_cost) as acquisition_cost FROM validation.snap_fact_financials GROUP BY 1) f
-        ON m.date_id = f.date_id
+        date_id,
+        COALESCE(spend, 0) as platform_spend,
+        COALESCE(acquisition_cost, 0) as ledger_cost,
+        (COALESCE(spend, 0) - COALESCE(acquisition_cost, 0)) as drift_amount
+    FROM validation.rollup_daily_totals
 )
 SELECT 
     date_id,
@@ -125,7 +119,7 @@ UNION ALL
 
 SELECT 
     'Temporal: Future Leakage',
-    COUNT(*),
+    COALESCE(SUM(order_count), 0),
     0 as financial_impact_value,
     'Fix Timezone/ETL Logic'
 FROM validation.violation_temporal_future_leakage
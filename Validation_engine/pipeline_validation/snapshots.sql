@@ -1,8 +1,375 @@
-DROP TABLE IF EXISTS validation.snap_fact_orders CASCADE;
-CREATE TABLE validation.snap_fact_orders AS SELECT * FROM dwh.fact_orders;
+-- =========================================================
+-- ZERO-COPY, RUN-TAGGED SNAPSHOTS
+-- =========================================================
+-- A snapshot pins the physical tables a pipeline run produced; nothing is copied.
+-- validation.snap_* are views over the pinned tables of the run in use.
+-- Copy-on-write: before the pipeline replaces a pinned table it is moved into
+-- validation_archive and keeps serving its runs. Before rows are modified in place
+-- (bulk_writer.replace_partitions, 04's attribution update) only the affected
+-- date_id partitions are copied there; the run then reads those dates from the
+-- copy and every other date from the table it pinned
+-- (bulk_writer / 02 / 04 call validation.release_for_write).
+-- Per (date_id, channel) digests are computed once per physical table, so
+-- snapshot_diff costs days x channels; runs reading the same tables are skipped outright.
+-- Fact tables store dwh.dim_channel keys (channel_key); the snap_* views decode
+-- them back to the channel name column the checks read (channel / marketing_channel).
+--
+--   SELECT validation.take_snapshot();              -- pin current dwh tables, returns run_id
+--   SELECT validation.use_snapshot('<run_id>');     -- point the snap_* views at another run
+--   SELECT * FROM validation.snapshot_diff('<run_a>', '<run_b>');
+--   SELECT validation.prune_snapshots(5);           -- keep the 5 newest runs
 
-DROP TABLE IF EXISTS validation.snap_fact_marketing CASCADE;
-CREATE TABLE validation.snap_fact_marketing AS SELECT * FROM dwh.fact_marketing_daily;
+CREATE SCHEMA IF NOT EXISTS validation;
+CREATE SCHEMA IF NOT EXISTS validation_archive;
 
-DROP TABLE IF EXISTS validation.snap_fact_financials CASCADE;
-CREATE TABLE validation.snap_fact_financials AS SELECT * FROM dwh.fact_financials;
\ No newline at end of file
+-- Legacy full-copy snapshot tables -> replaced by views below
+DO $$
+DECLARE t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['snap_fact_orders', 'snap_fact_marketing', 'snap_fact_financials'] LOOP
+        IF EXISTS (SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                   WHERE n.nspname = 'validation' AND c.relname = t AND c.relkind = 'r') THEN
+            EXECUTE format('DROP TABLE validation.%I CASCADE', t);
+        END IF;
+    END LOOP;
+END $$;
+
+-- ---------------------------------------------------------
+-- REGISTRY
+-- ---------------------------------------------------------
+CREATE TABLE IF NOT EXISTS validation.snapshot_sources (
+    snap_name TEXT PRIMARY KEY,
+    source_table TEXT NOT NULL,
+    channel_column TEXT NOT NULL
+);
+INSERT INTO validation.snapshot_sources VALUES
+    ('snap_fact_orders', 'dwh.fact_orders', 'marketing_channel'),
+    ('snap_fact_marketing', 'dwh.fact_marketing_daily', 'channel'),
+    ('snap_fact_financials', 'dwh.fact_financials', 'marketing_channel')
+ON CONFLICT (snap_name) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS validation.snapshot_runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    dwh_version TEXT,
+    in_use BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS validation.snapshot_tables (
+    run_id TEXT REFERENCES validation.snapshot_runs(run_id) ON DELETE CASCADE,
+    snap_name TEXT REFERENCES validation.snapshot_sources(snap_name),
+    relid OID NOT NULL,  -- physical table holding this run's rows
+    PRIMARY KEY (run_id, snap_name)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_tables_relid ON validation.snapshot_tables(relid);
+
+-- Dates of a pinned table rewritten after the snapshot: the run reads them from an archived copy
+CREATE TABLE IF NOT EXISTS validation.snapshot_partitions (
+    run_id TEXT NOT NULL,
+    snap_name TEXT NOT NULL,
+    date_id INT NOT NULL,  -- COALESCE(date_id, -1), as in snapshot_digests
+    relid OID NOT NULL,    -- validation_archive table holding this run's rows of date_id
+    PRIMARY KEY (run_id, snap_name, date_id),
+    FOREIGN KEY (run_id, snap_name) REFERENCES validation.snapshot_tables(run_id, snap_name) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_partitions_relid ON validation.snapshot_partitions(relid);
+
+CREATE TABLE IF NOT EXISTS validation.snapshot_digests (
+    relid OID NOT NULL,
+    date_id INT NOT NULL,
+    channel TEXT NOT NULL,
+    row_count BIGINT NOT NULL,
+    row_hash NUMERIC NOT NULL,  -- order-independent sum of 64-bit row hashes
+    PRIMARY KEY (relid, date_id, channel)
+);
+
+-- ---------------------------------------------------------
+-- USE / TAKE
+-- ---------------------------------------------------------
+CREATE OR REPLACE FUNCTION validation.has_channel_key(p_relid OID) RETURNS BOOLEAN AS $$
+    SELECT EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = p_relid AND attname = 'channel_key' AND NOT attisdropped);
+$$ LANGUAGE sql STABLE;
+
+-- Rows of one run: the pinned table, with its archived dates swapped in
+CREATE OR REPLACE FUNCTION validation.snap_source(p_run_id TEXT, p_snap_name TEXT) RETURNS TEXT AS $$
+DECLARE
+    v_relid OID;
+    v_dates INT[];
+    v_sql TEXT;
+    p RECORD;
+BEGIN
+    SELECT relid INTO v_relid FROM validation.snapshot_tables WHERE run_id = p_run_id AND snap_name = p_snap_name;
+    SELECT array_agg(date_id ORDER BY date_id) INTO v_dates
+    FROM validation.snapshot_partitions WHERE run_id = p_run_id AND snap_name = p_snap_name;
+    IF v_dates IS NULL THEN
+        RETURN v_relid::regclass::text;
+    END IF;
+    v_sql := format('SELECT * FROM %s WHERE COALESCE(date_id, -1) <> ALL (%L::int[])', v_relid::regclass, v_dates);
+    FOR p IN
+        SELECT relid, array_agg(date_id ORDER BY date_id) AS dates
+        FROM validation.snapshot_partitions WHERE run_id = p_run_id AND snap_name = p_snap_name
+        GROUP BY relid ORDER BY relid
+    LOOP
+        v_sql := v_sql || format(' UNION ALL SELECT * FROM %s WHERE COALESCE(date_id, -1) = ANY (%L::int[])', p.relid::regclass, p.dates);
+    END LOOP;
+    RETURN '(' || v_sql || ')';
+END $$ LANGUAGE plpgsql STABLE;
+
+DROP FUNCTION IF EXISTS validation.snap_query(OID, TEXT);
+CREATE OR REPLACE FUNCTION validation.snap_query(p_relid OID, p_channel_column TEXT, p_source TEXT) RETURNS TEXT AS $$
+BEGIN
+    -- Tables from before dwh.dim_channel still carry the name itself
+    IF NOT validation.has_channel_key(p_relid) THEN
+        RETURN format('SELECT * FROM %s t', p_source);
+    END IF;
+    RETURN format('SELECT t.*, c.channel_name AS %I FROM %s t LEFT JOIN dwh.dim_channel c ON c.channel_key = t.channel_key',
+                  p_channel_column, p_source);
+END $$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION validation.use_snapshot(p_run_id TEXT) RETURNS VOID AS $$
+DECLARE
+    s RECORD;
+    v_query TEXT;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM validation.snapshot_runs WHERE run_id = p_run_id) THEN
+        RAISE EXCEPTION 'Unknown snapshot run_id %', p_run_id;
+    END IF;
+    FOR s IN
+        SELECT t.snap_name, t.relid, src.channel_column
+        FROM validation.snapshot_tables t JOIN validation.snapshot_sources src ON src.snap_name = t.snap_name
+        WHERE t.run_id = p_run_id
+    LOOP
+        v_query := validation.snap_query(s.relid, s.channel_column, validation.snap_source(p_run_id, s.snap_name));
+        BEGIN
+            EXECUTE format('CREATE OR REPLACE VIEW validation.%I AS %s', s.snap_name, v_query);
+        EXCEPTION WHEN invalid_table_definition THEN
+            -- Column layout changed between runs: dependent violation views must be re-created
+            RAISE NOTICE 'validation.% changed shape, dropping dependent views', s.snap_name;
+            EXECUTE format('DROP VIEW validation.%I CASCADE', s.snap_name);
+            EXECUTE format('CREATE VIEW validation.%I AS %s', s.snap_name, v_query);
+        END;
+    END LOOP;
+    UPDATE validation.snapshot_runs SET in_use = (run_id = p_run_id);
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION validation.take_snapshot(p_run_id TEXT DEFAULT NULL) RETURNS TEXT AS $$
+DECLARE
+    v_run TEXT := COALESCE(p_run_id, to_char(clock_timestamp(), 'YYYYMMDDHH24MISSMS'));
+    v_version TEXT;
+BEGIN
+    IF to_regclass('dwh.build_info') IS NOT NULL THEN
+        EXECUTE 'SELECT MAX(build_id) FROM dwh.build_info' INTO v_version;
+    END IF;
+    INSERT INTO validation.snapshot_runs (run_id, dwh_version) VALUES (v_run, v_version);
+    INSERT INTO validation.snapshot_tables (run_id, snap_name, relid)
+    SELECT v_run, snap_name, source_table::regclass::oid FROM validation.snapshot_sources;
+    PERFORM validation.use_snapshot(v_run);
+    RETURN v_run;
+END $$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------
+-- COPY-ON-WRITE HOOK (called by the pipeline before it writes)
+-- ---------------------------------------------------------
+-- 'replace': the caller drops / swaps the table -> the pinned table is moved
+-- 'modify' : the caller rewrites rows of p_date_ids (NULL = any date) in place
+--            -> those dates are copied out for every run still reading them live
+DROP FUNCTION IF EXISTS validation.release_for_write(TEXT, TEXT);
+CREATE OR REPLACE FUNCTION validation.release_for_write(p_table TEXT, p_mode TEXT DEFAULT 'replace', p_date_ids INT[] DEFAULT NULL)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_relid OID := to_regclass(p_table);
+    v_schema TEXT;
+    v_name TEXT;
+    v_archive TEXT;
+    v_dates INT[];
+    v_part OID;
+    v_in_use TEXT;
+    idx RECORD;
+BEGIN
+    IF p_mode NOT IN ('replace', 'modify') THEN
+        RAISE EXCEPTION 'Unknown release mode %', p_mode;
+    END IF;
+    IF v_relid IS NULL OR NOT EXISTS (SELECT 1 FROM validation.snapshot_tables WHERE relid = v_relid) THEN
+        RETURN FALSE;
+    END IF;
+    SELECT n.nspname, c.relname INTO v_schema, v_name
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace WHERE c.oid = v_relid;
+    v_archive := v_name || '__' || v_relid;
+
+    IF p_mode = 'replace' THEN
+        -- Index names are per schema: suffix them before the move
+        FOR idx IN SELECT ic.relname FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid WHERE i.indrelid = v_relid LOOP
+            EXECUTE format('ALTER INDEX %I.%I RENAME TO %I', v_schema, idx.relname, idx.relname || '__' || v_relid);
+        END LOOP;
+        EXECUTE format('ALTER TABLE %I.%I RENAME TO %I', v_schema, v_name, v_archive);
+        EXECUTE format('ALTER TABLE %I.%I SET SCHEMA validation_archive', v_schema, v_archive);
+        RETURN TRUE;
+    END IF;
+
+    -- The live table's digests go stale with the write
+    DELETE FROM validation.snapshot_digests WHERE relid = v_relid;
+    v_dates := p_date_ids;
+    IF v_dates IS NULL THEN
+        EXECUTE format('SELECT array_agg(DISTINCT COALESCE(date_id, -1)) FROM %s', v_relid::regclass) INTO v_dates;
+    END IF;
+    -- Dates an earlier release already copied out for every pinning run stay live
+    SELECT array_agg(DISTINCT d ORDER BY d) INTO v_dates
+    FROM unnest(v_dates) d JOIN validation.snapshot_tables t ON t.relid = v_relid
+    WHERE NOT EXISTS (SELECT 1 FROM validation.snapshot_partitions p
+                      WHERE p.run_id = t.run_id AND p.snap_name = t.snap_name AND p.date_id = d);
+    IF v_dates IS NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE validation_archive.%I AS SELECT * FROM %s WHERE COALESCE(date_id, -1) = ANY (%L::int[])',
+                   v_archive || '_new', v_relid::regclass, v_dates);
+    v_part := to_regclass(format('validation_archive.%I', v_archive || '_new'));
+    EXECUTE format('ALTER TABLE validation_archive.%I RENAME TO %I', v_archive || '_new', v_archive || '_p' || v_part);
+    EXECUTE format('ANALYZE %s', v_part::regclass);
+
+    INSERT INTO validation.snapshot_partitions (run_id, snap_name, date_id, relid)
+    SELECT t.run_id, t.snap_name, d, v_part
+    FROM validation.snapshot_tables t CROSS JOIN unnest(v_dates) d
+    WHERE t.relid = v_relid
+    ON CONFLICT DO NOTHING;
+
+    SELECT r.run_id INTO v_in_use
+    FROM validation.snapshot_runs r JOIN validation.snapshot_tables t ON t.run_id = r.run_id
+    WHERE r.in_use AND t.relid = v_relid
+    LIMIT 1;
+    IF v_in_use IS NOT NULL THEN
+        PERFORM validation.use_snapshot(v_in_use);
+    END IF;
+    RETURN TRUE;
+END $$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------
+-- DIFF
+-- ---------------------------------------------------------
+CREATE OR REPLACE FUNCTION validation.ensure_digest(p_relid OID, p_channel_column TEXT) RETURNS VOID AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM validation.snapshot_digests WHERE relid = p_relid) THEN
+        RETURN;
+    END IF;
+    -- Keyed tables are digested per channel name too, so diffs line up with older runs
+    EXECUTE format($q$
+        INSERT INTO validation.snapshot_digests (relid, date_id, channel, row_count, row_hash)
+        SELECT %L::oid, COALESCE(t.date_id, -1), COALESCE(%s, ''), COUNT(*),
+               SUM(('x' || left(md5(t::text), 16))::bit(64)::bigint)
+        FROM %s t
+        GROUP BY 2, 3
+    $q$, p_relid,
+       CASE WHEN validation.has_channel_key(p_relid)
+            THEN '(SELECT c.channel_name FROM dwh.dim_channel c WHERE c.channel_key = t.channel_key)'
+            ELSE format('t.%I::text', p_channel_column) END,
+       p_relid::regclass);
+END $$ LANGUAGE plpgsql;
+
+-- (date_id, channel) digests of one run: pinned table minus its archived dates, plus the archived copies
+CREATE OR REPLACE FUNCTION validation.run_digest(p_run_id TEXT, p_snap_name TEXT, p_channel_column TEXT)
+RETURNS TABLE (date_id INT, channel TEXT, row_count BIGINT, row_hash NUMERIC) AS $$
+#variable_conflict use_column
+DECLARE r RECORD;
+BEGIN
+    FOR r IN
+        SELECT relid FROM validation.snapshot_tables WHERE run_id = p_run_id AND snap_name = p_snap_name
+        UNION
+        SELECT relid FROM validation.snapshot_partitions WHERE run_id = p_run_id AND snap_name = p_snap_name
+    LOOP
+        PERFORM validation.ensure_digest(r.relid, p_channel_column);
+    END LOOP;
+
+    RETURN QUERY
+    SELECT d.date_id, d.channel, d.row_count, d.row_hash
+    FROM validation.snapshot_tables t JOIN validation.snapshot_digests d ON d.relid = t.relid
+    WHERE t.run_id = p_run_id AND t.snap_name = p_snap_name
+      AND NOT EXISTS (SELECT 1 FROM validation.snapshot_partitions p
+                      WHERE p.run_id = t.run_id AND p.snap_name = t.snap_name AND p.date_id = d.date_id)
+    UNION ALL
+    SELECT d.date_id, d.channel, d.row_count, d.row_hash
+    FROM validation.snapshot_partitions p
+    JOIN validation.snapshot_digests d ON d.relid = p.relid AND d.date_id = p.date_id
+    WHERE p.run_id = p_run_id AND p.snap_name = p_snap_name;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION validation.snapshot_diff(p_run_a TEXT, p_run_b TEXT)
+RETURNS TABLE (snap_name TEXT, date_id INT, channel TEXT, change TEXT, rows_a BIGINT, rows_b BIGINT) AS $$
+#variable_conflict use_column
+DECLARE s RECORD;
+BEGIN
+    FOR s IN
+        SELECT src.snap_name AS name, src.channel_column, a.relid AS relid_a, b.relid AS relid_b
+        FROM validation.snapshot_sources src
+        LEFT JOIN validation.snapshot_tables a ON a.snap_name = src.snap_name AND a.run_id = p_run_a
+        LEFT JOIN validation.snapshot_tables b ON b.snap_name = src.snap_name AND b.run_id = p_run_b
+    LOOP
+        -- Same physical tables for every date: unchanged
+        CONTINUE WHEN s.relid_a IS NOT DISTINCT FROM s.relid_b AND NOT EXISTS (
+            (SELECT p.date_id, p.relid FROM validation.snapshot_partitions p WHERE p.run_id = p_run_a AND p.snap_name = s.name
+             EXCEPT
+             SELECT p.date_id, p.relid FROM validation.snapshot_partitions p WHERE p.run_id = p_run_b AND p.snap_name = s.name)
+            UNION ALL
+            (SELECT p.date_id, p.relid FROM validation.snapshot_partitions p WHERE p.run_id = p_run_b AND p.snap_name = s.name
+             EXCEPT
+             SELECT p.date_id, p.relid FROM validation.snapshot_partitions p WHERE p.run_id = p_run_a AND p.snap_name = s.name));
+
+        RETURN QUERY
+        SELECT s.name,
+               COALESCE(da.date_id, db.date_id),
+               COALESCE(da.channel, db.channel),
+               CASE WHEN da.row_count IS NULL THEN 'added' WHEN db.row_count IS NULL THEN 'removed' ELSE 'changed' END,
+               da.row_count,
+               db.row_count
+        FROM validation.run_digest(p_run_a, s.name, s.channel_column) da
+        FULL OUTER JOIN validation.run_digest(p_run_b, s.name, s.channel_column) db
+            ON da.date_id = db.date_id AND da.channel = db.channel
+        WHERE da.row_hash IS DISTINCT FROM db.row_hash OR da.row_count IS DISTINCT FROM db.row_count;
+    END LOOP;
+END $$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------
+-- RETENTION
+-- ---------------------------------------------------------
+CREATE OR REPLACE FUNCTION validation.drop_snapshot(p_run_id TEXT) RETURNS VOID AS $$
+DECLARE r RECORD;
+BEGIN
+    IF EXISTS (SELECT 1 FROM validation.snapshot_runs WHERE run_id = p_run_id AND in_use) THEN
+        RAISE EXCEPTION 'Snapshot % is in use, switch with use_snapshot() first', p_run_id;
+    END IF;
+    DELETE FROM validation.snapshot_runs WHERE run_id = p_run_id;
+    -- Archived tables and partitions no run reads any more are dropped; live dwh tables are only unpinned
+    DELETE FROM validation.snapshot_digests d
+    WHERE NOT EXISTS (SELECT 1 FROM validation.snapshot_tables t WHERE t.relid = d.relid)
+      AND NOT EXISTS (SELECT 1 FROM validation.snapshot_partitions p WHERE p.relid = d.relid);
+    FOR r IN
+        SELECT c.oid, c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'validation_archive' AND c.relkind = 'r'
+          AND NOT EXISTS (SELECT 1 FROM validation.snapshot_tables t WHERE t.relid = c.oid)
+          AND NOT EXISTS (SELECT 1 FROM validation.snapshot_partitions p WHERE p.relid = c.oid)
+    LOOP
+        EXECUTE format('DROP TABLE validation_archive.%I', r.relname);
+    END LOOP;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION validation.prune_snapshots(p_keep INT DEFAULT 5) RETURNS INT AS $$
+DECLARE
+    r RECORD;
+    n INT := 0;
+BEGIN
+    FOR r IN
+        SELECT run_id FROM (
+            SELECT run_id, in_use, row_number() OVER (ORDER BY created_at DESC) as age_rank
+            FROM validation.snapshot_runs
+        ) ranked
+        WHERE age_rank > p_keep AND NOT in_use
+    LOOP
+        PERFORM validation.drop_snapshot(r.run_id);
+        n := n + 1;
+    END LOOP;
+    RETURN n;
+END $$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------
+-- SNAPSHOT THIS RUN
+-- ---------------------------------------------------------
+SELECT validation.take_snapshot();
@@ -10,17 +10,16 @@ WITH marketing_memory AS (
             ORDER BY date_id 
             ROWS BETWEEN 30 PRECEDING AND CURRENT ROW
         ) as adstock_pool
-    FROM validation.snap_fact_marketing
+    FROM validation.rollup_marketing_daily
 ),
 daily_orders AS (
     SELECT 
         date_id, 
         marketing_channel, 
-        COUNT(order_id) as order_count,
-        SUM(price) as revenue_at_risk 
-    FROM validation.snap_fact_orders
+        order_count,
+        revenue as revenue_at_risk 
+    FROM validation.rollup_orders_daily
     WHERE marketing_channel NOT IN ('Direct/Organic', 'Organic_SEO')
-    GROUP BY 1, 2
 )
 SELECT 
     o.date_id,
@@ -36,16 +35,17 @@ WHERE
     COALESCE(m.adstock_pool, 0) = 0;
 
 -- CHECK B: Temporal Causality (Future Leakage)
-CREATE OR REPLACE VIEW validation.violation_temporal_future_leakage AS
+-- One row per order day & channel; order_count carries the leaked orders.
+DROP VIEW IF EXISTS validation.violation_temporal_future_leakage;
+CREATE VIEW validation.violation_temporal_future_leakage AS
 SELECT 
-    o.order_id,
     o.date_id as order_date,
     o.marketing_channel,
-    MIN(m.date_id) as first_channel_activity_date
-FROM validation.snap_fact_orders o
-JOIN validation.snap_fact_marketing m 
-    ON o.marketing_channel = m.channel
+    o.order_count,
+    f.first_activity_date as first_channel_activity_date
+FROM validation.rollup_orders_daily o
+JOIN validation.rollup_channel_first_activity f 
+    ON o.marketing_channel = f.channel
 WHERE 
     o.marketing_channel NOT IN ('Direct/Organic', 'Organic_SEO')
-GROUP BY 1, 2, 3
-HAVING o.date_id < MIN(m.date_id);
\ No newline at end of file
+    AND o.date_id < f.first_activity_date;
\ No newline at end of file
@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import text
+
+# ==========================================
+# SETUP PATHS & DB CONNECTION
+# ==========================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+import db_config
+import physics_checks
+
+# ==========================================
+# VALIDATION RUNNER (PARALLEL CHECKS)
+# ==========================================
+# 1. Setup: pins a zero-copy snapshot of the run, refreshes the shared daily
+#    rollups over it and (re)creates the violation views from the SQL suites.
+#    Report SELECTs in those files are skipped, the runner evaluates every check itself.
+# 2. Checks: every validation.violation_* view is discovered and counted on its
+#    own pooled connection, with a per-statement timeout. Runtime and row count
+#    are recorded per check. A blocking check with rows fails the run (exit code 1);
+#    advisory checks only warn. --fail-fast cancels the rest on the first failure.
+# 3. Judgment: the judgment report rows are assembled from the per-check results
+#    and written, with the check timings, to a JSON artifact.
+
+SUITE_FOLDER = os.path.join(current_dir, "pipeline_validation")
+SNAPSHOT_FILE = os.path.join(SUITE_FOLDER, "snapshots.sql")
+SETUP_FILES = [  # run after the snapshot is pinned; rollups first, the checks read them
+    os.path.join(SUITE_FOLDER, "rollups.sql"),
+    os.path.join(SUITE_FOLDER, "stateful_casuality.sql"),
+    os.path.join(SUITE_FOLDER, "financial_physics.sql"),
+    os.path.join(SUITE_FOLDER, "structural_physics.sql"),
+    os.path.join(current_dir, "engine_validation.sql"),
+]
+REPORT_PATH = os.path.join(current_dir, "validation_report.json")
+
+# Impossible outcomes fail the run. Drift, spikes and skew return rows by design
+# (the analyst is meant to find them): reported as warnings, as in physics_checks.BLOCKING.
+BLOCKING = (*physics_checks.BLOCKING,
+            'violation_causal_impossible_orders', 'violation_grain_duplication', 'violation_organic_spend')
+
+# view -> how it feeds the judgment report (mirrors judgment_report.sql and the
+# engine_validation.sql verdict). Views without an entry are counted as-is.
+CHECKS = {
+    'violation_causal_impossible_orders': {
+        'label': "'Causal: Impossible Orders (No AdStock)'", 'impact': "COALESCE(SUM(revenue_at_risk), 0)",
+        'action': "Revoke Attribution"},
+    'violation_temporal_future_leakage': {
+        'label': "'Temporal: Future Leakage'", 'count': "COALESCE(SUM(order_count), 0)", 'action': "Fix Timezone/ETL Logic"},
+    'violation_financial_drift_analysis': {
+        'label': "'Financial: ' || drift_category", 'impact': "SUM(ABS(drift_amount))", 'group': True,
+        'action': "Audit Allocation Algo"},
+    'violation_grain_duplication': {
+        'label': "'Structural: Grain Violation'", 'action': "Deduplicate Source"},
+    'violation_physics_demand_overflow': {
+        'label': "'Conversion Physics (Demand)'", 'action': "Audit Funnel Ceiling"},
+    'violation_physics_infinite_scaling': {
+        'label': "'Saturation Physics (Scaling)'", 'action': "Audit Saturation Curve"},
+    'violation_physics_attribution_skew': {
+        'label': "'Attribution Physics (Skew)'", 'action': "Audit Attribution Weights"},
+    'violation_physics_rolling_mass_balance': {
+        'label': "'Mass Balance (Rolling Drift)'", 'where': "ABS(rolling_7d_drift) > 500",
+        'action': "Audit Allocation Algo"},
+}
+
+# ==========================================
+# SQL SUITES
+# ==========================================
+
+def _quoted_end(sql, i, quote, backslash=False):
+    # Index just past the literal / identifier opened at i ('' or "" escape the quote)
+    end, n = i + 1, len(sql)
+    while end < n:
+        if backslash and sql[end] == '\\':
+            end += 2
+        elif sql[end] == quote:
+            if not sql.startswith(quote * 2, end):
+                return end + 1
+            end += 2
+        else:
+            end += 1
+    return n
+
+def _block_comment_end(sql, i):
+    # Postgres block comments nest: /* a /* b */ c */
+    depth, end, n = 0, i, len(sql)
+    while end < n:
+        if sql.startswith('/*', end):
+            depth, end = depth + 1, end + 2
+        elif sql.startswith('*/', end):
+            depth, end = depth - 1, end + 2
+            if depth == 0:
+                return end
+        else:
+            end += 1
+    return n
+
+def split_statements(sql):
+    # Top-level ';' split, as psql does it: quotes ('...', E'...', "..."), dollar-quoted
+    # bodies and comments (-- and nested /* */) are skipped over.
+    # psql meta-commands (\ir ...) are dropped.
+    statements, buf, i, n = [], [], 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if ch == '/' and sql.startswith('/*', i):
+            i = _block_comment_end(sql, i)
+            buf.append(' ')
+            continue
+        if ch == '\\' and (i == 0 or sql[i - 1] == '\n'):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if ch in ("'", '"'):
+            escaped = ch == "'" and i > 0 and sql[i - 1] in 'eE' and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == '_'))
+            end = _quoted_end(sql, i, ch, backslash=escaped)
+            buf.append(sql[i:end])
+            i = end
+            continue
+        if ch == '$':
+            m = re.match(r"\$[A-Za-z_]*\$", sql[i:])
+            if m:
+                tag = m.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = n if end == -1 else end + len(tag)
+                buf.append(sql[i:end])
+                i = end
+                continue
+        if ch == ';':
+            stmt = ''.join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    stmt = ''.join(buf).strip()
+    if stmt:
+        statements.append(stmt)
+    return statements
+
+def _exec_file(conn, path):
+    # Plain DBAPI execute without parameters: the driver must not read format('%I', ...) as placeholders
+    cursor = conn.connection.cursor()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for stmt in split_statements(f.read()):
+                if stmt.lstrip('( \n').upper().startswith('SELECT'):
+                    continue  # report queries / snapshot call: handled by the runner
+                cursor.execute(stmt)
+    finally:
+        cursor.close()
+
+def setup(engine, run_id=None, use_run=None):
+    # Snapshot, then rollups + views over it; returns the run_id the checks read
+    started = time.time()
+    with engine.begin() as conn:
+        _exec_file(conn, SNAPSHOT_FILE)
+        if use_run:
+            conn.execute(text("SELECT validation.use_snapshot(:r)"), {'r': use_run})
+            run = use_run
+        else:
+            run = conn.execute(text("SELECT validation.take_snapshot(:r)"), {'r': run_id}).scalar()
+        for path in SETUP_FILES:
+            _exec_file(conn, path)
+    print(f"   ✅ Setup: snapshot {run}, rollups & views ready in {time.time() - started:.2f}s")
+    return run
+
+def discover(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT table_name FROM information_schema.views
+            WHERE table_schema = 'validation' AND table_name LIKE 'violation\\_%'
+            ORDER BY table_name
+        """))
+        return [r[0] for r in rows]
+
+# ==========================================
+# CHECKS
+# ==========================================
+
+def check_query(view):
+    spec = CHECKS.get(view, {})
+    label = spec.get('label', f"'{view}'")
+    count = spec.get('count', "COUNT(*)")
+    impact = spec.get('impact', "0")
+    where = f" WHERE {spec['where']}" if 'where' in spec else ""
+    group = " GROUP BY 1" if spec.get('group') else ""
+    return f"SELECT {label} as violation_type, {count} as incident_count, {impact} as financial_impact_value " \
+           f"FROM validation.{view}{where}{group}"
+
+def verdict(view, rows, blocking=BLOCKING):
+    if not rows:
+        return 'pass'
+    return 'fail' if view in blocking else 'warn'
+
+def is_failure(status):
+    # Blocking violations, and checks that could not run
+    return status in ('fail', 'timeout', 'error')
+
+def run_check(engine, view, timeout_sec, backends):
+    started = time.time()
+    result = {'check': view, 'status': 'pass', 'rows': 0, 'seconds': None, 'judgment': [], 'error': None}
+    try:
+        with engine.begin() as conn:
+            backends[view] = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_sec * 1000)}"))
+            rows = conn.execute(text(check_query(view))).mappings().all()
+        action = CHECKS.get(view, {}).get('action', "Investigate")
+        for row in rows:
+            result['judgment'].append({'violation_type': row['violation_type'], 'incident_count': int(row['incident_count']),
+                                       'financial_impact_value': float(row['financial_impact_value'] or 0),
+                                       'recommended_action': action})
+        result['rows'] = sum(r['incident_count'] for r in result['judgment'])
+        result['status'] = verdict(view, result['rows'])
+    except Exception as e:
+        msg = str(e).splitlines()[0]
+        if 'statement timeout' in msg:
+            result['status'] = 'timeout'
+        elif 'due to user request' in msg:  # fail-fast pg_cancel_backend
+            result['status'] = 'cancelled'
+        else:
+            result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {msg}"
+    finally:
+        backends.pop(view, None)
+        result['seconds'] = round(time.time() - started, 3)
+    return result
+
+def _cancel_backends(engine, backends):
+    with engine.connect() as conn:
+        for pid in list(backends.values()):
+            conn.execute(text("SELECT pg_cancel_backend(:pid)"), {'pid': pid})
+
+def run_checks(engine, views, workers=4, timeout_sec=120, fail_fast=False):
+    backends = {}  # check -> backend pid, for fail-fast cancellation
+    results = []
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {pool.submit(run_check, engine, v, timeout_sec, backends): v for v in views}
+    try:
+        for future in as_completed(futures):
+            res = future.result()
+            results.append(res)
+            icon = {'pass': "✅", 'warn': "🟡", 'fail': "❌", 'timeout': "⏱️", 'error': "⚠️", 'cancelled': "⏹️"}[res['status']]
+            print(f"   {icon} {res['check']:<42} {res['rows']:>8,} rows  {res['seconds']:>7.2f}s"
+                  + (f"  {res['error']}" if res['error'] else ""))
+            if fail_fast and is_failure(res['status']):
+                print("   ⛔ Fail-fast: cancelling remaining checks")
+                for f in futures:
+                    f.cancel()
+                _cancel_backends(engine, backends)
+                break
+    finally:
+        pool.shutdown(wait=True)
+
+    done = {r['check'] for r in results}
+    for future, view in futures.items():
+        if view in done:
+            continue
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            results.append({'check': view, 'status': 'skipped', 'rows': None, 'seconds': None, 'judgment': [], 'error': None})
+    return sorted(results, key=lambda r: r['check'])
+
+# ==========================================
+# MAIN
+# ==========================================
+
+def run(run_id=None, use_run=None, workers=4, timeout_sec=120, fail_fast=False, skip_setup=False, report_path=REPORT_PATH):
+    engine = db_config.get_engine()
+    started = time.time()
+    print("🔬 Validation Runner")
+    run = use_run if skip_setup else setup(engine, run_id, use_run)
+    views = discover(engine)
+    print(f"   🔎 {len(views)} checks on {workers} connections (timeout {timeout_sec}s)")
+    results = run_checks(engine, views, workers, timeout_sec, fail_fast)
+
+    report = {
+        'run_id': run,
+        'started_at': started,
+        'seconds': round(time.time() - started, 3),
+        'status': 'fail' if any(is_failure(r['status']) for r in results) else 'pass',
+        'warnings': sorted(r['check'] for r in results if r['status'] == 'warn'),
+        'checks': [{k: v for k, v in r.items() if k != 'judgment'} for r in results],
+        'judgment': [row for r in results for row in r['judgment']],
+    }
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Judgment report: {report_path} ({report['status'].upper()}, {report['seconds']:.2f}s)")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the validation suites as parallel, timed checks.")
+    parser.add_argument("--run-id", default=None, help="Tag for the snapshot taken of the current DWH")
+    parser.add_argument("--use-run", default=None, help="Validate an existing snapshot run instead")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=120, help="Statement timeout per check (seconds)")
+    parser.add_argument("--fail-fast", action="store_true")
+    parser.add_argument("--skip-setup", action="store_true", help="Views already installed; only run the checks")
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    report = run(args.run_id, args.use_run, args.workers, args.timeout, args.fail_fast, args.skip_setup, args.report)
+    sys.exit(0 if report['status'] == 'pass' else 1)
+
+if __name__ == "__main__":
+    main()
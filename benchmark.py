@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# BENCHMARK SUITE (SYNTHETIC FIXTURES)
+# ==========================================
+# Times every pipeline stage (01-05) and every OlistMasterEngineV5 phase on a
+# reproducible synthetic Olist dataset, at one or more fixture sizes, and stores
+# wall time, peak RSS and rows/sec as JSON so runs can be compared across commits.
+#
+# Fixtures are generated from a seed (orders, items, customers, payments,
+# reviews, geolocation); products, sellers and category names are sampled from
+# the tracked CSVs in data/. Stages run against a scratch database
+# (OLIST_DB_NAME, default 'olist_bench') loaded from the fixture folder.
+#
+# Usage:
+#   python benchmark.py --sizes xs s                    # pipeline + engine, results/<commit>.json
+#   python benchmark.py --only engine --offline         # engine once, on the newest context bundle
+#   OLIST_DB_BACKEND=duckdb python benchmark.py --sizes s   # no server: embedded olist_bench.duckdb
+#   python benchmark.py --sizes s --compare benchmarks/results/<old>.json --tolerance 0.2
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+sys.path.append(os.path.join(current_dir, "generator_app"))
+
+BENCH_ROOT = os.path.join(current_dir, "benchmarks")
+FIXTURE_ROOT = os.path.join(BENCH_ROOT, "fixtures")
+RESULTS_ROOT = os.path.join(BENCH_ROOT, "results")
+DATA_FOLDER = os.path.join(current_dir, "data")
+
+SIZES = {'xs': 2_000, 's': 20_000, 'm': 100_000, 'l': 500_000}  # orders per fixture
+START, END = pd.Timestamp('2017-01-01'), pd.Timestamp('2018-08-31')
+MIN_COMPARE_SECONDS = 0.5  # shorter stages are timer noise, not regressions
+
+# stage -> (args, table whose bulk_writer row count sizes rows/sec; None: no rate)
+# 01 loads raw CSVs through to_sql and 02 builds the DWH in SQL, so neither reports rows
+PIPELINE_STAGES = [
+    ('01_setup_infrastructure', [os.path.join('pipeline', '01_setup_infrastructure.py')], None),
+    ('02_build_dwh_schema', [os.path.join('pipeline', '02_build_dwh_schema.py')], None),
+    ('03_market_engine', [os.path.join('pipeline', '03_market_engine.py')], 'dwh.fact_marketing_daily'),
+    ('04_attribution_bridge', [os.path.join('pipeline', '04_attribution_bridge.py')], 'public.temp_attribution'),
+    ('05_unified_financials', [os.path.join('pipeline', '05_unified_financials.py'), '--full'], 'dwh.fact_financials'),
+]
+# phase -> (call, rows it processed)
+ENGINE_PHASES = [
+    ('load_context', lambda sim: sim.load_context(), lambda sim: len(sim.df_order_headers)),
+    ('simulate_marketing', lambda sim: sim.simulate_marketing(), lambda sim: len(sim.df_marketing)),
+    ('run_attribution_engine', lambda sim: sim.run_attribution_engine(), lambda sim: len(sim.df_processed)),
+    ('calculate_financials', lambda sim: sim.calculate_financials(), lambda sim: len(sim.df_final_orders)),
+    ('validate_output', lambda sim: sim.validate_output(), lambda sim: len(sim.df_final_orders)),
+    ('export', lambda sim: sim.export(update_dwh=False, validate=False), lambda sim: len(sim.df_final_orders)),
+]
+
+# ==========================================
+# FIXTURES
+# ==========================================
+
+def _hex_ids(rng, n):
+    # 32-char hex IDs, like Olist's
+    a = rng.integers(0, 2**63, size=(n, 2), dtype=np.int64)
+    return np.char.add(np.char.mod('%016x', a[:, 0]), np.char.mod('%016x', a[:, 1]))
+
+def _fmt(ts):
+    return pd.Series(ts).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def build_fixture(n_orders, seed=7, data_folder=DATA_FOLDER):
+    # -> {csv file name: DataFrame}, deterministic for (n_orders, seed)
+    rng = np.random.default_rng([seed, n_orders])
+    products = pd.read_csv(os.path.join(data_folder, 'olist_products_dataset.csv'))
+    sellers = pd.read_csv(os.path.join(data_folder, 'olist_sellers_dataset.csv'), dtype={'seller_zip_code_prefix': str})
+    translation = pd.read_csv(os.path.join(data_folder, 'product_category_name_translation.csv'))
+
+    # Orders: purchase day with a growth trend, random time of day
+    days = pd.date_range(START, END, freq='D')
+    day_w = np.linspace(1.0, 3.0, len(days))
+    day = rng.choice(len(days), size=n_orders, p=day_w / day_w.sum())
+    purchase = days.to_numpy()[day] + rng.integers(0, 86400, n_orders).astype('timedelta64[s]')
+    status = rng.choice(['delivered', 'shipped', 'canceled', 'unavailable'], size=n_orders, p=[0.93, 0.04, 0.02, 0.01])
+    approved = purchase + rng.integers(600, 86400, n_orders).astype('timedelta64[s]')
+    carrier = approved + (rng.gamma(2.0, 1.5, n_orders) * 86400).astype('timedelta64[s]')
+    delivered = carrier + (rng.gamma(3.0, 3.0, n_orders) * 86400).astype('timedelta64[s]')
+    estimated = (purchase.astype('datetime64[D]') + rng.integers(15, 35, n_orders).astype('timedelta64[D]')).astype('datetime64[s]')
+    order_ids = _hex_ids(rng, n_orders)
+    customer_ids = _hex_ids(rng, n_orders)
+    orders = pd.DataFrame({
+        'order_id': order_ids, 'customer_id': customer_ids, 'order_status': status,
+        'order_purchase_timestamp': _fmt(purchase), 'order_approved_at': _fmt(approved),
+        'order_delivered_carrier_date': _fmt(carrier).where(status != 'canceled'),
+        'order_delivered_customer_date': _fmt(delivered).where(status == 'delivered'),
+        'order_estimated_delivery_date': _fmt(estimated),
+    })
+
+    # Customers: ~3% repeat buyers share a customer_unique_id
+    unique_pool = _hex_ids(rng, n_orders)
+    repeat = rng.random(n_orders) < 0.03
+    unique_ids = np.where(repeat, unique_pool[rng.integers(0, max(1, n_orders // 10), n_orders)], unique_pool)
+    cust_zip = np.char.zfill(rng.integers(1000, 99990, n_orders).astype(str), 5)
+    customers = pd.DataFrame({'customer_id': customer_ids, 'customer_unique_id': unique_ids,
+                              'customer_zip_code_prefix': cust_zip, 'customer_city': 'x',
+                              'customer_state': rng.choice(['SP', 'RJ', 'MG', 'RS', 'PR', 'BA'], n_orders)})
+
+    # Items: 1 + geometric extras, Zipf-ish seller popularity
+    n_items = rng.geometric(0.85, n_orders)
+    item_order = np.repeat(np.arange(n_orders), n_items)
+    item_seq = np.arange(len(item_order)) - np.repeat(np.cumsum(n_items) - n_items, n_items) + 1
+    seller_w = 1.0 / np.arange(1, len(sellers) + 1) ** 0.8
+    items = pd.DataFrame({
+        'order_id': order_ids[item_order], 'order_item_id': item_seq,
+        'product_id': products['product_id'].to_numpy()[rng.integers(0, len(products), len(item_order))],
+        'seller_id': sellers['seller_id'].to_numpy()[rng.choice(len(sellers), len(item_order), p=seller_w / seller_w.sum())],
+        'shipping_limit_date': _fmt(approved[item_order] + np.timedelta64(3, 'D')),
+        'price': np.round(rng.lognormal(4.4, 0.8, len(item_order)), 2),
+        'freight_value': np.round(rng.gamma(4.0, 5.0, len(item_order)), 2),
+    })
+
+    order_value = (items['price'] + items['freight_value']).groupby(item_order).sum().to_numpy()
+    payments = pd.DataFrame({'order_id': order_ids, 'payment_sequential': 1,
+                             'payment_type': rng.choice(['credit_card', 'boleto', 'voucher', 'debit_card'], n_orders, p=[0.74, 0.19, 0.04, 0.03]),
+                             'payment_installments': rng.integers(1, 11, n_orders), 'payment_value': np.round(order_value, 2)})
+    reviews = pd.DataFrame({'review_id': _hex_ids(rng, n_orders), 'order_id': order_ids,
+                            'review_score': rng.choice([1, 2, 3, 4, 5], n_orders, p=[0.11, 0.03, 0.08, 0.19, 0.59]),
+                            'review_comment_title': None, 'review_comment_message': 'ok',
+                            'review_creation_date': _fmt(estimated), 'review_answer_timestamp': None})
+
+    # Geolocation: a few points per zip prefix in use
+    zips = np.unique(np.concatenate([cust_zip, sellers['seller_zip_code_prefix'].astype(str).str.zfill(5).to_numpy()]))
+    geo_zip = np.repeat(zips, 3)
+    geolocation = pd.DataFrame({'geolocation_zip_code_prefix': geo_zip,
+                                'geolocation_lat': rng.uniform(-33.0, -3.0, len(geo_zip)),
+                                'geolocation_lng': rng.uniform(-60.0, -35.0, len(geo_zip)),
+                                'geolocation_city': 'x', 'geolocation_state': 'SP'})
+
+    return {
+        'olist_orders_dataset.csv': orders,
+        'olist_order_items_dataset.csv': items,
+        'olist_customers_dataset.csv': customers,
+        'olist_sellers_dataset.csv': sellers,
+        'olist_products_dataset.csv': products,
+        'olist_geolocation_dataset.csv': geolocation,
+        'product_category_name_translation.csv': translation,
+        'olist_order_payments_dataset.csv': payments,
+        'olist_order_reviews_dataset.csv': reviews,
+    }
+
+def ensure_fixture(size, seed=7):
+    # Written once per (size, seed); later runs reuse the folder
+    folder = os.path.join(FIXTURE_ROOT, f"{size}-seed{seed}")
+    manifest = os.path.join(folder, "fixture.json")
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            return folder, json.load(f)
+    started = time.time()
+    os.makedirs(folder, exist_ok=True)
+    rows = {}
+    for name, df in build_fixture(SIZES[size], seed).items():
+        df.to_csv(os.path.join(folder, name), index=False)
+        rows[name] = len(df)
+    meta = {'size': size, 'orders': SIZES[size], 'seed': seed, 'rows': rows, 'seconds': round(time.time() - started, 2)}
+    with open(manifest, "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"   -> 🧪 Fixture {size} ({SIZES[size]:,} orders, {rows['olist_order_items_dataset.csv']:,} items) in {meta['seconds']:.1f}s")
+    return folder, meta
+
+# ==========================================
+# RUNS
+# ==========================================
+
+def _with_rate(row, rows):
+    row['rows'] = rows
+    row['rows_per_sec'] = rows / row['seconds'] if rows is not None and row['ok'] and row['seconds'] else None
+    return row
+
+def bench_pipeline(fixture_folder):
+    # Each stage in its own process (own peak RSS), fed from the fixture folder
+    import scale_factor
+    os.environ['OLIST_DATA_DIR'] = fixture_folder
+    os.environ['OLIST_JSON_DIR'] = os.path.join(fixture_folder, "json_source")
+    results = []
+    for label, args, output in PIPELINE_STAGES:
+        row = scale_factor.run_stage(label, args, cwd=current_dir)
+        results.append(_with_rate({**row, 'kind': 'pipeline'}, row['written'].get(output)))
+        if not row['ok']:
+            break
+    return results
+
+def bench_engine(size, offline=False, market="Medium", seed=7):
+    # Engine phases in a child process, so the parent's memory does not leak into the peaks
+    out = os.path.join(BENCH_ROOT, f".engine_{size}.json")
+    cmd = [sys.executable, "-u", os.path.abspath(__file__), "--engine-child", out, "--market", market, "--seed", str(seed)]
+    if offline:
+        cmd.append("--offline")
+    subprocess.run(cmd, cwd=current_dir)
+    if not os.path.exists(out):
+        return [{'stage': 'engine', 'kind': 'engine', 'ok': False, 'seconds': None, 'max_rss_mb': None,
+                 'rows': None, 'rows_per_sec': None}]
+    with open(out) as f:
+        results = json.load(f)
+    os.remove(out)
+    return results
+
+def _engine_child(out, market, offline, seed):
+    import scale_factor
+    from training_engine import OlistMasterEngineV5
+    sim = OlistMasterEngineV5(market, os.path.join(BENCH_ROOT, "engine_output"), use_snapshot=offline,
+                              offline=offline, cache=False, seed=seed)
+    results = []
+    for label, call, rows in ENGINE_PHASES:
+        row = scale_factor.measure(label, lambda: call(sim))
+        results.append(_with_rate({**row, 'kind': 'engine'}, rows(sim) if row['ok'] else None))
+        if not row['ok']:
+            break
+    with open(out, "w") as f:
+        json.dump(results, f)
+
+# ==========================================
+# REPORT / COMPARE
+# ==========================================
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=current_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(report, baseline, tolerance=0.20):
+    # -> rows slower than baseline by more than `tolerance` (wall time)
+    old = {(r['size'], r['stage']): r for r in baseline['results'] if r.get('ok')}
+    regressions = []
+    print(f"\n📐 vs {baseline['meta']['commit']}  {'size':>6} | {'stage':<24} | {'old s':>8} | {'new s':>8} | delta")
+    for r in report['results']:
+        prev = old.get((r['size'], r['stage']))
+        if not prev or not r.get('ok') or not prev['seconds'] or max(prev['seconds'], r['seconds']) < MIN_COMPARE_SECONDS:
+            continue
+        delta = r['seconds'] / prev['seconds'] - 1
+        flag = "❌" if delta > tolerance else ""
+        print(f"   {r['size']:>6} | {r['stage']:<24} | {prev['seconds']:>8.2f} | {r['seconds']:>8.2f} | {delta:+.0%} {flag}")
+        if delta > tolerance:
+            regressions.append({**r, 'baseline_seconds': prev['seconds'], 'delta': round(delta, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages and simulator phases on synthetic fixtures.")
+    parser.add_argument("--sizes", nargs="+", default=["xs"], choices=list(SIZES))
+    parser.add_argument("--only", choices=["pipeline", "engine"], default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--market", default="Medium", choices=["Easy", "Medium", "Hard"])
+    parser.add_argument("--offline", action="store_true", help="Engine phases once, on the newest context bundle (no DB)")
+    parser.add_argument("--out", default=None, help="Results JSON (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed slowdown before a stage counts as a regression")
+    parser.add_argument("--engine-child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OLIST_DB_NAME", "olist_bench")
+    if os.environ["OLIST_DB_NAME"] == "olist_engine_db":
+        print("⛔ Refusing to benchmark on the main database. Set OLIST_DB_NAME to a scratch DB.")
+        sys.exit(1)
+    if args.engine_child:
+        _engine_child(args.engine_child, args.market, args.offline, args.seed)
+        return
+
+    report = {'meta': {'commit': _commit(), 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'seed': args.seed,
+                       'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                       'platform': platform.platform(), 'cpus': os.cpu_count(), 'db': os.environ["OLIST_DB_NAME"],
+                       'backend': os.environ.get("OLIST_DB_BACKEND", "postgres")},
+              'results': []}
+    for size in args.sizes:
+        if args.only == "engine" and args.offline:
+            break  # nothing here depends on the fixture size
+        print(f"\n{'=' * 70}\n⏱️  BENCHMARK {size} ({SIZES[size]:,} orders)\n{'=' * 70}")
+        folder, _ = ensure_fixture(size, args.seed)
+        rows = []
+        if args.only != "engine":
+            rows += bench_pipeline(folder)
+        if args.only != "pipeline" and not args.offline and all(r['ok'] for r in rows):
+            rows += bench_engine(size, args.offline, args.market, args.seed)
+        for row in rows:
+            row.update({'size': size, 'orders': SIZES[size]})
+        report['results'].extend(rows)
+
+    # Offline, the engine reads the newest context bundle whatever the fixture size:
+    # its phases are timed once, sized by the orders the bundle holds
+    if args.only != "pipeline" and args.offline:
+        print(f"\n{'=' * 70}\n⏱️  BENCHMARK engine (offline, newest context bundle)\n{'=' * 70}")
+        rows = bench_engine('bundle', True, args.market, args.seed)
+        orders = rows[0]['rows'] if rows[0]['stage'] == 'load_context' else None
+        for row in rows:
+            row.update({'size': 'bundle', 'orders': orders})
+        report['results'].extend(rows)
+
+    print(f"\n📊 {'size':>6} | {'stage':<24} | {'seconds':>8} | {'peak MB':>8} | {'rows/s':>10} | ok")
+    for r in report['results']:
+        rss = '-' if r['max_rss_mb'] is None else f"{r['max_rss_mb']:,.0f}"
+        rate = '-' if r['rows_per_sec'] is None else f"{r['rows_per_sec']:,.0f}"
+        secs = '-' if r['seconds'] is None else f"{r['seconds']:.2f}"
+        print(f"   {r['size']:>6} | {r['stage']:<24} | {secs:>8} | {rss:>8} | {rate:>10} | {'✅' if r['ok'] else '❌'}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+
+    out = args.out or os.path.join(RESULTS_ROOT, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results: {out}")
+    sys.exit(1 if regressions or not all(r['ok'] for r in report['results']) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import io
+import os
+import time
+from contextlib import nullcontext
+import pandas as pd
+from sqlalchemy import text
+
+# ==========================================
+# BULK WRITER (COPY -> STAGING -> ATOMIC SWAP)
+# ==========================================
+# Single write path for every DWH output. Data is streamed through COPY into a
+# staging table with declared column types, indexes are built after the load,
+# and the staging table replaces the live one inside one transaction, so
+# readers see either the old table or the new one, never a partial load.
+# On the embedded backend (DuckDB) frames are scanned in place instead of COPY'd.
+
+COPY_CHUNK_ROWS = 50000
+NULL_TOKEN = '\\N'
+
+# Fallback column types when none is declared (mirrors DataFrame.to_sql)
+PANDAS_SQL_TYPES = {
+    'i': {1: 'SMALLINT', 2: 'SMALLINT', 4: 'INTEGER', 8: 'BIGINT'},
+    'u': {1: 'SMALLINT', 2: 'INTEGER', 4: 'BIGINT', 8: 'BIGINT'},
+    'f': {4: 'REAL', 8: 'DOUBLE PRECISION'},
+    'b': 'BOOLEAN',
+    'M': 'TIMESTAMP',
+}
+
+def _iter_frames(data):
+    # Accepts a DataFrame, an Arrow Table/RecordBatch, or any iterable of those
+    if isinstance(data, pd.DataFrame) or hasattr(data, 'to_pandas'):
+        data = [data]
+    for part in data:
+        yield part.to_pandas() if hasattr(part, 'to_pandas') else part
+
+def _column_type(series, declared, dialect):
+    if declared is not None:
+        return declared if isinstance(declared, str) else declared.compile(dialect=dialect)
+    kind = series.dtype.kind
+    sql_type = PANDAS_SQL_TYPES.get(kind, 'TEXT')
+    return sql_type.get(series.dtype.itemsize, 'BIGINT') if isinstance(sql_type, dict) else sql_type
+
+def _copy_frame(cursor, qualified, df):
+    # psycopg2 exposes copy_expert, psycopg 3 exposes copy(); support both drivers
+    cols = ', '.join(f'"{c}"' for c in df.columns)
+    sql = f"COPY {qualified} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_TOKEN}')"
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buf = io.StringIO()
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buf, index=False, header=False, na_rep=NULL_TOKEN)
+        buf.seek(0)
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(sql, buf)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+
+def _append_frame(conn, qualified, df):
+    # DuckDB reads the registered DataFrame directly: no CSV round trip
+    raw = conn.connection.driver_connection
+    cols = ', '.join(f'"{c}"' for c in df.columns)
+    raw.register('__bulk_frame', df)
+    try:
+        raw.execute(f"INSERT INTO {qualified} ({cols}) SELECT {cols} FROM __bulk_frame")
+    finally:
+        raw.unregister('__bulk_frame')
+
+def _embedded(conn):
+    return conn.dialect.name == 'duckdb'
+
+def _transaction(bind):
+    # Engines open their own transaction; a Connection joins the caller's one
+    return bind.begin() if hasattr(bind, 'raw_connection') else nullcontext(bind)
+
+def release_snapshot(conn, qualified, mode='replace', partitions=None, params=None):
+    # Copy-on-write hook for validation snapshots (Validation_engine/pipeline_validation/snapshots.sql):
+    # a table pinned by a snapshot run is moved to validation_archive before it is
+    # replaced ('replace'); before rows are updated in place ('modify') only the date_id
+    # partitions returned by the `partitions` query (all of them when None) are copied there.
+    # No-op without the validation schema.
+    if _embedded(conn):
+        return  # validation snapshots are a Postgres feature
+    installed = conn.execute(text("""
+        SELECT to_regprocedure('validation.release_for_write(text,text,integer[])') IS NOT NULL,
+               to_regprocedure('validation.release_for_write(text,text)') IS NOT NULL
+    """)).first()
+    if installed[1]:  # suite installed before partition copies: whole-table copy
+        released = conn.execute(text("SELECT validation.release_for_write(:t, :m)"), {'t': qualified, 'm': mode}).scalar()
+    elif installed[0]:
+        date_ids = None
+        if mode == 'modify' and partitions is not None:
+            pinned = conn.execute(text("SELECT EXISTS (SELECT 1 FROM validation.snapshot_tables WHERE relid = to_regclass(:t))"),
+                                  {'t': qualified}).scalar()
+            if not pinned:
+                return  # the partition query is only worth running for a pinned table
+            date_ids = sorted({-1 if d is None else int(d) for d in conn.execute(text(partitions), params or {}).scalars()})
+            if not date_ids:
+                return
+        released = conn.execute(text("SELECT validation.release_for_write(:t, :m, CAST(:d AS INTEGER[]))"),
+                                {'t': qualified, 'm': mode, 'd': date_ids}).scalar()
+    else:
+        return
+    if released:
+        print(f"      -> 📌 {qualified}: pinned by a validation snapshot, archived before write")
+
+def _stage(conn, data, staging, dtype, create_sql):
+    # Create the staging table from the first frame's columns, then COPY every frame into it
+    cursor = None if _embedded(conn) else conn.connection.cursor()
+    rows = 0
+    columns = None
+    try:
+        for df in _iter_frames(data):
+            if columns is None:
+                columns = list(df.columns)
+                col_defs = [f'"{c}" {_column_type(df[c], (dtype or {}).get(c), conn.dialect)}' for c in columns]
+                conn.execute(text(create_sql.format(staging=staging, columns=', '.join(col_defs))))
+            if len(df):
+                if cursor is None:
+                    _append_frame(conn, staging, df[columns])
+                else:
+                    _copy_frame(cursor, staging, df[columns])
+                rows += len(df)
+    finally:
+        if cursor is not None:
+            cursor.close()
+    if columns is None:
+        raise ValueError(f"No data frames supplied for {staging}")
+    return rows, columns
+
+def _report(qualified, rows, started):
+    elapsed = max(time.time() - started, 1e-9)
+    print(f"      -> 💾 {qualified}: {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+    rows_file = os.environ.get('OLIST_ROWS_FILE')
+    if rows_file:  # set by scale_factor.run_stage: rows per table this process wrote
+        with open(rows_file, 'a') as f:
+            f.write(f"{qualified}\t{rows}\n")
+    return {'table': qualified, 'rows': rows, 'seconds': round(elapsed, 4), 'rows_per_sec': round(rows / elapsed, 1)}
+
+def write_table(data, table, engine, schema='dwh', dtype=None, indexes=()):
+    # Full replace: COPY into <table>__staging, index it, swap it in atomically.
+    # `engine` may also be an open Connection to join a wider transaction.
+    # `indexes` is a list of column tuples, e.g. [('date_id',), ('date_id', 'channel')]
+    started = time.time()
+    qualified = f"{schema}.{table}"
+    staging = f"{table}__staging"
+
+    with _transaction(engine) as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging}"))
+        rows, _ = _stage(conn, data, f"{schema}.{staging}", dtype, "CREATE TABLE {staging} ({columns})")
+
+        # Indexes are cheaper to build once over the loaded data than to maintain per row.
+        # DuckDB skips them: zone maps already prune date / id ranges, and an indexed
+        # table cannot be renamed (the swap below).
+        index_names = []
+        for cols in (() if _embedded(conn) else indexes):
+            cols = (cols,) if isinstance(cols, str) else tuple(cols)
+            name = f"idx_{table}_{'_'.join(cols)}"
+            conn.execute(text(f"CREATE INDEX {name}__staging ON {schema}.{staging} ({', '.join(cols)})"))
+            index_names.append(name)
+        conn.execute(text(f"ANALYZE {schema}.{staging}"))
+
+        # Atomic swap
+        release_snapshot(conn, qualified, 'replace')
+        conn.execute(text(f"DROP TABLE IF EXISTS {qualified}"))
+        conn.execute(text(f"ALTER TABLE {schema}.{staging} RENAME TO {table}"))
+        for name in index_names:
+            conn.execute(text(f"ALTER INDEX {schema}.{name}__staging RENAME TO {name}"))
+
+    return _report(qualified, rows, started)
+
+def replace_partitions(data, table, engine, predicate, params=None, schema='dwh', dtype=None):
+    # Partition replace: COPY into a temp table, then DELETE the rows matching
+    # `predicate` and INSERT the new ones in the same transaction.
+    started = time.time()
+    qualified = f"{schema}.{table}"
+
+    with _transaction(engine) as conn:
+        # DuckDB keeps temp tables in their own catalog, created with TEMP only
+        if _embedded(conn):
+            staging, create_sql = f"temp.main.{table}__staging", "CREATE TEMP TABLE {staging} ({columns})"
+        else:
+            staging, create_sql = f"pg_temp.{table}__staging", "CREATE TABLE {staging} ({columns})"
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        rows, columns = _stage(conn, data, staging, dtype, create_sql)
+        cols = ', '.join(f'"{c}"' for c in columns)
+        release_snapshot(conn, qualified, 'modify',
+                         partitions=f"SELECT date_id FROM {qualified} WHERE {predicate} UNION SELECT date_id FROM {staging}",
+                         params=params)
+        conn.execute(text(f"DELETE FROM {qualified} WHERE {predicate}"), params or {})
+        conn.execute(text(f"INSERT INTO {qualified} ({cols}) SELECT {cols} FROM {staging}"))
+        conn.execute(text(f"DROP TABLE {staging}"))
+
+    return _report(qualified, rows, started)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# ==========================================
+# CHANNEL DIMENSION (dwh.dim_channel)
+# ==========================================
+# Every marketing channel has a fixed SMALLINT surrogate key. Fact tables
+# (fact_marketing_daily.channel_key, fact_orders / fact_financials.channel_key,
+# the cohort tables) store the key; in memory a channel column is a pandas
+# Categorical over NAMES whose codes *are* the keys, so decoding a key column
+# or encoding a label column is a dtype change, not a string lookup.
+# Keys are fixed here rather than assigned per build: the pipeline, the
+# simulator and exported batches all agree on them.
+# Legacy labels are folded onto one name (the simulator's 'Facebook' was the
+# pipeline's 'Facebook_Ads', ...). Validation snapshots decode keys back to
+# names through dwh.dim_channel (see snapshots.sql).
+
+# key -> (name, is_paid)
+CHANNELS = [
+    ('Unknown', False),               # label lost upstream (chaos missing_pixels)
+    ('Direct/Organic', False),        # order no paid click was attributed to
+    ('Facebook_Ads', True),
+    ('Google_Search', True),
+    ('Influencer_Instagram', True),
+    ('Email_Marketing', True),
+    ('Organic_SEO', False),           # simulated as a channel, never paid for
+]
+NAMES = [name for name, _ in CHANNELS]
+KEYS = {name: key for key, name in enumerate(NAMES)}
+UNKNOWN = KEYS['Unknown']
+DIRECT = KEYS['Direct/Organic']
+
+ALIASES = {
+    'Facebook': 'Facebook_Ads',
+    'Google': 'Google_Search',
+    'Influencer': 'Influencer_Instagram',
+    'Email': 'Email_Marketing',
+}
+
+DTYPE = pd.CategoricalDtype(NAMES)
+
+def normalize(labels):
+    # Channel labels (aliases allowed) -> Categorical over NAMES (NaN stays NaN)
+    if isinstance(labels, (pd.Series, pd.Categorical)) and labels.dtype == DTYPE:
+        return pd.Categorical(labels, dtype=DTYPE)
+    cat = pd.Categorical(np.asarray(labels, dtype=object))
+    found = [ALIASES.get(c, c) for c in cat.categories]
+    unknown = sorted(set(found) - set(KEYS))
+    if unknown:
+        raise ValueError(f"Unknown marketing channel(s) {unknown}, expected one of {NAMES} (see channel_dim.CHANNELS)")
+    lookup = np.array([KEYS[name] for name in found] + [-1], dtype=np.int8)  # code -1 (NaN) -> -1
+    return pd.Categorical.from_codes(lookup[cat.codes], dtype=DTYPE)
+
+def from_keys(keys):
+    # channel_key column (NULL -> NaN) -> Categorical over NAMES
+    k = np.asarray(keys, dtype=float)
+    return pd.Categorical.from_codes(np.where(np.isnan(k), -1, k).astype(np.int8), dtype=DTYPE)
+
+def to_keys(labels):
+    # Channel labels or Categorical -> nullable Int16 keys for a channel_key column
+    codes = normalize(labels).codes
+    return pd.arrays.IntegerArray(codes.astype(np.int16), codes < 0)
+
+def name(key):
+    return NAMES[int(key)] if pd.notna(key) else None
+
+def has_key_column(conn, table, schema='dwh'):
+    # Tables written before dwh.dim_channel carry string channels. information_schema
+    # rather than the SQLAlchemy inspector: DuckDB has no pg_catalog.pg_collation
+    return conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = :schema AND table_name = :table AND column_name = 'channel_key'
+    """), {'schema': schema, 'table': table}).first() is not None
+
+def ensure_table(conn, schema='dwh'):
+    # Created once and upserted, never dropped: snapshot views join it
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.dim_channel (
+            channel_key SMALLINT PRIMARY KEY,
+            channel_name VARCHAR(50) NOT NULL,
+            is_paid BOOLEAN NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {schema}.dim_channel (channel_key, channel_name, is_paid)
+        VALUES (:key, :name, :paid)
+        ON CONFLICT (channel_key) DO UPDATE SET channel_name = EXCLUDED.channel_name, is_paid = EXCLUDED.is_paid
+    """), [{'key': key, 'name': n, 'paid': paid} for key, (n, paid) in enumerate(CHANNELS)])
@@ -0,0 +1,274 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sqlalchemy import text, inspect
+from sqlalchemy.types import Integer, SmallInteger, Float, String
+
+import bulk_writer
+import db_reader
+import channel_dim
+
+# ==========================================
+# CUSTOMER COHORTS & LTV / CAC
+# ==========================================
+# A customer is a dim_customers.customer_unique_id (one person across orders).
+# Customers are mapped to integer keys and grouped into cohorts: month of their
+# first order x the channel that order was attributed to in fact_financials
+# (dwh.dim_channel key, stored as channel_key in every cohort table).
+# Orders become a sparse customers x months matrix; the customers x cohorts
+# one-hot times that matrix gives every cohort x activity-month cell (active
+# customers, orders, revenue, margin, marketing) in one pass.
+#   contribution = net_contribution + acquisition_cost  (order margin before marketing)
+#   LTV = cumulative contribution / cohort size
+#   CAC = cumulative acquisition_cost of the cohort's orders / cohort size
+# Tables: dwh.fact_customer_cohorts (cohort x activity month), dwh.fact_channel_ltv
+# (per acquisition channel), dwh.etl_customer_state (one row per customer).
+# Incremental: when only months after the last processed one land, just those
+# months are read and appended; a change to a processed month rebuilds everything.
+
+COHORT_TABLE = 'fact_customer_cohorts'
+CHANNEL_TABLE = 'fact_channel_ltv'
+STATE_TABLE = 'etl_customer_state'
+
+COHORT_DTYPES = {'cohort_month': Integer(), 'channel_key': SmallInteger(), 'activity_month': Integer(),
+                 'months_since': Integer(), 'cohort_size': Integer(), 'active_customers': Integer(),
+                 'orders': Integer()}
+STATE_DTYPES = {'customer_unique_id': String(), 'cohort_month': Integer(), 'channel_key': SmallInteger(),
+                'first_date_id': Integer(), 'orders': Integer(), 'last_month': Integer()}
+CHANNEL_DTYPES = {'channel_key': SmallInteger(), 'customers': Integer(), 'repeat_customers': Integer(),
+                  'first_cohort': Integer(), 'last_month': Integer(), 'ltv_cac': Float()}
+
+# Order grain (fact_financials is item grain), customer resolved through fact_orders
+Q_ORDERS = """
+    SELECT f.order_id, f.date_id, f.channel_key, c.customer_unique_id,
+           SUM(f.commission_revenue) as revenue,
+           SUM(f.net_contribution + f.acquisition_cost) as contribution,
+           SUM(f.acquisition_cost) as marketing_cost
+    FROM dwh.fact_financials f
+    JOIN (SELECT DISTINCT order_id, customer_id FROM dwh.fact_orders) o ON f.order_id = o.order_id
+    JOIN dwh.dim_customers c ON o.customer_id = c.customer_id
+    WHERE f.date_id >= :from_date_id
+    GROUP BY 1, 2, 3, 4
+"""
+
+def month_index(months):
+    # YYYYMM -> consecutive month number (201712 -> 201801 is +1)
+    months = np.asarray(months, dtype=np.int64)
+    return (months // 100) * 12 + months % 100 - 1
+
+# ==========================================
+# CORE (IN MEMORY)
+# ==========================================
+
+def acquisitions(orders):
+    # First order per customer key -> cohort_month, channel_key, first_date_id, orders, last_month
+    order = np.lexsort((orders['order_id'].astype(str).to_numpy(), orders['date_id'].to_numpy(),
+                        orders['customer_key'].to_numpy()))
+    first = orders.iloc[order].drop_duplicates('customer_key')
+    out = pd.DataFrame({'cohort_month': first['date_id'].to_numpy() // 100,
+                        'channel_key': first['channel_key'].to_numpy(),
+                        'first_date_id': first['date_id'].to_numpy()},
+                       index=first['customer_key'].to_numpy())
+    keys = orders['customer_key'].to_numpy()
+    out['orders'] = np.bincount(keys, minlength=keys.max() + 1)[out.index]
+    out['last_month'] = orders.groupby('customer_key')['date_id'].max().reindex(out.index).to_numpy() // 100
+    return out
+
+def cohort_cells(orders, customer_cohort, cohorts):
+    # orders: customer_key, date_id, revenue, contribution, marketing_cost (one row per order)
+    # customer_cohort: cohort row of every customer key
+    # cohorts: cohort_month, channel_key, cohort_size, prior_contribution, prior_marketing (row = cohort)
+    months, col = np.unique(orders['date_id'].to_numpy() // 100, return_inverse=True)
+    cust = orders['customer_key'].to_numpy()
+    n_cust, n_months = len(customer_cohort), len(months)
+    onehot_t = sparse.csr_matrix((np.ones(n_cust), (customer_cohort, np.arange(n_cust))),
+                                 shape=(len(cohorts), n_cust))
+
+    def per_cell(values):
+        # customers x months (duplicate entries summed) -> cohorts x months
+        m = sparse.csr_matrix((values, (cust, col)), shape=(n_cust, n_months))
+        return (onehot_t @ m).toarray()
+
+    order_counts = sparse.csr_matrix((np.ones(len(cust)), (cust, col)), shape=(n_cust, n_months))
+    active = (onehot_t @ (order_counts > 0).astype(np.float64)).toarray()
+    cells = {'orders': (onehot_t @ order_counts).toarray()}
+    for name in ('revenue', 'contribution', 'marketing_cost'):
+        cells[name] = per_cell(orders[name].to_numpy(dtype=float))
+
+    row, c = np.nonzero(active)  # row-major: sorted by cohort, then month
+    df = pd.DataFrame({
+        'cohort_month': cohorts['cohort_month'].to_numpy()[row],
+        'channel_key': cohorts['channel_key'].to_numpy()[row],
+        'activity_month': months[c],
+        'cohort_size': cohorts['cohort_size'].to_numpy()[row],
+        'active_customers': active[row, c].astype(np.int64),
+        'orders': cells['orders'][row, c].astype(np.int64),
+        **{name: cells[name][row, c] for name in ('revenue', 'contribution', 'marketing_cost')},
+    })
+    df['months_since'] = month_index(df['activity_month']) - month_index(df['cohort_month'])
+    df['retention_rate'] = df['active_customers'] / df['cohort_size']
+    df['cumulative_contribution'] = df.groupby(row)['contribution'].cumsum().to_numpy() + cohorts['prior_contribution'].to_numpy()[row]
+    df['cumulative_marketing'] = df.groupby(row)['marketing_cost'].cumsum().to_numpy() + cohorts['prior_marketing'].to_numpy()[row]
+    df['ltv'] = df['cumulative_contribution'] / df['cohort_size']
+    df['cac'] = df['cumulative_marketing'] / df['cohort_size']
+    df['ltv_cac'] = df['cumulative_contribution'] / df['cumulative_marketing'].where(df['cumulative_marketing'] > 0)
+    return df
+
+def channel_ltv(state, cells):
+    # state: one row per customer; cells: every cohort x month cell -> one row per acquisition channel
+    s = state.assign(repeat=state['orders'] > 1).groupby('channel_key').agg(
+        customers=('repeat', 'size'), repeat_customers=('repeat', 'sum'))
+    c = cells.groupby('channel_key').agg(first_cohort=('cohort_month', 'min'), last_month=('activity_month', 'max'),
+                                                 revenue=('revenue', 'sum'), contribution=('contribution', 'sum'),
+                                                 marketing_cost=('marketing_cost', 'sum'))
+    df = s.join(c, how='left').reset_index()
+    df['repeat_rate'] = df['repeat_customers'] / df['customers']
+    df['ltv'] = df['contribution'] / df['customers']
+    df['cac'] = df['marketing_cost'] / df['customers']
+    df['ltv_cac'] = df['contribution'] / df['marketing_cost'].where(df['marketing_cost'] > 0)
+    return df
+
+# ==========================================
+# PERSISTENCE
+# ==========================================
+
+def _last_month(engine, schema):
+    inspector = inspect(engine)
+    if not all(inspector.has_table(t, schema=schema) for t in (COHORT_TABLE, STATE_TABLE)):
+        return None
+    with engine.connect() as conn:
+        if not channel_dim.has_key_column(conn, STATE_TABLE, schema):
+            return None  # written before dwh.dim_channel: rebuilt
+        return conn.execute(text(f"SELECT MAX(activity_month) FROM {schema}.{COHORT_TABLE}")).scalar()
+
+def _load_orders(engine, from_month):
+    df = db_reader.read_frame(Q_ORDERS, engine, {'from_date_id': int(from_month) * 100})
+    keys, ids = pd.factorize(df['customer_unique_id'].astype(str), sort=False)
+    df['customer_key'] = keys.astype(np.int32)
+    df['channel_key'] = df['channel_key'].fillna(channel_dim.UNKNOWN).astype(np.int16)  # unattributed -> 'Unknown'
+    return df, np.asarray(ids, dtype=object)
+
+def _cohort_rows(acq, prior=None):
+    # Distinct (cohort_month, channel) of the batch's customers, with sizes / prior totals
+    pairs = acq[['cohort_month', 'channel_key']]
+    cohorts = pairs.drop_duplicates().sort_values(['cohort_month', 'channel_key']).reset_index(drop=True)
+    sizes = pairs.value_counts().rename('cohort_size')
+    cohorts = cohorts.join(sizes, on=['cohort_month', 'channel_key'])
+    cohorts['prior_contribution'] = 0.0
+    cohorts['prior_marketing'] = 0.0
+    if prior is not None and len(prior):
+        # Cohorts acquired before this batch keep their stored size and running totals
+        p = prior.set_index(['cohort_month', 'channel_key'])
+        idx = pd.MultiIndex.from_frame(cohorts[['cohort_month', 'channel_key']])
+        known = idx.isin(p.index)
+        for col in ('cohort_size', 'prior_contribution', 'prior_marketing'):
+            cohorts.loc[known, col] = p.loc[idx[known], col].to_numpy()
+    row = pd.MultiIndex.from_frame(cohorts[['cohort_month', 'channel_key']]).get_indexer(
+        pd.MultiIndex.from_frame(pairs))
+    return cohorts, row
+
+def build(orders, ids):
+    # Every cohort from scratch -> (cells, state)
+    acq = acquisitions(orders)
+    cohorts, row = _cohort_rows(acq)
+    customer_cohort = np.empty(len(ids), dtype=np.int64)
+    customer_cohort[acq.index] = row
+    cells = cohort_cells(orders, customer_cohort, cohorts)
+    return cells, acq.assign(customer_unique_id=ids[acq.index])[list(STATE_DTYPES)]
+
+def extend(orders, ids, known, prior):
+    # New months only -> (cells of those months, state rows of their customers).
+    # known: stored state of the batch's returning customers; prior: stored cohort sizes / running totals.
+    # Returning customers keep their cohort; first orders in the new months open new cohorts.
+    acq = acquisitions(orders)
+    keys = pd.Index(ids).get_indexer(known['customer_unique_id'])
+    for col in ('cohort_month', 'channel_key', 'first_date_id'):
+        # Stored state comes back int64, the batch keeps the driver's width (INTEGER -> int32)
+        acq.loc[keys, col] = known[col].to_numpy().astype(acq[col].dtype)
+    acq.loc[keys, 'orders'] += known['orders'].to_numpy().astype(acq['orders'].dtype)
+    cohorts, row = _cohort_rows(acq, prior)
+    customer_cohort = np.empty(len(ids), dtype=np.int64)
+    customer_cohort[acq.index] = row
+    cells = cohort_cells(orders, customer_cohort, cohorts)
+    return cells, acq.assign(customer_unique_id=ids[acq.index])[list(STATE_DTYPES)]
+
+def rebuild(engine, schema='dwh', verbose=True):
+    started = time.time()
+    orders, ids = _load_orders(engine, 0)
+    if orders.empty:
+        print("      -> Cohorts: no financial rows yet")
+        return None
+    cells, state = build(orders, ids)
+    channels = channel_ltv(state, cells)
+
+    with engine.begin() as conn:
+        bulk_writer.write_table(cells.round(4), COHORT_TABLE, conn, schema=schema, dtype=COHORT_DTYPES,
+                                indexes=[('cohort_month', 'channel_key'), ('activity_month',)])
+        bulk_writer.write_table(state, STATE_TABLE, conn, schema=schema, dtype=STATE_DTYPES, indexes=[('customer_unique_id',)])
+        bulk_writer.write_table(channels.round(4), CHANNEL_TABLE, conn, schema=schema, dtype=CHANNEL_DTYPES)
+    if verbose:
+        report(channels, f"rebuilt ({len(state):,} customers, {cells['cohort_month'].nunique():,} months) in {time.time() - started:.2f}s")
+    return channels
+
+def append(engine, from_month, schema='dwh', verbose=True):
+    # Months >= from_month are new: read only them, extend the stored cohorts
+    started = time.time()
+    orders, ids = _load_orders(engine, from_month)
+    if orders.empty:
+        return None
+    qs, qc = f"{schema}.{STATE_TABLE}", f"{schema}.{COHORT_TABLE}"
+    known = pd.read_sql(text(f"SELECT * FROM {qs} WHERE customer_unique_id = ANY(:ids)"), engine,
+                        params={'ids': list(ids)})
+    prior = pd.read_sql(text(f"""
+        SELECT s.cohort_month, s.channel_key, s.cohort_size,
+               COALESCE(c.contribution, 0) as prior_contribution, COALESCE(c.marketing_cost, 0) as prior_marketing
+        FROM (SELECT cohort_month, channel_key, COUNT(*) as cohort_size FROM {qs} GROUP BY 1, 2) s
+        LEFT JOIN (SELECT cohort_month, channel_key, SUM(contribution) as contribution,
+                          SUM(marketing_cost) as marketing_cost FROM {qc} GROUP BY 1, 2) c
+            ON s.cohort_month = c.cohort_month AND s.channel_key = c.channel_key
+    """), engine)
+
+    cells, state = extend(orders, ids, known, prior)
+
+    months = sorted(int(m) for m in cells['activity_month'].unique())
+    with engine.begin() as conn:
+        bulk_writer.replace_partitions(cells.round(4), COHORT_TABLE, conn, "activity_month = ANY(:months)",
+                                       {'months': months}, schema=schema, dtype=COHORT_DTYPES)
+        bulk_writer.replace_partitions(state, STATE_TABLE, conn, "customer_unique_id = ANY(:ids)",
+                                       {'ids': list(state['customer_unique_id'])}, schema=schema, dtype=STATE_DTYPES)
+        # Per-channel totals are small: recomputed from the stored tables
+        all_state = pd.read_sql(text(f"SELECT channel_key, orders FROM {qs}"), conn)
+        all_cells = pd.read_sql(text(f"SELECT * FROM {qc}"), conn)
+        channels = channel_ltv(all_state, all_cells)
+        bulk_writer.write_table(channels.round(4), CHANNEL_TABLE, conn, schema=schema, dtype=CHANNEL_DTYPES)
+    if verbose:
+        report(channels, f"appended months {months[0]}-{months[-1]} ({len(state):,} customers) in {time.time() - started:.2f}s")
+    return channels
+
+def update(engine, months=None, schema='dwh', rebuild_all=False, verbose=True):
+    # months: activity months (YYYYMM) whose facts changed; None -> everything after the last processed month
+    last = None if rebuild_all else _last_month(engine, schema)
+    if last is None or (months is not None and len(months) and min(months) <= last):
+        return rebuild(engine, schema, verbose)  # first run, or a processed month changed
+    from_month = min(months) if months is not None and len(months) else last + 1
+    return append(engine, from_month, schema, verbose)
+
+def report(channels, summary):
+    print(f"      -> Cohorts {summary}")
+    for row in channels.sort_values('customers', ascending=False).itertuples():
+        ratio = f"{row.ltv_cac:.2f}" if pd.notna(row.ltv_cac) else "n/a"
+        print(f"         {channel_dim.name(row.channel_key):<20} {row.customers:>7,} customers | repeat {row.repeat_rate:.1%} "
+              f"| LTV {row.ltv:,.2f} | CAC {row.cac:,.2f} | LTV/CAC {ratio}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer cohorts and LTV/CAC per acquisition channel.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every cohort from fact_financials")
+    args = parser.parse_args()
+
+    import db_config
+    update(db_config.get_engine(), rebuild_all=args.rebuild)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import os
+
+project_root = os.path.dirname(os.path.abspath(__file__))
 
 # ==========================================
 # 🏠 LOCAL SETTINGS
@@ -7,17 +9,73 @@ DB_CONFIG = {
     "host": "localhost",
     "user": "postgres",
     "pass": "postgres",       
-    "db":   "olist_engine_db" 
+    "db":   os.environ.get("OLIST_DB_NAME", "olist_engine_db")  # override for scratch DBs (e.g. scale_factor.py)
 }
 
+# ==========================================
+# BACKEND
+# ==========================================
+# 'postgres' (default): the server above.
+# 'duckdb': embedded, file-based engine (no server, no network) for dev runs and
+#           CI benchmarks. One file per DB name (<project>/<db>.duckdb unless
+#           OLIST_DUCKDB_PATH is set); Postgres-only SQL is rewritten by sql_dialect.
+#           Needs the duckdb_engine package. One process writes the file at a time.
+BACKEND = os.environ.get("OLIST_DB_BACKEND", "postgres").lower()
+if BACKEND not in ("postgres", "duckdb"):
+    raise ValueError(f"OLIST_DB_BACKEND must be 'postgres' or 'duckdb', got '{BACKEND}'")
+
+DUCKDB_PATH = os.environ.get("OLIST_DUCKDB_PATH", os.path.join(project_root, f"{DB_CONFIG['db']}.duckdb"))
+
 # ==========================================
 #  ENGINE BUILDER
 # ==========================================
-print(f"🏠 CONNECTING TO LOCAL DB: {DB_CONFIG['db']}")
+if BACKEND == "duckdb":
+    db_url = f"duckdb:///{DUCKDB_PATH}"
+else:
+    db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['pass']}@{DB_CONFIG['host']}:5432/{DB_CONFIG['db']}"
 
-db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['pass']}@{DB_CONFIG['host']}:5432/{DB_CONFIG['db']}"
+# Built on first use: importing db_config stays cheap (no SQLAlchemy / driver import)
+_engine = None
 
-engine = create_engine(db_url)
+def is_embedded():
+    return BACKEND == "duckdb"
 
 def get_engine():
-    return engine
\ No newline at end of file
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+        if is_embedded():
+            import sql_dialect
+            print(f"🦆 OPENING EMBEDDED DB: {DUCKDB_PATH}")
+            _engine = sql_dialect.install(create_engine(db_url))
+        else:
+            print(f"🏠 CONNECTING TO LOCAL DB: {DB_CONFIG['db']}")
+            _engine = create_engine(db_url)
+    return _engine
+
+def ensure_database():
+    # Creates the configured database when missing -> True if it was created.
+    # The embedded file is created by its first connection.
+    if is_embedded():
+        existed = os.path.exists(DUCKDB_PATH)
+        os.makedirs(os.path.dirname(DUCKDB_PATH) or ".", exist_ok=True)
+        get_engine().connect().close()
+        return not existed
+
+    from sqlalchemy import create_engine, text
+    admin = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['pass']}@{DB_CONFIG['host']}:5432/postgres",
+                          isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            if conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :db"), {'db': DB_CONFIG['db']}).scalar():
+                return False
+            conn.execute(text(f"CREATE DATABASE {DB_CONFIG['db']}"))
+            return True
+    finally:
+        admin.dispose()
+
+def __getattr__(name):
+    # Legacy access: db_config.engine
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module 'db_config' has no attribute '{name}'")
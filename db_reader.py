@@ -0,0 +1,214 @@
+import io
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # Arrow is optional: fall back to pandas reads
+    pa = None
+
+# ==========================================
+# TYPED READ PATH (DRIVER COLUMNAR -> ARROW -> COMPACT PANDAS)
+# ==========================================
+# Replacement for plain pd.read_sql on the large loads. Result sets never pass
+# through per-row Python tuples:
+#   duckdb   -> the driver's own Arrow record batch reader
+#   postgres -> COPY (query) TO STDOUT as CSV, streamed into Arrow's C++ CSV
+#               reader while the server sends it (column types from the result
+#               description), so the raw CSV is never held in memory
+# IDs / labels are dictionary-encoded and handed to pandas as categoricals.
+# Other drivers (or no pyarrow) fall back to pd.read_sql.
+# Integers keep the database width unless the caller names them in `narrow`
+# (date_id, keys, counts at the pipeline / simulator call sites): a narrowed
+# column written back or merged must be one the caller expects as int8-int32.
+# Money stays float64: narrowing it to float32 would move daily P&L sums by cents.
+
+FETCH_ROWS = 50000
+NULL_TOKEN = '\\N'
+
+# IDs and low-cardinality labels -> pandas categoricals
+CATEGORICAL_COLUMNS = {
+    'order_id', 'seller_id', 'customer_id', 'product_id', 'main_product_id',
+    'marketing_channel', 'channel', 'order_status', 'seller_state', 'category', 'day_name',
+}
+
+INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+# Postgres type OIDs read as text by COPY (the CSV reader must not infer them:
+# an all-digit ID column would come back as int64)
+PG_TEXT_OIDS = {25, 1042, 1043, 19}       # text, bpchar, varchar, name
+PG_TIMESTAMP_OIDS = {1082, 1114}          # date, timestamp
+PG_BOOL_OID = 16                          # COPY writes t / f
+
+def _narrow_int(series):
+    # Smallest signed integer dtype that holds the column's range
+    if series.empty:
+        return series
+    lo, hi = series.min(), series.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return series.astype(dtype)
+    return series
+
+def _is_text(arrow_type):
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type) or pa.types.is_string_view(arrow_type)
+
+def _pg_arrow_type(oid):
+    if oid in PG_TEXT_OIDS:
+        return pa.string()
+    if oid in PG_TIMESTAMP_OIDS:
+        return pa.timestamp('us')
+    if oid == PG_BOOL_OID:
+        return pa.bool_()
+    return None  # numbers: inferred by the CSV reader
+
+def _normalize_batch(batch, categoricals):
+    # Decimals -> float64, labels -> dictionary arrays
+    arrays = []
+    for name, arr in zip(batch.schema.names, batch.columns):
+        if pa.types.is_decimal(arr.type):
+            arr = arr.cast(pa.float64())
+        elif name in categoricals and _is_text(arr.type):
+            arr = pc.dictionary_encode(arr)
+        arrays.append(arr)
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+def _duckdb_batches(conn, query, params, batch_rows):
+    result = conn.execute(text(query), params or {})
+    cursor = result.cursor  # duckdb_engine wraps the DuckDB connection: the result is still unfetched
+    reader = cursor.to_arrow_reader(batch_rows) if hasattr(cursor, 'to_arrow_reader') else cursor.fetch_record_batch(batch_rows)
+    return list(reader.schema.names), iter(reader)
+
+class _ChunkReader(io.RawIOBase):
+    # File-like view over an iterator of byte chunks (psycopg 3 COPY output)
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk).cast('B')
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+@contextmanager
+def _copy_out(cursor, sql):
+    # COPY ... TO STDOUT as a file the CSV reader consumes while the server is still sending.
+    # psycopg 3 iterates the copy; psycopg2 only writes into a file, so it runs in a thread
+    # feeding a pipe
+    if not hasattr(cursor, 'copy_expert'):
+        with cursor.copy(sql) as copy:
+            yield io.BufferedReader(_ChunkReader(iter(copy)), 1 << 20)
+        return
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def pump():
+        try:
+            with os.fdopen(write_fd, 'wb') as sink:
+                cursor.copy_expert(sql, sink)
+        except Exception as e:  # re-raised in the reading thread
+            errors.append(e)
+
+    thread = threading.Thread(target=pump, daemon=True)
+    thread.start()
+    source = os.fdopen(read_fd, 'rb')
+    try:
+        yield source
+    finally:
+        source.close()  # a reader that stops early breaks the pipe, which ends the COPY
+        thread.join()
+    if errors:
+        raise errors[0]
+
+def _client_cursor(conn):
+    # A cursor that renders bound parameters client-side (COPY takes none):
+    # psycopg2's own, psycopg 3's ClientCursor. None for other drivers
+    cursor = conn.connection.cursor()
+    if hasattr(cursor, 'mogrify'):
+        return cursor
+    cursor.close()
+    if conn.dialect.driver != 'psycopg':
+        return None
+    import psycopg
+    return psycopg.ClientCursor(conn.connection.driver_connection)
+
+def _read_copy(cursor, sql, types, batch_rows):
+    try:
+        with _copy_out(cursor, f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{NULL_TOKEN}')") as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=max(1 << 20, batch_rows * 64)),
+                convert_options=pa_csv.ConvertOptions(column_types={k: v for k, v in types.items() if v is not None},
+                                                      null_values=[NULL_TOKEN], strings_can_be_null=True,
+                                                      quoted_strings_can_be_null=False,
+                                                      true_values=['t'], false_values=['f']))
+            yield from reader
+    finally:
+        cursor.close()
+
+def _postgres_batches(conn, query, params, batch_rows):
+    # Bound parameters are rendered client-side, types come from a LIMIT 0 probe
+    cursor = _client_cursor(conn)
+    if cursor is None:
+        return None
+    try:
+        compiled = text(query).compile(dialect=conn.dialect)
+        sql = cursor.mogrify(compiled.string, compiled.construct_params(params or {}))
+        sql = sql.decode() if isinstance(sql, bytes) else sql
+        cursor.execute(f"SELECT * FROM ({sql}) q LIMIT 0")
+        columns = [d[0] for d in cursor.description]
+        types = {d[0]: _pg_arrow_type(d[1]) for d in cursor.description}
+    except Exception:
+        cursor.close()
+        raise
+    return columns, _read_copy(cursor, sql, types, batch_rows)
+
+def _batches(conn, query, params, batch_rows):
+    if conn.dialect.name == 'duckdb':
+        return _duckdb_batches(conn, query, params, batch_rows)
+    if conn.dialect.name == 'postgresql':
+        return _postgres_batches(conn, query, params, batch_rows)
+    return None
+
+def _compact(df, categoricals, narrow):
+    for col in df.columns:
+        if col in narrow and df[col].dtype.kind in 'iu':
+            df[col] = _narrow_int(df[col])
+        elif col in categoricals and not isinstance(df[col].dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype('category')
+    return df
+
+def read_frame(query, engine, params=None, batch_rows=FETCH_ROWS, categoricals=CATEGORICAL_COLUMNS, narrow=()):
+    # Drop-in for pd.read_sql(text(query), engine, params=params) with compact dtypes.
+    # narrow: integer columns the caller wants in the smallest dtype that fits
+    if pa is None:
+        df = pd.read_sql(text(query), engine, params=params or {})
+        return _compact(df, categoricals, narrow)
+
+    with engine.connect() as conn:
+        source = _batches(conn, query, params, batch_rows)
+        if source is None:
+            return _compact(pd.read_sql(text(query), conn, params=params or {}), categoricals, narrow)
+        columns, batches = source
+        batches = [_normalize_batch(b, categoricals) for b in batches]
+    if not batches:
+        return pd.DataFrame(columns=columns)
+
+    table = pa.Table.from_batches(batches).unify_dictionaries().combine_chunks()
+    return _compact(table.to_pandas(), categoricals, narrow)
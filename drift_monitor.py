@@ -0,0 +1,206 @@
+import argparse
+import bisect
+import time
+import pandas as pd
+from sqlalchemy import text, inspect
+from sqlalchemy.types import Integer, Float, Boolean, String
+
+import bulk_writer
+
+# ==========================================
+# INCREMENTAL DRIFT MONITOR (SPEND vs CAC)
+# ==========================================
+# Streaming counterpart of validation.violation_financial_drift_analysis and
+# validation.violation_physics_rolling_mass_balance. Each day keeps its platform
+# spend (fed by 03) and ledger CAC (fed by 05); when a side lands, the day's
+# drift, its 7-day rolling drift (7 rows, as the view's window) and those of the
+# next 6 days are recomputed: O(1) per day instead of re-joining the history.
+# A day is classified once both sides have reported (see
+# Validation_engine/docs/financial_drift_taxonomy.md).
+# State lives in dwh.etl_drift_state, one row per date_id.
+
+WINDOW = 7
+NOISE_LIMIT = 1.0        # |drift| below -> Rounding Noise
+REPORT_LIMIT = 0.01      # |drift| above -> reported drift (view WHERE clause)
+HIGH_IMPACT = 1000       # |drift| above -> High Impact
+ROLLING_LIMIT = 500      # |rolling 7d drift| above -> mass balance breach
+
+STATE_TABLE = 'etl_drift_state'
+STATE_COLUMNS = ['date_id', 'platform_spend', 'ledger_cost', 'has_spend', 'has_cost', 'drift_amount',
+                 'rolling_7d_drift', 'drift_category', 'monetary_severity', 'rolling_breach']
+STATE_DTYPES = {'date_id': Integer(), 'platform_spend': Float(), 'ledger_cost': Float(), 'has_spend': Boolean(),
+                'has_cost': Boolean(), 'drift_amount': Float(), 'rolling_7d_drift': Float(),
+                'drift_category': String(), 'monetary_severity': String(), 'rolling_breach': Boolean()}
+
+# Taxonomy action per category
+ACTIONS = {
+    'Rounding Noise': "Ignore",
+    'Unallocated Waste (Critical)': "Accept as loss, not as attribution error",
+    'Phantom Cost (Critical)': "Investigate immediately",
+    'Allocation Logic Error': "Revoke downstream metrics",
+}
+
+def classify(platform_spend, ledger_cost):
+    # -> (drift_amount, drift_category, monetary_severity); same CASE as the drift view
+    drift = platform_spend - ledger_cost
+    if abs(drift) < NOISE_LIMIT:
+        category = 'Rounding Noise'
+    elif platform_spend > 0 and ledger_cost == 0:
+        category = 'Unallocated Waste (Critical)'
+    elif platform_spend == 0 and ledger_cost > 0:
+        category = 'Phantom Cost (Critical)'
+    else:
+        category = 'Allocation Logic Error'
+    severity = 'High Impact' if abs(drift) > HIGH_IMPACT else 'Low Impact'
+    return drift, category, severity
+
+class DriftMonitor:
+    def __init__(self, rows=()):
+        self.dates = []   # sorted date_ids
+        self.days = {}    # date_id -> state row (dict)
+        for row in rows:
+            self.days[row['date_id']] = dict(row)
+            self.dates.append(row['date_id'])
+        self.dates.sort()
+        self.pos = {d: i for i, d in enumerate(self.dates)}
+        self.touched = set()
+
+    def _slot(self, date_id):
+        if date_id in self.pos:
+            return self.pos[date_id]
+        if not self.dates or date_id > self.dates[-1]:
+            self.dates.append(date_id)  # the normal case: a new day appended at the end
+            self.pos[date_id] = len(self.dates) - 1
+        else:
+            i = bisect.bisect(self.dates, date_id)  # backfill: shift the positions after it
+            self.dates.insert(i, date_id)
+            for j in range(i, len(self.dates)):
+                self.pos[self.dates[j]] = j
+        self.days[date_id] = {'date_id': date_id, 'platform_spend': 0.0, 'ledger_cost': 0.0,
+                              'has_spend': False, 'has_cost': False, 'drift_amount': 0.0, 'rolling_7d_drift': 0.0,
+                              'drift_category': None, 'monetary_severity': None, 'rolling_breach': False}
+        return self.pos[date_id]
+
+    def _refresh(self, i):
+        day = self.days[self.dates[i]]
+        window = self.dates[max(0, i - WINDOW + 1):i + 1]
+        day['rolling_7d_drift'] = sum(self.days[d]['platform_spend'] - self.days[d]['ledger_cost'] for d in window)
+        day['rolling_breach'] = abs(day['rolling_7d_drift']) > ROLLING_LIMIT
+        if day['has_spend'] and day['has_cost']:
+            day['drift_amount'], day['drift_category'], day['monetary_severity'] = \
+                classify(day['platform_spend'], day['ledger_cost'])
+        self.touched.add(day['date_id'])
+
+    def update(self, date_id, spend=None, cost=None):
+        # New value(s) for one day -> landed day rows whose drift / rolling drift changed
+        i = self._slot(date_id)
+        day = self.days[date_id]
+        if spend is not None:
+            day['platform_spend'], day['has_spend'] = float(spend), True
+        if cost is not None:
+            day['ledger_cost'], day['has_cost'] = float(cost), True
+        events = []
+        for j in range(i, min(i + WINDOW, len(self.dates))):
+            self._refresh(j)
+            d = self.days[self.dates[j]]
+            if d['drift_category'] is not None:
+                events.append(self.event(d))
+        return events
+
+    def event(self, day):
+        return {**day, 'reported': abs(day['drift_amount']) > REPORT_LIMIT,
+                'action': ACTIONS.get(day['drift_category'])}
+
+    def frame(self, date_ids=None):
+        ids = self.dates if date_ids is None else sorted(date_ids)
+        return pd.DataFrame([self.days[d] for d in ids], columns=STATE_COLUMNS)
+
+# ==========================================
+# PERSISTENCE (dwh.etl_drift_state)
+# ==========================================
+
+def load(engine, date_ids, schema='dwh'):
+    # State of the given dates plus their WINDOW-1 neighbours on each side (index range reads)
+    if not inspect(engine).has_table(STATE_TABLE, schema=schema) or not len(date_ids):
+        return DriftMonitor()
+    qualified = f"{schema}.{STATE_TABLE}"
+    params = {'lo': int(min(date_ids)), 'hi': int(max(date_ids)), 'n': WINDOW - 1}
+    df = pd.read_sql(text(f"""
+        (SELECT * FROM {qualified} WHERE date_id < :lo ORDER BY date_id DESC LIMIT :n)
+        UNION ALL
+        (SELECT * FROM {qualified} WHERE date_id BETWEEN :lo AND :hi)
+        UNION ALL
+        (SELECT * FROM {qualified} WHERE date_id > :hi ORDER BY date_id LIMIT :n)
+    """), engine, params=params)
+    return DriftMonitor(df[STATE_COLUMNS].to_dict('records'))
+
+def save(engine, monitor, schema='dwh'):
+    if not monitor.touched:
+        return
+    df = monitor.frame(monitor.touched)
+    if inspect(engine).has_table(STATE_TABLE, schema=schema):
+        bulk_writer.replace_partitions(df, STATE_TABLE, engine, "date_id = ANY(:date_ids)",
+                                       {'date_ids': [int(d) for d in df['date_id']]}, schema=schema, dtype=STATE_DTYPES)
+    else:
+        bulk_writer.write_table(df, STATE_TABLE, engine, schema=schema, dtype=STATE_DTYPES, indexes=[('date_id',)])
+    monitor.touched = set()
+
+def report(events, limit=10):
+    # Console summary of what landed: categories, breaches and the critical days
+    landed = pd.DataFrame(events).drop_duplicates('date_id', keep='last') if events else pd.DataFrame()
+    if landed.empty:
+        print("      -> Drift: no day has both spend and CAC yet")
+        return landed
+    drift = landed[landed['reported']]
+    counts = drift['drift_category'].value_counts().to_dict()
+    print(f"      -> Drift: {len(landed):,} days landed | " + (", ".join(f"{k}: {v}" for k, v in counts.items()) or "no drift")
+          + f" | 7d breaches: {int(landed['rolling_breach'].sum()):,}")
+    critical = drift[drift['drift_category'].str.contains('Critical') | (drift['monetary_severity'] == 'High Impact')]
+    for _, row in critical.head(limit).iterrows():
+        print(f"         ⚠️  {row['date_id']}: {row['drift_category']} ({row['monetary_severity']}) "
+              f"drift {row['drift_amount']:,.2f} -> {row['action']}")
+    if len(critical) > limit:
+        print(f"         ... {len(critical) - limit:,} more")
+    return landed
+
+def record(engine, spend=None, cost=None, schema='dwh', verbose=True):
+    # spend / cost: Series indexed by date_id (03 daily platform spend, 05 daily ledger CAC)
+    started = time.time()
+    spend = pd.Series(dtype=float) if spend is None else spend
+    cost = pd.Series(dtype=float) if cost is None else cost
+    date_ids = sorted(set(spend.index) | set(cost.index))
+    monitor = load(engine, date_ids, schema)
+    events = []
+    for d in date_ids:
+        events.extend(monitor.update(int(d), spend=spend.get(d), cost=cost.get(d)))
+    save(engine, monitor, schema)
+    landed = report(events) if verbose else None
+    if verbose:
+        print(f"      -> Drift state updated for {len(date_ids):,} days in {time.time() - started:.2f}s")
+    return landed
+
+def rebuild(engine, schema='dwh'):
+    # One-off: seed the state from the current facts (both sides at once)
+    spend = pd.read_sql(f"SELECT date_id, SUM(spend) as v FROM {schema}.fact_marketing_daily GROUP BY 1", engine).set_index('date_id')['v']
+    cost = pd.read_sql(f"SELECT date_id, SUM(acquisition_cost) as v FROM {schema}.fact_financials GROUP BY 1", engine).set_index('date_id')['v']
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{STATE_TABLE}"))
+    # Days seen by only one side have a 0 on the other, as in the view's FULL OUTER JOIN
+    dates = spend.index.union(cost.index)
+    return record(engine, spend.reindex(dates, fill_value=0.0), cost.reindex(dates, fill_value=0.0), schema)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling spend vs CAC drift state (dwh.etl_drift_state).")
+    parser.add_argument("--rebuild", action="store_true", help="Re-seed the state from fact_marketing_daily / fact_financials")
+    parser.add_argument("--tail", type=int, default=14, help="Show the last N days")
+    args = parser.parse_args()
+
+    import db_config
+    engine = db_config.get_engine()
+    if args.rebuild:
+        rebuild(engine)
+    df = pd.read_sql(text(f"SELECT * FROM dwh.{STATE_TABLE} ORDER BY date_id DESC LIMIT :n"), engine, params={'n': args.tail})
+    print(df.iloc[::-1].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
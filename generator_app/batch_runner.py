@@ -0,0 +1,103 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ==========================================
+# SETUP
+# ==========================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+sys.path.append(project_root)
+
+# ==========================================
+# SCENARIO GRID BATCH GENERATOR
+# ==========================================
+# Runs a grid of (market difficulty x data quality x seed) scenarios across a
+# process pool. The world context is prepared once in the parent as a
+# memory-mapped snapshot; every worker maps the same files read-only, so the OS
+# page cache shares one copy between all processes and workers never touch the DB.
+# Each scenario writes to its own folder; the shared DWH folder is not updated.
+
+MARKETS = ["Easy", "Medium", "Hard"]
+DATA_LEVELS = ["Clean", "Messy", "Nightmare"]
+
+def build_grid(name, markets, data_levels, seeds=(None,), output_root="Training_Output"):
+    grid = []
+    for market, data, seed in itertools.product(markets, data_levels, seeds):
+        folder = f"{name}_M-{market}_D-{data}" + (f"_S-{seed}" if seed is not None else "")
+        grid.append({'market': market, 'data': data, 'seed': seed, 'folder': os.path.join(output_root, folder)})
+    return grid
+
+def run_scenario(spec):
+    # Worker entry point (top level so it pickles under spawn as well as fork)
+    # Engine chatter goes to <folder>/run.log instead of interleaving on the console
+    started = time.time()
+    os.makedirs(spec['folder'], exist_ok=True)
+    try:
+        with open(os.path.join(spec['folder'], "run.log"), "w", encoding="utf-8") as log, redirect_stdout(log):
+            from training_engine import OlistMasterEngineV5
+            sim = OlistMasterEngineV5(difficulty=spec['market'], output_folder=spec['folder'],
+                                      offline=True, data_quality=spec['data'], seed=spec['seed'])
+            sim.load_context()
+            sim.simulate_marketing()
+            sim.run_attribution_engine()
+            sim.calculate_financials()
+            sim.export(update_dwh=False)
+        return {**spec, 'status': 'ok', 'seconds': round(time.time() - started, 2)}
+    except Exception as e:
+        return {**spec, 'status': 'failed', 'seconds': round(time.time() - started, 2),
+                'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()}
+
+def run_grid(grid, workers=None):
+    # Build / validate the shared context snapshot once, before any worker starts
+    import db_config
+    import context_snapshot
+    context_snapshot.load_or_build(db_config.get_engine())
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    print(f"🧮 Running {len(grid)} scenarios on {workers} workers...")
+    started = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_scenario, spec): spec for spec in grid}
+        for done, future in enumerate(as_completed(futures), 1):
+            res = future.result()
+            results.append(res)
+            icon = "✅" if res['status'] == 'ok' else "❌"
+            print(f"   {icon} [{done}/{len(grid)}] {res['folder']} ({res['seconds']:.1f}s)" +
+                  (f" -> {res['error']}" if res['status'] != 'ok' else ""))
+
+    failed = sum(r['status'] != 'ok' for r in results)
+    print(f"🏁 Grid finished in {time.time() - started:.1f}s | {len(results) - failed} ok, {failed} failed")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a grid of training datasets in parallel.")
+    parser.add_argument("--name", default="Batch", help="Scenario name prefix")
+    parser.add_argument("--market", nargs="+", default=MARKETS, choices=MARKETS)
+    parser.add_argument("--data", nargs="+", default=DATA_LEVELS, choices=DATA_LEVELS)
+    parser.add_argument("--seeds", nargs="+", type=int, default=None,
+                        help="Explicit seeds (default: the difficulty's built-in seed)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="Training_Output", help="Root folder for the batch folders")
+    args = parser.parse_args()
+
+    grid = build_grid(args.name, args.market, args.data, args.seeds or (None,), args.out)
+    results = run_grid(grid, args.workers)
+
+    os.makedirs(args.out, exist_ok=True)
+    summary_path = os.path.join(args.out, f"{args.name}_grid_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"📄 Summary: {summary_path}")
+    sys.exit(1 if any(r['status'] != 'ok' for r in results) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import os
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# CHAOS INJECTION LAYER (VECTORIZED, CHUNK-STREAMING)
+# ==========================================
+# Data-quality faults as composable column transforms. A pipeline is a list of
+# (transform name, kwargs) steps applied in order to each chunk of a table:
+#   missing_pixels  -> channel label lost ('Unknown')
+#   api_outage      -> every row of a multi-day outage window dropped
+#   duplicate_rows  -> rows delivered twice
+#   late_arrival    -> rows booked 1..max_lag days after they happened
+#   currency_noise  -> money in cents, in USD, or truncated to whole units
+# Each step draws from its own generator seeded by (seed, table, step index,
+# chunk index), so adding or tuning one transform never shifts another's draws
+# and two tables run through the same profile never share a draw sequence.
+# Outage windows are a pure function of (seed, step, date), so they line up
+# across chunks no matter how a table is split.
+
+MONEY_COLUMNS = ['spend', 'price', 'acquisition_cost', 'carrier_cost', 'ops_cost', 'net_profit']
+CHANNEL_COLUMNS = ['marketing_channel', 'channel']
+UNKNOWN_CHANNEL = 'Unknown'
+BRL_PER_USD = 5.0
+
+# Data Engineering layer (decoupled from market physics): overrides applied on top of difficulty params
+# missing_data_prob: chance per week that a marketing API outage (1..outage_days days) starts
+DATA_QUALITY = {
+    'Clean':     {'chaos_level': 0.0,  'missing_data_prob': 0.0,  'outage_days': 0,
+                  'duplicate_prob': 0.0,   'late_prob': 0.0,  'corrupt_prob': 0.0},
+    'Messy':     {'chaos_level': 0.05, 'missing_data_prob': 0.05, 'outage_days': 2,
+                  'duplicate_prob': 0.005, 'late_prob': 0.02, 'corrupt_prob': 0.002},
+    'Nightmare': {'chaos_level': 0.20, 'missing_data_prob': 0.15, 'outage_days': 7,
+                  'duplicate_prob': 0.03,  'late_prob': 0.10, 'corrupt_prob': 0.01},
+}
+
+# ==========================================
+# DETERMINISTIC DRAWS
+# ==========================================
+
+def _table_id(table):
+    # Stable across processes (unlike hash()), so exports stay reproducible
+    return zlib.crc32(table.encode())
+
+def _rng(seed, table, step, chunk):
+    return np.random.default_rng([seed, _table_id(table), step, chunk])
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _keyed_uniform(keys, salt):
+    # Uniform [0, 1) per key, independent of chunking / row order
+    with np.errstate(over='ignore'):
+        h = _splitmix64(np.asarray(keys, dtype=np.int64).astype(np.uint64) ^ np.uint64(salt))
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def _day_ordinals(date_ids):
+    dates = pd.to_datetime(pd.Series(date_ids).astype(str), format='%Y%m%d')
+    return dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+def _date_ids(day_ordinals):
+    days = pd.Series(np.asarray(day_ordinals).astype('datetime64[D]'))
+    return days.dt.strftime('%Y%m%d').astype(np.int64).to_numpy()
+
+# ==========================================
+# TRANSFORMS  (df, rng, salt, **kwargs) -> df
+# ==========================================
+
+def missing_pixels(df, rng, salt, prob):
+    cols = [c for c in CHANNEL_COLUMNS if c in df.columns]
+    if not cols:
+        return df
+    mask = rng.random(len(df)) < prob
+    if not mask.any():
+        return df
+    df = df.copy()
+    col = cols[0]
+    if isinstance(df[col].dtype, pd.CategoricalDtype) and UNKNOWN_CHANNEL not in df[col].cat.categories:
+        df[col] = df[col].cat.add_categories([UNKNOWN_CHANNEL])
+    df.loc[mask, col] = UNKNOWN_CHANNEL
+    return df
+
+def api_outage(df, rng, salt, start_prob, max_days):
+    # Day d is down when an outage starting on d - k (k < max_days) lasts more than k days.
+    # Start and length of every potential outage come from (salt, start day) only.
+    if 'date_id' not in df.columns or max_days < 1 or start_prob <= 0 or df.empty:
+        return df
+    unique_ids = pd.unique(df['date_id'])
+    days = _day_ordinals(unique_ids)
+    down = np.zeros(len(days), dtype=bool)
+    for k in range(max_days):
+        start = days - k
+        starts_here = _keyed_uniform(start, salt) < start_prob
+        length = 1 + (_keyed_uniform(start, salt ^ 0x5DEECE66D) * max_days).astype(np.int64)
+        down |= starts_here & (length > k)
+    if not down.any():
+        return df
+    return df[~df['date_id'].isin(unique_ids[down])]
+
+def duplicate_rows(df, rng, salt, prob):
+    repeats = 1 + (rng.random(len(df)) < prob)
+    if (repeats == 1).all():
+        return df
+    return df.iloc[np.repeat(np.arange(len(df)), repeats)]
+
+def late_arrival(df, rng, salt, prob, max_lag=3):
+    if 'date_id' not in df.columns or df.empty:
+        return df
+    late = rng.random(len(df)) < prob
+    if not late.any():
+        return df
+    df = df.copy()
+    lag = rng.integers(1, max_lag + 1, int(late.sum()))
+    shifted = _day_ordinals(df['date_id'].to_numpy()[late]) + lag
+    df.loc[late, 'date_id'] = _date_ids(shifted).astype(df['date_id'].dtype)
+    return df
+
+def currency_noise(df, rng, salt, prob):
+    cols = [c for c in MONEY_COLUMNS if c in df.columns]
+    if not cols or df.empty:
+        return df
+    hit = rng.random(len(df)) < prob
+    if not hit.any():
+        return df
+    kind = rng.integers(0, 3, len(df))
+    df = df.copy()
+    for col in cols:
+        values = df[col].to_numpy(dtype=float)
+        corrupted = np.select([kind == 0, kind == 1], [values * 100, values / BRL_PER_USD], default=np.trunc(values))
+        df[col] = np.where(hit, corrupted, values)
+    return df
+
+TRANSFORMS = {
+    'missing_pixels': missing_pixels,
+    'api_outage': api_outage,
+    'duplicate_rows': duplicate_rows,
+    'late_arrival': late_arrival,
+    'currency_noise': currency_noise,
+}
+
+# ==========================================
+# PIPELINES
+# ==========================================
+
+def profile(params, table):
+    # Engine params (difficulty + DATA_QUALITY overrides) -> chaos steps for one export table
+    steps = []
+    if table == 'fact_marketing_daily':
+        steps.append(('api_outage', {'start_prob': params['missing_data_prob'] / 7, 'max_days': params['outage_days']}))
+    else:
+        steps.append(('missing_pixels', {'prob': params['chaos_level']}))
+        steps.append(('late_arrival', {'prob': params['late_prob']}))
+    steps.append(('duplicate_rows', {'prob': params['duplicate_prob']}))
+    steps.append(('currency_noise', {'prob': params['corrupt_prob']}))
+    return steps
+
+def _salt(seed, step):
+    return int(_splitmix64(np.array([seed * 1000 + step], dtype=np.uint64))[0])
+
+def apply(df, steps, seed, table, chunk=0):
+    for i, (name, kwargs) in enumerate(steps):
+        df = TRANSFORMS[name](df, _rng(seed, table, i, chunk), _salt(seed, i), **kwargs)
+    return df
+
+def stream(chunks, steps, seed, table):
+    # Lazily corrupt an iterable of DataFrames; memory stays at one chunk
+    for i, chunk in enumerate(chunks):
+        yield apply(chunk, steps, seed, table, chunk=i)
+
+def stream_csv(src, dst, steps, seed, table, chunksize=250000):
+    started = time.time()
+    rows_in = rows_out = 0
+    tmp = f"{dst}.tmp"
+    for i, chunk in enumerate(pd.read_csv(src, chunksize=chunksize)):
+        rows_in += len(chunk)
+        out = apply(chunk, steps, seed, table, chunk=i)
+        out.to_csv(tmp, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        rows_out += len(out)
+    os.replace(tmp, dst)
+    print(f"      -> 🌪️  {os.path.basename(dst)}: {rows_in:,} -> {rows_out:,} rows in {time.time() - started:.2f}s")
+    return rows_in, rows_out
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a clean export table through the chaos layer.")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--table", choices=["fact_marketing_daily", "fact_financials"], required=True)
+    parser.add_argument("--data", default="Nightmare", choices=list(DATA_QUALITY))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunksize", type=int, default=250000)
+    args = parser.parse_args()
+
+    stream_csv(args.src, args.dst, profile(DATA_QUALITY[args.data], args.table), args.seed, args.table,
+               args.chunksize)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+import db_reader
+
+# ==========================================
+# WORLD CONTEXT SNAPSHOT (VERSIONED, MEMORY-MAPPED)
+# ==========================================
+# Everything the simulator reads from the DWH (timeline, seller profiles,
+# product metadata, order headers) frozen into a folder of .npy columns plus a
+# manifest. Loading maps the files read-only (mmap_mode='r'), so a run starts
+# in milliseconds and needs no database. The bundle is tagged with the DWH
+# build id (dwh.build_info) and rebuilt only when the warehouse changes.
+
+SNAPSHOT_ROOT = os.path.join(project_root, "context_snapshot")
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+
+CONTEXT_QUERIES = {
+    'timeline': "SELECT date_id, date, day_name, is_weekend FROM dwh.dim_date WHERE date BETWEEN '2017-01-01' AND '2018-08-31'",
+    'sellers': "SELECT seller_id, seller_state FROM dwh.dim_sellers",
+    'products': "SELECT product_id, category, product_weight_g FROM dwh.dim_products",
+    # Order header grain for attribution; item count kept for ops
+    'orders': """
+        SELECT
+            o.order_id,
+            o.date_id,
+            MAX(i.seller_id) as seller_id,
+            MAX(i.product_id) as main_product_id, -- Trap Logic uses main product
+            SUM(i.price) as price,
+            SUM(i.freight_value) as freight_value,
+            COUNT(i.product_id) as items_count,
+            MAX(o.distance_km) as distance_km -- farthest seller leg
+        FROM dwh.fact_orders o
+        JOIN dwh.fact_orders i ON o.order_id = i.order_id
+        WHERE o.date_id BETWEEN 20170101 AND 20180831
+        GROUP BY o.order_id, o.date_id
+        ORDER BY o.date_id, o.order_id
+    """,
+}
+
+# Integer columns read in the smallest dtype that fits (db_reader.read_frame narrow=)
+CONTEXT_NARROW = {
+    'timeline': ('date_id',),
+    'orders': ('date_id', 'items_count'),
+}
+
+# Used when the warehouse predates dwh.build_info
+FALLBACK_VERSION_SQL = """
+    SELECT concat_ws('-', 'legacy',
+        (SELECT COUNT(*) FROM dwh.dim_sellers),
+        (SELECT COUNT(*) FROM dwh.dim_products),
+        (SELECT COUNT(*) FROM dwh.fact_orders),
+        (SELECT MAX(date_id) FROM dwh.fact_orders))
+"""
+
+def dwh_version(engine):
+    with engine.connect() as conn:
+        has_stamp = inspect(conn).has_table('build_info', schema='dwh')  # portable to_regclass (Postgres / DuckDB)
+        if has_stamp:
+            return conn.execute(text("SELECT MAX(build_id) FROM dwh.build_info")).scalar()
+        return conn.execute(text(FALLBACK_VERSION_SQL)).scalar()
+
+# ==========================================
+# COLUMN ENCODING
+# ==========================================
+
+def _encode_column(series, folder, stem):
+    # Returns the manifest entry; strings become int32 codes + fixed-width category array
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object or pd.api.types.is_string_dtype(series):
+        inferred = pd.api.types.infer_dtype(series, skipna=True) if series.dtype == object else None
+        if inferred in ('date', 'datetime'):
+            np.save(os.path.join(folder, f"{stem}.npy"), pd.to_datetime(series).to_numpy(dtype='datetime64[ns]'))
+            return {'kind': 'plain'}
+        cat = series.astype('category') if not isinstance(series.dtype, pd.CategoricalDtype) else series
+        np.save(os.path.join(folder, f"{stem}.codes.npy"), cat.cat.codes.to_numpy(dtype=np.int32))
+        np.save(os.path.join(folder, f"{stem}.categories.npy"), cat.cat.categories.to_numpy(dtype=str))
+        return {'kind': 'categorical'}
+    np.save(os.path.join(folder, f"{stem}.npy"), series.to_numpy())
+    return {'kind': 'plain'}
+
+def _decode_column(folder, stem, entry, mmap_mode):
+    if entry['kind'] == 'categorical':
+        codes = np.load(os.path.join(folder, f"{stem}.codes.npy"), mmap_mode=mmap_mode)
+        categories = np.load(os.path.join(folder, f"{stem}.categories.npy"))
+        return pd.Categorical.from_codes(codes, categories.astype(object))
+    return np.load(os.path.join(folder, f"{stem}.npy"), mmap_mode=mmap_mode)
+
+# ==========================================
+# BUILD / LOAD
+# ==========================================
+
+def build(engine, version=None, root=SNAPSHOT_ROOT):
+    started = time.time()
+    version = version or dwh_version(engine)
+    folder = os.path.join(root, version)
+    tmp_folder = f"{folder}.tmp{os.getpid()}"  # per process: concurrent jobs may build at once
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+
+    manifest = {'format': FORMAT_VERSION, 'dwh_version': version, 'created_at': time.time(), 'tables': {}}
+    for name, query in CONTEXT_QUERIES.items():
+        df = db_reader.read_frame(query, engine, narrow=CONTEXT_NARROW.get(name, ()))
+        manifest['tables'][name] = {
+            'rows': len(df),
+            'columns': {col: _encode_column(df[col], tmp_folder, f"{name}.{col}") for col in df.columns},
+        }
+    with open(os.path.join(tmp_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publish atomically (first builder wins), then drop bundles of older DWH versions
+    try:
+        os.rename(tmp_folder, folder)
+    except OSError:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        if not os.path.exists(os.path.join(folder, MANIFEST)):
+            raise
+    for other in os.listdir(root):
+        if other != version and '.tmp' not in other:
+            shutil.rmtree(os.path.join(root, other), ignore_errors=True)
+    print(f"   -> 📦 Context snapshot {version} built in {time.time() - started:.2f}s")
+    return folder
+
+def latest(root=SNAPSHOT_ROOT):
+    if not os.path.isdir(root):
+        return None
+    folders = [os.path.join(root, d) for d in os.listdir(root)
+               if os.path.exists(os.path.join(root, d, MANIFEST))]
+    return max(folders, key=os.path.getmtime) if folders else None
+
+def load(folder, mmap_mode='r'):
+    with open(os.path.join(folder, MANIFEST)) as f:
+        manifest = json.load(f)
+    tables = {}
+    for name, meta in manifest['tables'].items():
+        columns = {col: _decode_column(folder, f"{name}.{col}", entry, mmap_mode)
+                   for col, entry in meta['columns'].items()}
+        tables[name] = pd.DataFrame(columns, copy=False)
+    return manifest['dwh_version'], tables
+
+def load_or_build(engine, root=SNAPSHOT_ROOT, offline=False):
+    # Online: reuse the bundle when its DWH version matches, otherwise rebuild it.
+    # Offline (or DB unreachable): use the newest bundle on disk as-is.
+    version = None
+    if not offline:
+        try:
+            version = dwh_version(engine)
+        except SQLAlchemyError as e:
+            print(f"   ⚠️  DWH unreachable, falling back to offline snapshot ({type(e).__name__})")
+
+    if version is not None:
+        folder = os.path.join(root, version)
+        if not os.path.exists(os.path.join(folder, MANIFEST)):
+            folder = build(engine, version, root)
+    else:
+        folder = latest(root)
+        if folder is None:
+            raise FileNotFoundError(f"No context snapshot in {root} and no DWH connection to build one")
+
+    started = time.time()
+    version, tables = load(folder)
+    print(f"   -> 📦 Context snapshot {version} mapped in {(time.time() - started) * 1000:.0f}ms")
+    return version, tables
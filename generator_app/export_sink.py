@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import pandas as pd
+
+# ==========================================
+# WRITE-ONCE EXPORT SINK
+# ==========================================
+# Each table is serialized exactly once (run folder) and hard-linked into any
+# other location (the shared DWH folder). Every folder keeps a manifest with a
+# content digest per table, so a table whose content did not change is neither
+# rewritten nor relinked, and dimensions are only re-exported when the DWH
+# build version changes.
+#
+# Formats:  'csv'      -> <name>.csv                      (default, legacy layout)
+#           'csv.gz'   -> <name>.csv.gz
+#           'parquet'  -> <name>/month=YYYYMM/part-0.parquet  (facts with date_id)
+#                         <name>.parquet                      (everything else)
+
+MANIFEST = "_export_manifest.json"
+FORMATS = ('csv', 'csv.gz', 'parquet')
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'tables': {}}
+
+def _write_manifest(folder, manifest):
+    tmp = os.path.join(folder, f"{MANIFEST}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(folder, MANIFEST))
+
+def _digest(df, formats):
+    h = hashlib.sha256(json.dumps([list(map(str, df.columns)), list(formats)]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def _is_current(folder, entry, digest):
+    return (entry is not None and entry.get('digest') == digest
+            and all(os.path.exists(os.path.join(folder, p)) for p in entry['files']))
+
+def _drop_files(folder, files):
+    for rel in files:
+        try:
+            os.remove(os.path.join(folder, rel))
+        except FileNotFoundError:
+            pass
+
+def _atomic(path, write):
+    # New inode per write: hard links held elsewhere keep pointing at the old content
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def _serialize(df, folder, name, fmt):
+    # Returns paths relative to folder
+    if fmt == 'csv':
+        _atomic(os.path.join(folder, f"{name}.csv"), lambda p: df.to_csv(p, index=False))
+        return [f"{name}.csv"]
+    if fmt == 'csv.gz':
+        _atomic(os.path.join(folder, f"{name}.csv.gz"), lambda p: df.to_csv(p, index=False, compression='gzip'))
+        return [f"{name}.csv.gz"]
+    if fmt == 'parquet':
+        if 'date_id' not in df.columns:
+            _atomic(os.path.join(folder, f"{name}.parquet"), lambda p: df.to_parquet(p, index=False))
+            return [f"{name}.parquet"]
+        files = []
+        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+        for month, part in df.groupby(df['date_id'] // 100, sort=True):
+            rel = os.path.join(name, f"month={month}", "part-0.parquet")
+            os.makedirs(os.path.join(folder, os.path.dirname(rel)), exist_ok=True)
+            part.to_parquet(os.path.join(folder, rel), index=False)
+            files.append(rel)
+        return files
+    raise ValueError(f"Unknown export format '{fmt}' (expected one of {FORMATS})")
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+
+def write_table(df, folder, name, formats=('csv',), **meta):
+    # Serialize once; no-op when the folder already holds identical content
+    os.makedirs(folder, exist_ok=True)
+    manifest = _read_manifest(folder)
+    entry = manifest['tables'].get(name)
+    digest = _digest(df, formats)
+    if _is_current(folder, entry, digest):
+        print(f"      -> ⏭️  {name}: unchanged, skipped")
+        if meta and any(entry.get(k) != v for k, v in meta.items()):
+            entry.update(meta)
+            _write_manifest(folder, manifest)
+        return entry
+
+    started = time.time()
+    files = [rel for fmt in formats for rel in _serialize(df, folder, name, fmt)]
+    if entry is not None:
+        _drop_files(folder, set(entry['files']) - set(files))
+    entry = {'digest': digest, 'rows': len(df), 'formats': list(formats), 'files': files,
+             'written_at': time.time(), **meta}
+    manifest['tables'][name] = entry
+    _write_manifest(folder, manifest)
+    print(f"      -> 💾 {name}: {len(df):,} rows x {len(files)} file(s) in {time.time() - started:.2f}s")
+    return entry
+
+def _relative_source(src_folder, dst_folder):
+    # Manifests travel with the run folder: record where the files came from relative
+    # to it, never the machine's absolute path (different drives: just the folder name)
+    try:
+        return os.path.relpath(src_folder, dst_folder).replace(os.sep, '/')
+    except ValueError:
+        return os.path.basename(os.path.normpath(src_folder))
+
+def link_tables(src_folder, dst_folder, names):
+    # Hard-link tables already written in src_folder into dst_folder (copy if the
+    # filesystems differ). Tables whose digest already matches in dst are skipped.
+    os.makedirs(dst_folder, exist_ok=True)
+    src_manifest = _read_manifest(src_folder)
+    dst_manifest = _read_manifest(dst_folder)
+    for name in names:
+        entry = src_manifest['tables'][name]
+        old = dst_manifest['tables'].get(name)
+        if _is_current(dst_folder, old, entry['digest']):
+            print(f"      -> ⏭️  {name}: unchanged in {os.path.basename(dst_folder)}, skipped")
+            continue
+        if old is not None:
+            _drop_files(dst_folder, old['files'])
+        linked = 0
+        for rel in entry['files']:
+            src, dst = os.path.join(src_folder, rel), os.path.join(dst_folder, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if os.path.exists(dst):
+                os.remove(dst)
+            try:
+                os.link(src, dst)
+                linked += 1
+            except OSError:
+                shutil.copy2(src, dst)
+        dst_manifest['tables'][name] = {**entry, 'source': _relative_source(src_folder, dst_folder)}
+        print(f"      -> 🔗 {name}: {linked}/{len(entry['files'])} file(s) hard-linked")
+    _write_manifest(dst_folder, dst_manifest)
+
+def export_dimensions(folder, queries, engine, version, formats=('csv',)):
+    # Dimensions only change with the DWH build: skip them when the folder already
+    # holds this version. version=None (unknown) always re-exports.
+    manifest = _read_manifest(folder)
+    for name, query in queries.items():
+        entry = manifest['tables'].get(name)
+        if version is not None and entry is not None and entry.get('dwh_version') == version \
+                and entry.get('formats') == list(formats) \
+                and all(os.path.exists(os.path.join(folder, p)) for p in entry['files']):
+            print(f"      -> ⏭️  {name}: DWH version {version} already exported")
+            continue
+        try:
+            df_table = pd.read_sql(query, engine)
+            write_table(df_table, folder, name, formats, dwh_version=version)
+        except Exception as e:
+            print(f"      ❌ Error exporting {name}: {e}")
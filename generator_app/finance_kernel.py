@@ -0,0 +1,33 @@
+import os
+import sys
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+import geo_index
+
+# ==========================================
+# ORDER FINANCE KERNEL
+# ==========================================
+# Whole financial phase of the simulator as one pass over order-header arrays.
+# Operation order mirrors the original row-wise formulas so results are
+# bit-identical for a given seed. Params may be scalars or arrays that
+# broadcast against the order arrays. Carrier distance is the seller -> customer
+# leg from fact_orders.distance_km (see geo_index).
+
+def carrier_cost(freight_value, is_trap, distance_km, freight_markup):
+    # Trap products ship at a flat 2.5x freight, everything else at markup + line haul per km
+    return np.where(is_trap, freight_value * 2.5, freight_value * freight_markup + geo_index.line_haul(distance_km))
+
+def ops_cost(items_count, is_weekend, ops_base, ops_item, weekend_tax):
+    base = ops_base + items_count * ops_item
+    return np.where(is_weekend, base * weekend_tax, base)
+
+def order_financials(price, freight_value, items_count, is_trap, distance_km, comm_rate,
+                     acquisition_cost, is_weekend, params):
+    carrier = carrier_cost(freight_value, is_trap, distance_km, params['freight_markup'])
+    ops = ops_cost(items_count, is_weekend, params['ops_base'], params['ops_item'], params['weekend_tax'])
+    commission = price * comm_rate
+    net = commission + (freight_value - carrier) - ops - acquisition_cost
+    return {'carrier_cost': carrier, 'ops_cost': ops, 'commission_revenue': commission, 'net_profit': net}
@@ -0,0 +1,122 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+import geo_index
+
+# ==========================================
+# FINANCE PARAMETER SWEEP (WHAT-IF SURFACES)
+# ==========================================
+# Evaluates the order finance kernel for every combination of a parameter grid
+# without re-running the simulator. Per day, net profit is linear in each
+# finance param (see finance_kernel):
+#   net_d = comm_d + freight_d - trap_carrier_d - freight_markup * plain_freight_d - line_haul_d
+#           - (ops_base * orders_d + ops_item * items_d) * (weekend_tax if weekend_d else 1)
+#           - cac_d
+# so one pass over the fixed order arrays reduces them to per-day moments and the
+# whole grid is a (points x days) broadcast. Totals match summing
+# finance_kernel.order_financials per point up to float rounding.
+
+SWEEP_PARAMS = ['freight_markup', 'ops_base', 'ops_item', 'weekend_tax']
+
+def daily_moments(date_id, price, freight_value, items_count, is_trap, distance_km, comm_rate,
+                  acquisition_cost, is_weekend):
+    date_ids, day = np.unique(np.asarray(date_id), return_inverse=True)
+    n_days = len(date_ids)
+    plain = ~is_trap
+
+    def per_day(values):
+        return np.bincount(day, weights=values, minlength=n_days)
+
+    return {
+        'date_ids': date_ids,
+        'orders': np.bincount(day, minlength=n_days).astype(float),
+        'items': per_day(items_count.astype(float)),
+        'commission': per_day(price * comm_rate),
+        'freight': per_day(freight_value),
+        'trap_carrier': per_day(np.where(is_trap, freight_value * 2.5, 0.0)),
+        'plain_freight': per_day(np.where(plain, freight_value, 0.0)),
+        'line_haul': per_day(np.where(plain, geo_index.line_haul(distance_km), 0.0)),
+        'cac': per_day(acquisition_cost),
+        'is_weekend': np.bincount(day, weights=is_weekend.astype(float), minlength=n_days) > 0,
+    }
+
+def build_grid(grid, base_params):
+    # {'freight_markup': [1.1, 1.6], ...} -> DataFrame of every combination; missing params fixed at base
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)} (sweepable: {SWEEP_PARAMS})")
+    axes = [np.atleast_1d(grid.get(p, base_params[p])) for p in SWEEP_PARAMS]
+    return pd.DataFrame(list(itertools.product(*axes)), columns=SWEEP_PARAMS)
+
+def evaluate(moments, points, daily_spend=None):
+    # points: DataFrame with SWEEP_PARAMS columns -> (points x days) net profit surface
+    m = moments
+    col = {p: points[p].to_numpy(dtype=float)[:, None] for p in SWEEP_PARAMS}
+    fixed = m['commission'] + m['freight'] - m['trap_carrier'] - m['line_haul'] - m['cac']
+    ops = (col['ops_base'] * m['orders'] + col['ops_item'] * m['items']) \
+        * np.where(m['is_weekend'], col['weekend_tax'], 1.0)
+    net_profit = fixed - col['freight_markup'] * m['plain_freight'] - ops
+
+    surfaces = {'net_profit': net_profit}
+    if daily_spend is not None:
+        # Bottom line as in 05: every marketing cash-out, not just the CAC tied to orders
+        spend = pd.Series(daily_spend).reindex(m['date_ids'], fill_value=0.0).to_numpy(dtype=float)
+        surfaces['net_pnl'] = net_profit + m['cac'] - spend
+    return surfaces
+
+def sweep(sim, grid, include_spend=True):
+    # sim: OlistMasterEngineV5 after run_attribution_engine(); nothing is written
+    started = time.time()
+    df, arrays = sim.finance_inputs()
+    moments = daily_moments(df['date_id'].to_numpy(), **arrays)
+    points = build_grid(grid, sim.params)
+    daily_spend = sim.df_marketing.groupby('date_id')['spend'].sum() if include_spend else None
+    surfaces = evaluate(moments, points, daily_spend)
+
+    totals = points.copy()
+    for name, surface in surfaces.items():
+        totals[f"total_{name}"] = surface.sum(axis=1)
+    print(f"   -> 📐 Swept {len(points):,} parameter points x {len(moments['date_ids']):,} days "
+          f"in {time.time() - started:.2f}s")
+    return {'points': totals, 'date_ids': moments['date_ids'], **surfaces}
+
+def _parse_axis(spec):
+    # "freight_markup=1.1:1.6:11" (start:stop:num) or "weekend_tax=1.0,1.25,1.5"
+    name, values = spec.split("=", 1)
+    if ":" in values:
+        start, stop, num = values.split(":")
+        return name, np.linspace(float(start), float(stop), int(num))
+    return name, np.array([float(v) for v in values.split(",")])
+
+def main():
+    parser = argparse.ArgumentParser(description="What-if P&L surfaces over finance parameter grids.")
+    parser.add_argument("axes", nargs="+", help="param=start:stop:num or param=v1,v2,...")
+    parser.add_argument("--market", default="Medium", choices=["Easy", "Medium", "Hard"])
+    parser.add_argument("--out", default="finance_sweep.csv")
+    parser.add_argument("--daily", default=None, help="Also write the daily net_pnl surface (one column per date)")
+    args = parser.parse_args()
+
+    from training_engine import OlistMasterEngineV5
+    sim = OlistMasterEngineV5(args.market, os.path.join("Training_Output", "_sweep"))
+    sim.load_context()
+    sim.simulate_marketing()
+    sim.run_attribution_engine()
+
+    result = sweep(sim, dict(_parse_axis(a) for a in args.axes))
+    result['points'].to_csv(args.out, index=False)
+    print(f"📄 Totals: {args.out}")
+    if args.daily:
+        daily = pd.DataFrame(result['net_pnl'], columns=result['date_ids'])
+        pd.concat([result['points'][SWEEP_PARAMS], daily], axis=1).to_csv(args.daily, index=False)
+        print(f"📄 Daily surface: {args.daily}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import itertools
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from collections import deque
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+# ==========================================
+# SIMULATION JOB QUEUE (WORKER PROCESSES)
+# ==========================================
+# Each job runs the engine in its own process and streams events back over that
+# worker's own pipe (the one its job arrives on):
+#   {'job': id, 'type': 'phase', 'step': i, 'total': n, 'label': ..., 'rows': ...}
+#   {'job': id, 'type': 'log', 'text': ...}
+#   {'job': id, 'type': 'publishing' | 'done' | 'cancelled' | 'error', ...}
+# Every job writes to its own folder; the shared DWH folder is updated under one
+# cross-process lock, so concurrent jobs never interleave writes there.
+# Cancellation is cooperative between phases, then escalates to terminate().
+# The queue takes the DWH lock itself around terminate(): a worker killed while
+# holding a multiprocessing lock would leave it locked for every later job.
+# Nothing else is shared: a worker killed halfway through sending an event only
+# truncates its own pipe, which the queue then reads to EOF and closes. (A shared
+# mp.Queue would be corrupted for every other job.)
+# Workers are spawned ahead of time (prewarm): each standby worker pays the heavy
+# imports and validates / maps the world-context snapshot, then waits for a job,
+# so a submitted job starts simulating immediately. One job per worker process.
+
+CANCEL_GRACE_SEC = 3.0
+
+# (engine method, label, attribute whose row count is reported)
+PHASES = [
+    ('load_context', "Loading world context", 'df_order_headers'),
+    ('simulate_marketing', "Simulating marketing", 'df_marketing'),
+    ('run_attribution_engine', "Attributing orders", 'df_processed'),
+    ('calculate_financials', "Calculating financials", 'df_final_orders'),
+    ('export', "Exporting run folder", None),
+]
+
+class _Events:
+    # Worker side of the pipe: events are sent synchronously (no feeder thread to kill mid-write)
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, event):
+        self.conn.send(event)
+
+class _EventWriter:
+    # File-like stdout replacement: one 'log' event per printed line
+    def __init__(self, job_id, events):
+        self.job_id = job_id
+        self.events = events
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            if line.strip():
+                self.events.put({'job': self.job_id, 'type': 'log', 'text': line})
+        return len(text)
+
+    def flush(self):
+        pass
+
+def _warm_up(events):
+    # Heavy imports (pandas, numpy, SQLAlchemy) + snapshot check/build + page-in of the mmap'd files
+    started = time.time()
+    ready = {'job': None, 'type': 'worker_ready', 'pid': os.getpid()}
+    try:
+        import training_engine
+        version, _ = training_engine.context_snapshot.load_or_build(training_engine.engine)
+        events.put({**ready, 'version': version, 'seconds': round(time.time() - started, 2)})
+    except Exception as e:
+        # Not fatal here: the job itself will surface the problem with full context
+        events.put({**ready, 'error': f"{type(e).__name__}: {e}", 'seconds': round(time.time() - started, 2)})
+
+def worker_main(conn, cancel, published, dwh_lock):
+    # Worker process entry point (top level: must pickle under the spawn start method)
+    sys.path.extend([current_dir, project_root])
+    events = _Events(conn)
+    sys.stdout = sys.stderr = _EventWriter(None, events)
+    _warm_up(events)
+    msg = conn.recv()
+    if msg is None:  # released while on standby
+        return
+    job_id, spec = msg
+    sys.stdout = sys.stderr = _EventWriter(job_id, events)
+    run_job(job_id, spec, events, cancel, published, dwh_lock)
+
+def run_job(job_id, spec, events, cancel, published, dwh_lock):
+    try:
+        from training_engine import OlistMasterEngineV5
+        sim = OlistMasterEngineV5(difficulty=spec['market'], output_folder=spec['folder'],
+                                  data_quality=spec['data'], seed=spec.get('seed'))
+        total = len(PHASES) + 1
+        for step, (method, label, attr) in enumerate(PHASES, 1):
+            if cancel.is_set():
+                events.put({'job': job_id, 'type': 'cancelled'})
+                return
+            events.put({'job': job_id, 'type': 'phase', 'step': step - 1, 'total': total, 'label': label})
+            if method == 'export':
+                sim.export(update_dwh=False)
+            else:
+                getattr(sim, method)()
+            rows = len(getattr(sim, attr)) if attr else None
+            events.put({'job': job_id, 'type': 'phase', 'step': step, 'total': total, 'label': label, 'rows': rows})
+
+        if cancel.is_set():
+            events.put({'job': job_id, 'type': 'cancelled'})
+            return
+        with dwh_lock:
+            if cancel.is_set():  # cancelled while waiting for another job's publish
+                events.put({'job': job_id, 'type': 'cancelled'})
+                return
+            published.set()  # under the lock: the queue no longer terminates this job
+            events.put({'job': job_id, 'type': 'publishing'})
+            sim.publish_dwh()
+        events.put({'job': job_id, 'type': 'done', 'step': total, 'total': total,
+                    'rows': len(sim.df_final_orders)})
+    except Exception as e:
+        events.put({'job': job_id, 'type': 'error', 'error': f"{type(e).__name__}: {e}"})
+    finally:
+        sys.stdout.flush()
+
+class JobQueue:
+    def __init__(self, max_workers=2, output_root="Training_Output"):
+        self.ctx = mp.get_context('spawn')  # fork is unsafe next to a running Tk loop
+        self.dwh_lock = self.ctx.Lock()
+        self.max_workers = max_workers
+        self.output_root = output_root
+        self.jobs = {}
+        self.pending = deque()
+        self.workers = []      # {'process', 'conn', 'cancel', 'published', 'job', 'ready', 'closed'}
+        self.keep_warm = False
+        self._ids = itertools.count(1)
+
+    # --- Workers ---
+    def _spawn_worker(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        cancel, published = self.ctx.Event(), self.ctx.Event()
+        proc = self.ctx.Process(target=worker_main, daemon=True,
+                                args=(child_conn, cancel, published, self.dwh_lock))
+        proc.start()
+        child_conn.close()  # only the worker holds its end: its exit reads as EOF here
+        worker = {'process': proc, 'conn': parent_conn, 'cancel': cancel, 'published': published,
+                  'job': None, 'ready': False, 'closed': False}
+        self.workers.append(worker)
+        return worker
+
+    def _drain(self, worker):
+        # Every event the worker has sent so far; EOF (or a message cut off by terminate) closes the pipe
+        events = []
+        conn = worker['conn']
+        while not worker['closed']:
+            try:
+                if not conn.poll():
+                    break
+                events.append(conn.recv())
+            except (EOFError, OSError):
+                conn.close()
+                worker['closed'] = True
+        for ev in events:
+            if ev['type'] == 'worker_ready':
+                worker['ready'] = True
+        return events
+
+    def _join(self, worker, timeout):
+        # join() that keeps reading: a worker blocked on a full pipe could not exit
+        deadline = time.time() + timeout
+        while worker['process'].is_alive() and time.time() < deadline:
+            self._drain(worker)
+            worker['process'].join(0.05)
+
+    def _idle_workers(self):
+        return [w for w in self.workers if w['job'] is None and w['process'].is_alive()]
+
+    def prewarm(self):
+        # Keep one standby worker per free slot (call once the window is up)
+        self.keep_warm = True
+        while len(self._idle_workers()) + self.running_count() < self.max_workers:
+            self._spawn_worker()
+
+    # --- Submission ---
+    def _unique_folder(self, base, job_id):
+        # A folder no other job (this session or an earlier one) wrote: a cancelled job's folder is deleted
+        taken = {j['folder'] for j in self.jobs.values()}
+        folder = os.path.join(self.output_root, base)
+        retry = itertools.count(2)
+        tag = f"_J{job_id}"
+        while folder in taken or os.path.exists(folder):
+            folder = os.path.join(self.output_root, f"{base}{tag}")
+            tag = f"_J{job_id}-{next(retry)}"
+        return folder
+
+    def submit(self, name, market, data, seed=None):
+        job_id = next(self._ids)
+        folder = self._unique_folder(f"{name}_M-{market}_D-{data}", job_id)
+        self.jobs[job_id] = {
+            'id': job_id, 'name': name, 'folder': folder, 'status': 'queued', 'label': "Queued",
+            'step': 0, 'total': len(PHASES) + 1, 'rows': None, 'error': None,
+            'spec': {'market': market, 'data': data, 'seed': seed, 'folder': folder},
+            'worker': None, 'process': None, 'cancel': None, 'published': None,
+            'cancel_at': None, 'started': None, 'finished': None,
+        }
+        self.pending.append(job_id)
+        self._start_pending()
+        return job_id
+
+    def _start_pending(self):
+        while self.pending and self.running_count() < self.max_workers:
+            job = self.jobs[self.pending.popleft()]
+            idle = sorted(self._idle_workers(), key=lambda w: not w['ready'])  # warm ones first
+            worker = idle[0] if idle else self._spawn_worker()
+            worker['job'] = job['id']
+            worker['conn'].send((job['id'], job['spec']))
+            job['worker'] = worker
+            job['process'], job['cancel'], job['published'] = worker['process'], worker['cancel'], worker['published']
+            job['status'], job['started'] = 'running', time.time()
+            job['label'] = "Starting" if worker['ready'] else "Warming up"
+
+    def running_count(self):
+        return sum(j['status'] in ('running', 'publishing') for j in self.jobs.values())
+
+    # --- Control ---
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running', 'publishing'):
+            return
+        if job['status'] == 'queued':
+            self.pending.remove(job_id)
+            self._finish(job, 'cancelled', "Cancelled")
+            return
+        job['cancel'].set()
+        job['cancel_at'] = time.time()
+        job['label'] = "Cancelling..."
+
+    def _terminate(self, job):
+        # Kill the job's worker only while the queue holds the DWH lock (so the worker cannot).
+        # False when the lock is taken or the job already started publishing: it finishes on its own
+        if not self.dwh_lock.acquire(block=False):
+            return False
+        try:
+            if job['published'].is_set():
+                return False
+            proc = job['process']
+            proc.terminate()
+            proc.join(1)
+        finally:
+            self.dwh_lock.release()
+        return True
+
+    def shutdown(self):
+        self.keep_warm = False
+        for job_id in list(self.pending):
+            self.cancel(job_id)
+        for worker in self._idle_workers():
+            worker['conn'].send(None)
+            self._join(worker, CANCEL_GRACE_SEC)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        for job in self.jobs.values():
+            proc = job['process']
+            if proc is not None and proc.is_alive():
+                job['cancel'].set()
+                self._join(job['worker'], CANCEL_GRACE_SEC)
+                while proc.is_alive() and not self._terminate(job):
+                    self._join(job['worker'], 0.5)  # a publish in progress finishes first
+        for worker in self.workers:
+            worker['conn'].close()
+
+    def _finish(self, job, status, label):
+        job['status'], job['label'], job['finished'] = status, label, time.time()
+        if status == 'cancelled':
+            shutil.rmtree(job['folder'], ignore_errors=True)  # isolated folder: safe to drop
+
+    # --- Event pump (call periodically from the GUI thread) ---
+    def poll(self):
+        events = []
+        for worker in self.workers:
+            events.extend(self._drain(worker))
+        for ev in events:
+            if ev['type'] == 'worker_ready':
+                continue
+            job = self.jobs.get(ev['job'])
+            if job is None or job['status'] in ('done', 'failed', 'cancelled'):
+                continue
+            kind = ev['type']
+            if kind == 'phase':
+                job['step'], job['total'], job['label'] = ev['step'], ev['total'], ev['label']
+                if ev.get('rows') is not None:
+                    job['rows'] = ev['rows']
+            elif kind == 'publishing':
+                job['status'], job['label'] = 'publishing', "Publishing to DWH folder"
+            elif kind == 'done':
+                job['step'], job['rows'] = ev['total'], ev['rows']
+                self._finish(job, 'done', "Complete")
+            elif kind == 'cancelled':
+                self._finish(job, 'cancelled', "Cancelled")
+            elif kind == 'error':
+                job['error'] = ev['error']
+                self._finish(job, 'failed', "Failed")
+
+        now = time.time()
+        for job in self.jobs.values():
+            proc = job['process']
+            if job['status'] == 'running' and job['cancel_at'] and now - job['cancel_at'] > CANCEL_GRACE_SEC:
+                # Stuck inside a long phase. It may already be publishing (event not drained yet):
+                # then it is left alone and a later poll sees 'publishing' / 'done'
+                if self._terminate(job):
+                    self._finish(job, 'cancelled', "Cancelled (terminated)")
+                    events.append({'job': job['id'], 'type': 'cancelled'})
+            elif job['status'] in ('running', 'publishing') and job['worker'] is not None and job['worker']['closed']:
+                # Pipe at EOF: the worker exited and every event it sent has been handled above
+                proc.join(1)
+                job['error'] = f"Worker exited with code {proc.exitcode}"
+                self._finish(job, 'failed', "Failed")
+                events.append({'job': job['id'], 'type': 'error', 'error': job['error']})
+
+        self.workers = [w for w in self.workers if not w['closed']]
+        self._start_pending()
+        if self.keep_warm:
+            self.prewarm()
+        return events
@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+# ==========================================
+# PHASE CHECKPOINT CACHE
+# ==========================================
+# Memoizes simulator phases on disk. A phase's key chains:
+#   upstream phase key + context snapshot version + global RNG state at entry
+#   + the params the phase reads + the source of the code it runs
+#   (the method itself plus the helpers/modules listed in code=).
+# A hit restores the phase outputs AND the RNG state the phase left behind, so
+# downstream random draws are identical to a cold run. Changing a finance-only
+# param therefore reruns only calculate_financials (and export).
+# Entries older than max_age or beyond max_bytes (least recently used first) are evicted.
+
+CACHE_ROOT = os.path.join(project_root, "phase_cache")
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+MAX_CACHE_AGE_DAYS = 7
+
+def _rng_digest(state):
+    name, keys, pos, has_gauss, cached = state
+    h = hashlib.sha256(f"{name}|{pos}|{has_gauss}|{cached!r}".encode())
+    h.update(np.ascontiguousarray(keys).tobytes())
+    return h.hexdigest()
+
+def _source_digest(*objs):
+    h = hashlib.sha256()
+    for obj in objs:
+        h.update(inspect.getsource(obj).encode())
+    return h.hexdigest()
+
+class PhaseCache:
+    def __init__(self, root=CACHE_ROOT, max_bytes=MAX_CACHE_BYTES, max_age_days=MAX_CACHE_AGE_DAYS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, phase, **deps):
+        blob = json.dumps({'phase': phase, **deps}, sort_keys=True, default=str)
+        return f"{phase}-{hashlib.sha256(blob.encode()).hexdigest()[:32]}"
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)  # LRU bookkeeping
+        return entry
+
+    def save(self, key, entry):
+        # Write-then-rename: concurrent batch workers never see half-written entries
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                self._remove(path)
+            elif name.endswith(".pkl"):
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.root):
+            self._remove(os.path.join(self.root, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def cached_phase(phase, params, outputs, code=()):
+    # Method decorator for engine phases.
+    # params:  keys of self.params the phase reads
+    # outputs: attributes the phase sets (restored on a hit)
+    # code:    extra modules/functions whose source the phase depends on
+    def decorator(fn):
+        code_digest = _source_digest(fn, *code)
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'phase_cache', None)
+            version = getattr(self, 'context_version', None)
+            if cache is None or version is None:  # live DWH context has no version to key on
+                self._phase_key = None
+                return fn(self, *args, **kwargs)
+
+            key = cache.key(phase, upstream=getattr(self, '_phase_key', None), context=version,
+                            rng=_rng_digest(np.random.get_state()), code=code_digest,
+                            params={p: self.params[p] for p in params})
+            entry = cache.load(key)
+            if entry is not None:
+                for attr, value in entry['outputs'].items():
+                    setattr(self, attr, value)
+                np.random.set_state(entry['rng_state'])
+                print(f"   ♻️  {phase}: restored from checkpoint")
+            else:
+                fn(self, *args, **kwargs)
+                cache.save(key, {'outputs': {attr: getattr(self, attr) for attr in outputs},
+                                 'rng_state': np.random.get_state()})
+            self._phase_key = key
+
+        return wrapper
+    return decorator
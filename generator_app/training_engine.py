@@ -3,7 +3,6 @@ import numpy as np
 from sqlalchemy import create_engine
 import os
 import sys
-import zlib
 
 # ==========================================
 # SETUP
@@ -12,17 +11,36 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 import db_config
+import geo_index
+import db_reader
+import channel_dim
+import finance_kernel
+import context_snapshot
+import export_sink
+import physics_checks
+import chaos
+from chaos import DATA_QUALITY  # Data Engineering layer, see chaos.py
+from phase_cache import PhaseCache, cached_phase
 engine = db_config.get_engine()
 
+
 class OlistMasterEngineV5:
-    def __init__(self, difficulty, output_folder):
+    def __init__(self, difficulty, output_folder, use_snapshot=True, offline=False, data_quality=None, seed=None, cache=True,
+                 export_formats=('csv',)):
         self.output_folder = output_folder
-        self.seed = {'Easy': 101, 'Medium': 202, 'Hard': 404}.get(difficulty, 42)
+        self.use_snapshot = use_snapshot  # mmap'd context bundle instead of live DWH queries
+        self.offline = offline            # never touch the DB, use the newest bundle on disk
+        self.phase_cache = PhaseCache() if cache else None  # per-phase checkpoints (see phase_cache.py)
+        self._phase_key = None
+        self.export_formats = tuple(export_formats)  # any of export_sink.FORMATS
+        self.seed = seed if seed is not None else {'Easy': 101, 'Medium': 202, 'Hard': 404}.get(difficulty, 42)
         np.random.seed(self.seed)
         os.makedirs(output_folder, exist_ok=True)
         
         # --- 1. CONFIGURATION LAYER (No Hardcoding) ---
         self.params = self._get_params(difficulty)
+        if data_quality is not None:
+            self.params.update(DATA_QUALITY[data_quality])
         print(f"🚀 MASTER ENGINE V5 INITIALIZED | Mode: {difficulty}")
         print(f"   -> Params: {self.params}")
 
@@ -35,6 +53,10 @@ class OlistMasterEngineV5:
             'org_base': 0.30,   # 30% Organic Traffic
             'chaos_level': 0.05, 
             'missing_data_prob': 0.01,
+            'outage_days': 5,
+            'duplicate_prob': 0.0,
+            'late_prob': 0.0,
+            'corrupt_prob': 0.0,
             # Ops Params 
             'ops_base': 1.5,
             'ops_item': 0.5,
@@ -72,24 +94,33 @@ class OlistMasterEngineV5:
     # ======================================================
     def load_context(self):
         print("1. Loading World Context...")
+        if self.use_snapshot:
+            self.context_version, ctx = context_snapshot.load_or_build(engine, offline=self.offline)
+        else:
+            self.context_version = None
+            ctx = {name: db_reader.read_frame(q, engine, narrow=context_snapshot.CONTEXT_NARROW.get(name, ()))
+                   for name, q in context_snapshot.CONTEXT_QUERIES.items()}
         
         # Timeline
-        self.df_timeline = pd.read_sql("SELECT date_id, date, day_name, is_weekend FROM dwh.dim_date WHERE date BETWEEN '2017-01-01' AND '2018-08-31'", engine)
+        self.df_timeline = ctx['timeline']
         self.df_timeline['date'] = pd.to_datetime(self.df_timeline['date'])
         self._calculate_seasonality()
         
         # Sellers (Commission Tiers)
         print("   -> Loading Seller Profiles...")
-        self.df_sellers = pd.read_sql("SELECT seller_id, seller_state FROM dwh.dim_sellers", engine)
+        self.df_sellers = ctx['sellers']
         self.df_sellers['comm_rate'] = np.where(self.df_sellers['seller_state'].isin(['SP', 'RJ']), 0.10, 0.15)
         self.seller_map = self.df_sellers.set_index('seller_id')['comm_rate'].to_dict()
 
         # Products (Traps)
         print("   -> Loading Product Metadata...")
-        self.df_products = pd.read_sql("SELECT product_id, category, product_weight_g FROM dwh.dim_products", engine)
+        self.df_products = ctx['products']
         self.df_products['is_trap'] = (self.df_products['category'].str.contains('furniture', case=False, na=False)) & (self.df_products['product_weight_g'] > 5000)
         self.product_trap_map = self.df_products.set_index('product_id')['is_trap'].to_dict()
 
+        # Order Headers (consumed by attribution)
+        self.df_order_headers = ctx['orders']
+
     def _calculate_seasonality(self):
         def get_wave(dt):
             val = 1.0
@@ -100,20 +131,24 @@ class OlistMasterEngineV5:
             return val
         self.df_timeline['seasonality'] = self.df_timeline['date'].apply(get_wave)
 
+    @cached_phase('marketing', params=['spend_mult', 'ad_eff'], outputs=['pool', 'df_marketing'],
+                  code=(load_context, _calculate_seasonality, channel_dim))
     def simulate_marketing(self):
         print("2. Simulating Marketing Ecosystem...")
+        # Same channel names / keys as the DWH (dwh.dim_channel, see channel_dim.py)
         channels = {
-            'Facebook': {'budget': 2000, 'cpc': 0.5},
-            'Google':   {'budget': 3500, 'cpc': 0.8},
-            'Email':    {'budget': 500,  'cpc': 0.1},
-            'Influencer': {'budget': 1000, 'cpc': 1.5}
+            'Facebook_Ads':         {'budget': 2000, 'cpc': 0.5},
+            'Google_Search':        {'budget': 3500, 'cpc': 0.8},
+            'Email_Marketing':      {'budget': 500,  'cpc': 0.1},
+            'Influencer_Instagram': {'budget': 1000, 'cpc': 1.5}
         }
         
         self.pool = {d: {} for d in self.df_timeline['date_id'].values}
         mkt_rows = []
         dates = self.df_timeline['date_id'].values
         
-        for ch, conf in channels.items():
+        for name, conf in channels.items():
+            ch = channel_dim.KEYS[name]  # the click pool is keyed by channel key
             # Spend Physics
             noise = np.clip(np.random.normal(1, 0.1, len(dates)), 0.8, 1.2)
             spend = conf['budget'] * self.params['spend_mult'] * self.df_timeline['seasonality'] * noise
@@ -139,7 +174,8 @@ class OlistMasterEngineV5:
                         self.pool[target_date][ch]['clicks'] += lagged_clicks
                         self.pool[target_date][ch]['total_cost'] += (lagged_clicks * unit_cost)
 
-            df_ch = pd.DataFrame({'date_id': dates, 'channel': ch, 'spend': spend, 'clicks': clicks})
+            df_ch = pd.DataFrame({'date_id': dates, 'channel': channel_dim.from_keys(np.full(len(dates), ch)),
+                                  'spend': spend, 'clicks': clicks})
             mkt_rows.append(df_ch)
             
         self.df_marketing = pd.concat(mkt_rows)
@@ -147,34 +183,21 @@ class OlistMasterEngineV5:
     # ======================================================
     # PHASE 3: ATTRIBUTION (The Bridge)
     # ======================================================
+    @cached_phase('attribution', params=['ad_eff', 'base_burn', 'org_base'], outputs=['df_processed'],
+                  code=(load_context, channel_dim))
     def run_attribution_engine(self):
         print("3. Attribution Loop (Dynamic Burn Rate)...")
         
         # --- [FIX 1] Clean SQL & Granularity ---
-        # We aggregate to Order Level for attribution, but keep Item Count for Ops
-        q = """
-            SELECT 
-                o.order_id, 
-                o.date_id, 
-                MAX(i.seller_id) as seller_id, 
-                MAX(i.product_id) as main_product_id, -- Trap Logic uses main product
-                SUM(i.price) as price, 
-                SUM(i.freight_value) as freight_value,
-                COUNT(i.product_id) as items_count
-            FROM dwh.fact_orders o
-            JOIN dwh.fact_orders i ON o.order_id = i.order_id
-            WHERE o.date_id BETWEEN 20170101 AND 20180831
-            GROUP BY o.order_id, o.date_id
-            ORDER BY o.date_id
-        """
-        df_orders = pd.read_sql(q, engine)
+        # Order level for attribution, item count kept for Ops (see context_snapshot.CONTEXT_QUERIES)
+        df_orders = self.df_order_headers.copy()
         
         # Context Mapping
-        df_orders['is_trap_product'] = df_orders['main_product_id'].map(self.product_trap_map).fillna(False)
-        df_orders['comm_rate'] = df_orders['seller_id'].map(self.seller_map).fillna(0.20)
+        df_orders['is_trap_product'] = df_orders['main_product_id'].map(self.product_trap_map).astype(object).fillna(False).astype(bool)
+        df_orders['comm_rate'] = df_orders['seller_id'].map(self.seller_map).astype(float).fillna(0.20)
 
         # Vectorized Attribution
-        channel_col = np.empty(len(df_orders), dtype=object)
+        channel_col = np.full(len(df_orders), channel_dim.DIRECT, dtype=np.int16)  # dwh.dim_channel keys
         cac_col = np.zeros(len(df_orders), dtype=float)
         
 
@@ -194,14 +217,14 @@ class OlistMasterEngineV5:
             active = []
             for ch, data in day_pool.items():
                 if data['clicks'] > 0:
-                    active.append({'name': ch, 'clicks': data['clicks'], 'unit_cost': data['total_cost']/data['clicks']})
+                    active.append({'key': ch, 'clicks': data['clicks'], 'unit_cost': data['total_cost']/data['clicks']})
             
             batch_ch = []
             batch_cac = []
             
             for _ in range(n):
                 if np.random.random() < self.params['org_base']:
-                    batch_ch.append('Direct/Organic')
+                    batch_ch.append(channel_dim.DIRECT)
                     batch_cac.append(0.0)
                     continue
 
@@ -219,119 +242,166 @@ class OlistMasterEngineV5:
                     # Burn Logic (Funnel Loss)
                     if np.random.random() > effective_burn_rate:
                         # Converted
-                        batch_ch.append(chosen['name'])
+                        batch_ch.append(chosen['key'])
                         batch_cac.append(chosen['unit_cost'])
                     else:
                         # Wasted (Bounce)
-                        batch_ch.append('Direct/Organic') # Order happened, but attributed to Organic
+                        batch_ch.append(channel_dim.DIRECT) # Order happened, but attributed to Organic
                         batch_cac.append(0.0) # Cost is recorded in Marketing Table (Spend), but not here (CAC)
                 else:
-                    batch_ch.append('Direct/Organic')
+                    batch_ch.append(channel_dim.DIRECT)
                     batch_cac.append(0.0)
             
             channel_col[indices] = batch_ch
             cac_col[indices] = batch_cac
             
-        df_orders['marketing_channel'] = channel_col
+        df_orders['marketing_channel'] = channel_dim.from_keys(channel_col)
         df_orders['acquisition_cost'] = cac_col
         self.df_processed = df_orders
 
     # ======================================================
-    # PHASE 4: FINANCE & CHAOS
+    # PHASE 4: FINANCE
     # ======================================================
-    def calculate_financials(self):
-        print("4. Calculating Final Financials (Restored Ops Logic)...")
+    def finance_inputs(self):
+        # Order frame + the fixed arrays the finance kernel runs over (shared with finance_sweep)
         df = self.df_processed.copy()
         
         # Logistics (Trap Aware)
-        df['dist_noise'] = df['order_id'].apply(lambda x: (zlib.crc32(str(x).encode()) % 100)/100.0)
-        def calc_carrier(row):
-            base = row['freight_value'] * self.params['freight_markup']
-            if row['is_trap_product']: return row['freight_value'] * 2.5
-            return base + (row['dist_noise'] * 2)
-        df['carrier_cost'] = df.apply(calc_carrier, axis=1)
-        
-        # --- [FIX 4] Ops Cost (Restored Logic) ---
-        wk_map = self.df_timeline.set_index('date_id')['is_weekend'].to_dict()
-        df['is_weekend'] = df['date_id'].map(wk_map).fillna(False)
-        
-        # Base + Item Cost
-        base_ops_calc = self.params['ops_base'] + (df['items_count'] * self.params['ops_item'])
-        # Weekend Tax
-        df['ops_cost'] = np.where(df['is_weekend'], base_ops_calc * self.params['weekend_tax'], base_ops_calc)
-        
-        # Commission & Net
-        df['commission_revenue'] = df['price'] * df['comm_rate']
-        df['net_profit'] = (df['commission_revenue'] + (df['freight_value'] - df['carrier_cost']) - df['ops_cost'] - df['acquisition_cost'])
-        
-        # Inject Data Quality Issues (Chaos)
-        mask_pixel = np.random.rand(len(df)) < self.params['chaos_level']
-        df.loc[mask_pixel, 'marketing_channel'] = 'Unknown'
+        # Seller -> customer distance is persisted on fact_orders at DWH build;
+        # legs without a zip centroid (or bundles older than it) get the median leg
+        if 'distance_km' not in df:
+            df['distance_km'] = np.nan
+        df['distance_km'] = geo_index.fill_missing(df['distance_km'])
+
+        # Ops: weekend flag per order date
+        weekend_ids = self.df_timeline.loc[self.df_timeline['is_weekend'].astype(bool), 'date_id'].to_numpy()
+        df['is_weekend'] = np.isin(df['date_id'].to_numpy(), weekend_ids)
+
+        arrays = {
+            'price': df['price'].to_numpy(dtype=float),
+            'freight_value': df['freight_value'].to_numpy(dtype=float),
+            'items_count': df['items_count'].to_numpy(),
+            'is_trap': df['is_trap_product'].to_numpy(dtype=bool),
+            'distance_km': df['distance_km'].to_numpy(dtype=float),
+            'comm_rate': df['comm_rate'].to_numpy(dtype=float),
+            'acquisition_cost': df['acquisition_cost'].to_numpy(dtype=float),
+            'is_weekend': df['is_weekend'].to_numpy(),
+        }
+        return df, arrays
+
+    @cached_phase('financials', params=['freight_markup', 'ops_base', 'ops_item', 'weekend_tax'],
+                  outputs=['df_final_orders'],
+                  code=(load_context, finance_inputs, finance_kernel, geo_index, channel_dim))
+    def calculate_financials(self):
+        print("4. Calculating Final Financials (Restored Ops Logic)...")
+        df, arrays = self.finance_inputs()
+
+        # Carrier (trap aware) + ops + commission + net in one vectorized pass
+        fin = finance_kernel.order_financials(**arrays, params=self.params)
+        for col, values in fin.items():
+            df[col] = values
         
         self.df_final_orders = df
 
 # ======================================================
     # PHASE 5: EXPORT (DUAL WRITE STRATEGY)
     # ======================================================
-    def export(self):
+    def export(self, update_dwh=True, validate=True):
+        # update_dwh=False writes the run folder only (batch runs must not race on the shared DWH folder)
+        # validate=True rejects a physically impossible batch before anything is written
+        if validate:
+            self.validate_output()
         print("5. Exporting Data (Dual Location)...")
         
         run_folder = self.output_folder
         
         dwh_folder = os.path.join(project_root, "dwh(ready_to_be_analyzed)")
-        os.makedirs(dwh_folder, exist_ok=True)
         
         print(f"   📂 Run Output: {run_folder}")
-        print(f"   📂 DWH Update: {dwh_folder}")
+        if update_dwh:
+            print(f"   📂 DWH Update: {dwh_folder}")
 
         # -------------------------------------------------------
         # STEP A: Prepare Data Frames
         # -------------------------------------------------------
         
         # 1. Marketing Data
-        df_mkt_export = self.df_marketing.copy()
-        if np.random.random() < self.params['missing_data_prob']:
-            drop_days = np.random.choice(df_mkt_export['date_id'].unique(), size=5)
-            print(f"      ⚠️  CHAOS: Removed Marketing Data for days: {drop_days}")
-            df_mkt_export = df_mkt_export[~df_mkt_export['date_id'].isin(drop_days)]
+        df_mkt_export = self.df_marketing
 
         # 2. Financial Data
         cols = ['order_id', 'date_id', 'marketing_channel', 'price', 'acquisition_cost', 'carrier_cost', 'ops_cost', 'net_profit']
-        df_fin_export = self.df_final_orders[cols].copy()
+        df_fin_export = self.df_final_orders[cols]
+
+        # 3. Inject Data Quality Issues (Chaos) - the in-memory frames stay clean
+        df_mkt_export = self.inject_chaos(df_mkt_export, 'fact_marketing_daily')
+        df_fin_export = self.inject_chaos(df_fin_export, 'fact_financials')
 
         # -------------------------------------------------------
-        # STEP B: WRITE TO RUN FOLDER (For GUI History)
+        # STEP B: WRITE TO RUN FOLDER (For GUI History) - serialized once
         # -------------------------------------------------------
         print("   -> Saving to History Folder (GUI)...")
-        df_mkt_export.round(2).to_csv(os.path.join(run_folder, "fact_marketing_daily.csv"), index=False)
-        df_fin_export.round(2).to_csv(os.path.join(run_folder, "fact_financials.csv"), index=False)
+        fact_tables = {'fact_marketing_daily': df_mkt_export, 'fact_financials': df_fin_export}
+        for name, df_fact in fact_tables.items():
+            export_sink.write_table(df_fact.round(2), run_folder, name, self.export_formats)
+
+        if not update_dwh:
+            print(f"✅ EXPORT COMPLETE (run folder only).")
+            return
+
+        self.publish_dwh()
+        print(f"✅ EXPORT COMPLETE.")
+
+    def validate_output(self):
+        # Physics checks of Validation_engine on the in-memory frames (see physics_checks.py)
+        print("   🔬 Physics checks (in-memory)...")
+        results = physics_checks.run(self.df_marketing, self.df_final_orders)
+        for r in results:
+            blocking = r['check'] in physics_checks.BLOCKING
+            icon = "✅" if r['status'] == 'pass' else ("❌" if blocking else "⚠️ ")
+            print(f"      {icon} {r['check']:<42} {r['rows']:>6,}  {r['seconds'] * 1000:.1f}ms")
+        if any(r['status'] == 'fail' and r['check'] in physics_checks.BLOCKING for r in results):
+            raise physics_checks.PhysicsViolation(results)
+        return results
+
+    def inject_chaos(self, df, table):
+        rows = len(df)
+        df = chaos.apply(df, chaos.profile(self.params, table), self.seed, table)
+        if len(df) != rows:
+            print(f"      ⚠️  CHAOS: {table} {rows:,} -> {len(df):,} rows")
+        return df
+
+    def publish_dwh(self):
+        # Steps C + D: shared DWH folder. Concurrent jobs must serialize this call.
+        run_folder = self.output_folder
+        dwh_folder = os.path.join(project_root, "dwh(ready_to_be_analyzed)")
+        os.makedirs(dwh_folder, exist_ok=True)
 
         # -------------------------------------------------------
-        # STEP C: WRITE TO DWH FOLDER (For Analysis)
+        # STEP C: LINK INTO DWH FOLDER (For Analysis) - hard links, no rewrite
         # -------------------------------------------------------
         print("   -> Updating Master DWH Folder...")
-        df_mkt_export.round(2).to_csv(os.path.join(dwh_folder, "fact_marketing_daily.csv"), index=False)
-        df_fin_export.round(2).to_csv(os.path.join(dwh_folder, "fact_financials.csv"), index=False)
+        export_sink.link_tables(run_folder, dwh_folder, ['fact_marketing_daily', 'fact_financials'])
 
         # -------------------------------------------------------
         # STEP D: Export Static Dimensions & Reviews (To DWH Folder Only)
         # -------------------------------------------------------
-        
+        # Skipped entirely while the DWH build version is unchanged
         tables_to_export = {
             'dim_date': "SELECT * FROM dwh.dim_date WHERE date BETWEEN '2017-01-01' AND '2018-08-31'",
             'dim_products': "SELECT * FROM dwh.dim_products",
             'dim_sellers': "SELECT * FROM dwh.dim_sellers",
             'dim_customers': "SELECT * FROM dwh.dim_customers",
         }
-        
-        for name, query in tables_to_export.items():
-            try:
-                df_table = pd.read_sql(query, engine)
-                df_table.to_csv(os.path.join(dwh_folder, f"{name}.csv"), index=False)
-            except Exception as e:
-                print(f"      ❌ Error exporting {name}: {e}")
-
-        print(f"✅ EXPORT COMPLETE.")
+        if self.offline:
+            print("      -> ⏭️  Offline run: dimensions left as they are")
+        else:
+            dims_version = self.context_version
+            if dims_version is None:
+                try:
+                    dims_version = context_snapshot.dwh_version(engine)
+                except Exception as e:
+                    print(f"      ⚠️  DWH version unknown ({type(e).__name__}), re-exporting dimensions")
+            export_sink.export_dimensions(dwh_folder, tables_to_export, engine, dims_version, self.export_formats)
               
 if __name__ == "__main__":
     sim = OlistMasterEngineV5("Hard", "Final_Output_V5")
@@ -339,4 +409,4 @@ if __name__ == "__main__":
     sim.simulate_marketing()
     sim.run_attribution_engine()
     sim.calculate_financials()
-    sim.export()
\ No newline at end of file
+    sim.export(update_dwh='--no-dwh' not in sys.argv)
\ No newline at end of file
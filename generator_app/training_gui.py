@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font
-import threading
 import os
 import sys
 
@@ -10,12 +9,15 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from training_engine import OlistMasterEngineV5
-except ImportError:
-    print(" CRITICAL: 'final_simulation_engine.py' not found.")
+# The engine (pandas / numpy / SQLAlchemy) is only imported inside the worker
+# processes; the window itself just checks that the module is there.
+import importlib.util
+ENGINE_AVAILABLE = importlib.util.find_spec('training_engine') is not None
+if not ENGINE_AVAILABLE:
+    print(" CRITICAL: 'training_engine.py' not found.")
     print("   Please save the engine code in the same folder as this launcher.")
-    OlistMasterEngineV5 = None
+
+from job_queue import JobQueue
 
 # ==========================================
 # 2. STYLING CONFIG
@@ -27,11 +29,14 @@ OLIST_BG     = "#F4F6F9"
 OLIST_WHITE  = "#FFFFFF"
 TEXT_DARK    = "#333333"
 
+JOB_POLL_MS  = 150
+LOG_MAX_LINES = 500
+
 class OlistLauncherApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Olist Master Engine V5 | Control Center")
-        self.root.geometry("700x680")
+        self.root.geometry("760x980")
         self.root.configure(bg=OLIST_BG)
         
         self.set_icon()
@@ -95,8 +100,32 @@ class OlistLauncherApp:
         self.lbl_data_desc = tk.Label(card3, text="", bg="#e0f2f1", fg="#00695c", font=("Segoe UI", 9), anchor="w", padx=5)
         self.lbl_data_desc.pack(fill="x", pady=(5, 0))
 
+        # 4. Job Queue (worker processes, one isolated folder per job)
+        self.create_section_label(main_frame, "4. Job Queue")
+        card4 = self.create_card(main_frame)
+
+        self.tree_jobs = ttk.Treeview(card4, columns=("job", "scenario", "status", "phase", "rows"),
+                                      show="headings", height=5, selectmode="browse")
+        for col, title, width in [("job", "#", 40), ("scenario", "Scenario", 240), ("status", "Status", 90),
+                                  ("phase", "Phase", 170), ("rows", "Rows", 70)]:
+            self.tree_jobs.heading(col, text=title)
+            self.tree_jobs.column(col, width=width, anchor="w")
+        self.tree_jobs.pack(fill="x")
+        self.tree_jobs.bind("<<TreeviewSelect>>", lambda e: self.refresh_progress())
+        self.tree_jobs.bind("<Double-1>", self.open_job_folder)
+
+        row = tk.Frame(card4, bg=OLIST_WHITE)
+        row.pack(fill="x", pady=(8, 0))
+        self.progress = ttk.Progressbar(row, mode="determinate", maximum=100)
+        self.progress.pack(side="left", fill="x", expand=True)
+        tk.Button(row, text="Cancel Job", bg="#eee", relief="flat", cursor="hand2",
+                  command=self.cancel_selected).pack(side="right", padx=(10, 0))
+
+        self.txt_log = tk.Text(card4, height=8, font=("Consolas", 8), bg="#fafafa", relief="flat", state="disabled")
+        self.txt_log.pack(fill="x", pady=(8, 0))
+
         # --- ACTION BUTTON ---
-        self.btn_run = tk.Button(root, text=" INITIALIZE MASTER ENGINE", bg=OLIST_YELLOW, fg=OLIST_NAVY,
+        self.btn_run = tk.Button(root, text=" QUEUE SIMULATION JOB", bg=OLIST_YELLOW, fg=OLIST_NAVY,
                                  font=("Segoe UI", 11, "bold"), relief="flat", cursor="hand2",
                                  command=self.start_simulation)
         self.btn_run.pack(fill="x", side="bottom", padx=30, pady=20, ipady=5)
@@ -107,6 +136,14 @@ class OlistLauncherApp:
         # Initialize descriptions
         self.update_descriptions(None)
 
+        # Job queue + event pump
+        self.jobs = JobQueue(max_workers=2)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(JOB_POLL_MS, self.poll_jobs)
+        # Standby workers load the engine + world context while the form is filled in
+        if ENGINE_AVAILABLE:
+            self.root.after(100, self.jobs.prewarm)
+
     # --- UI HELPERS ---
     def create_section_label(self, parent, text):
         tk.Label(parent, text=text, bg=OLIST_BG, fg=OLIST_NAVY, font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(15, 5))
@@ -137,8 +174,8 @@ class OlistLauncherApp:
         # Data Quality Desc
         d_val = self.var_data.get()
         if d_val == "Clean": d_msg = " Pristine Data. No Nulls. No API Failures. Perfect Tracking."
-        elif d_val == "Messy": d_msg = " Realistic Gaps. 5% Missing Attribution (Nulls). Occasional API drops."
-        else: d_msg = " Data Hell. 20% Missing Pixels. Multi-day API Outages. Human Errors."
+        elif d_val == "Messy": d_msg = " Realistic Gaps. 5% Missing Attribution (Nulls). Occasional API drops & duplicates."
+        else: d_msg = " Data Hell. 20% Missing Pixels. Multi-day API Outages. Late Rows, Duplicates, Currency Errors."
         self.lbl_data_desc.config(text=d_msg)
 
     # --- ENGINE LOGIC ---
@@ -150,62 +187,82 @@ class OlistLauncherApp:
         if not name:
             messagebox.showwarning("Validation Error", "Please enter a Scenario Name.")
             return
+        if not ENGINE_AVAILABLE:
+            messagebox.showerror("Simulation Error", "Engine Class not found. Check 'training_engine.py'.")
+            return
 
-        # Folder structure: Name_Market-Hard_Data-Messy
-        output_folder = os.path.join("Training_Output", f"{name}_M-{market_diff}_D-{data_diff}")
-        
-        self.btn_run.config(state="disabled", text=" ENGINE V5 PROCESSING...", bg="#ccc")
-        self.status_bar.config(text="Running Simulation Pipeline...", fg=OLIST_NAVY)
-        
-        # Run in thread to keep GUI responsive
-        threading.Thread(target=self.run_engine_logic, args=(market_diff, data_diff, output_folder)).start()
+        # Folder structure: Name_Market-Hard_Data-Messy (suffixed _J<n> if that folder is busy)
+        job_id = self.jobs.submit(name, market_diff, data_diff)
+        job = self.jobs.jobs[job_id]
+        self.tree_jobs.insert("", "end", iid=str(job_id), values=(job_id, os.path.basename(job['folder']), "queued", "Queued", ""))
+        self.tree_jobs.selection_set(str(job_id))
+        self.status_bar.config(text=f"Job #{job_id} queued ({self.jobs.running_count()} running).", fg=OLIST_NAVY)
 
-    def run_engine_logic(self, market_diff, data_diff, folder):
-        try:
-            if OlistMasterEngineV5 is None:
-                raise Exception("Engine Class not found. Check 'final_simulation_engine.py'.")
-
-            # 1. Initialize Engine with Market Physics
-            sim = OlistMasterEngineV5(difficulty=market_diff, output_folder=folder)
-            
-            # 2. OVERRIDE Chaos Parameters based on Data Difficulty (Decoupling Logic)
-            if data_diff == "Clean":
-                sim.params['chaos_level'] = 0.0
-                sim.params['missing_data_prob'] = 0.0
-            elif data_diff == "Messy":
-                sim.params['chaos_level'] = 0.05
-                sim.params['missing_data_prob'] = 0.05
-            elif data_diff == "Nightmare":
-                sim.params['chaos_level'] = 0.20
-                sim.params['missing_data_prob'] = 0.15
-            
-            print(f"🔧 GUI INJECTION: Chaos={sim.params['chaos_level']}, MissingProb={sim.params['missing_data_prob']}")
-
-            # 3. Execute Pipeline
-            sim.load_context()
-            sim.simulate_marketing()
-            sim.run_attribution_engine()
-            sim.calculate_financials()
-            sim.export() # This now handles CSV + Full DWH export
-
-            self.root.after(0, lambda: self.finish_success(folder))
-
-        except Exception as e:
-            self.root.after(0, lambda: self.finish_error(str(e)))
-
-    def finish_success(self, folder):
-        self.btn_run.config(state="normal", text=" INITIALIZE MASTER ENGINE", bg=OLIST_YELLOW)
-        self.status_bar.config(text="Simulation Complete.", fg="green")
-        
-        msg = f"Engine V5 Execution Successful!\n\n📂 Output Folder:\n{folder}\n\n📦 Note: A full 'dwh(ready_to_be_analyzed)' folder was also updated in the project root."
-        resp = messagebox.askyesno("Success", msg + "\n\nOpen Output Folder?")
-        if resp and os.name == 'nt':
-            os.startfile(os.path.abspath(folder))
-
-    def finish_error(self, err):
-        self.btn_run.config(state="normal", text=" INITIALIZE MASTER ENGINE", bg=OLIST_YELLOW)
-        self.status_bar.config(text="Execution Failed.", fg="red")
-        messagebox.showerror("Simulation Error", f"Traceback:\n{err}")
+    def poll_jobs(self):
+        # Runs on the Tk thread: drain worker events, refresh table / progress / log
+        for ev in self.jobs.poll():
+            if ev['job'] is None:  # standby worker warm-up
+                if ev['type'] == 'worker_ready' and 'error' not in ev and not self.jobs.running_count():
+                    self.status_bar.config(text=f"Engine warm ({ev['seconds']:.1f}s). Ready to simulate.", fg="green")
+                elif ev['type'] == 'log':
+                    self.append_log(f"[warm-up] {ev['text']}")
+                continue
+            job = self.jobs.jobs[ev['job']]
+            if ev['type'] == 'log':
+                self.append_log(f"[#{job['id']}] {ev['text']}")
+                continue
+            rows = "" if job['rows'] is None else f"{job['rows']:,}"
+            self.tree_jobs.item(str(job['id']), values=(job['id'], os.path.basename(job['folder']), job['status'], job['label'], rows))
+            if ev['type'] == 'done':
+                self.finish_success(job)
+            elif ev['type'] == 'error':
+                self.finish_error(job)
+            elif ev['type'] == 'cancelled':
+                self.status_bar.config(text=f"Job #{job['id']} cancelled.", fg="#777")
+        self.refresh_progress()
+        self.root.after(JOB_POLL_MS, self.poll_jobs)
+
+    def selected_job(self):
+        sel = self.tree_jobs.selection()
+        return self.jobs.jobs.get(int(sel[0])) if sel else None
+
+    def refresh_progress(self):
+        job = self.selected_job()
+        self.progress['value'] = 0 if job is None else 100.0 * job['step'] / job['total']
+
+    def append_log(self, line):
+        self.txt_log.config(state="normal")
+        self.txt_log.insert("end", line + "\n")
+        excess = int(self.txt_log.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.txt_log.delete("1.0", f"{excess + 1}.0")
+        self.txt_log.see("end")
+        self.txt_log.config(state="disabled")
+
+    def cancel_selected(self):
+        job = self.selected_job()
+        if job is not None:
+            self.jobs.cancel(job['id'])
+            rows = "" if job['rows'] is None else f"{job['rows']:,}"
+            self.tree_jobs.item(str(job['id']), values=(job['id'], os.path.basename(job['folder']), job['status'], job['label'], rows))
+
+    def open_job_folder(self, event):
+        job = self.selected_job()
+        if job is not None and job['status'] == 'done' and os.name == 'nt':
+            os.startfile(os.path.abspath(job['folder']))
+
+    def on_close(self):
+        if self.jobs.running_count() and not messagebox.askyesno("Jobs Running", "Cancel running jobs and exit?"):
+            return
+        self.jobs.shutdown()
+        self.root.destroy()
+
+    def finish_success(self, job):
+        self.status_bar.config(text=f"Job #{job['id']} complete -> {job['folder']} (DWH folder updated).", fg="green")
+
+    def finish_error(self, job):
+        self.status_bar.config(text=f"Job #{job['id']} failed.", fg="red")
+        messagebox.showerror("Simulation Error", f"Job #{job['id']} ({job['folder']}):\n{job['error']}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# ==========================================
+# ZIP-PREFIX DISTANCE INDEX (SELLER -> CUSTOMER)
+# ==========================================
+# dwh.dim_geo_zip holds one centroid per 5-digit zip prefix, deduplicated from
+# raw_geolocation at DWH build (02). Prefixes are kept as a sorted array, so
+# locating every seller / customer of the warehouse is one searchsorted call,
+# and leg lengths come from a vectorized haversine: the whole order set is
+# priced in a few milliseconds.
+# Legs whose prefix has no centroid come back as NaN; fill_missing() gives them
+# the median leg. Used by 02 (fact_orders.distance_km), 05 (carrier cost, SLA
+# grace) and the simulator's finance kernel. 05 takes that median over every leg
+# in the warehouse (known_median), so an incremental run fills the same value
+# as a --full rebuild.
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_DISTANCE_KM = 430.0  # typical Olist leg, used when no leg at all is known
+
+# Logistics pricing
+CARRIER_KM_RATE = 0.002      # R$ per km on top of the freight markup (R$ 2 per 1,000 km)
+SLA_GRACE_DAYS = 2           # delivered later than estimate + grace -> SLA penalty
+SLA_KM_PER_GRACE_DAY = 1000  # long hauls get one more grace day per 1,000 km
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    # Great-circle distance between degree coordinates (NaN in -> NaN out)
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class ZipIndex:
+    def __init__(self, centroids):
+        # centroids: zip_prefix, lat, lng (one row per prefix, dwh.dim_geo_zip)
+        df = centroids.dropna(subset=['zip_prefix', 'lat', 'lng']).sort_values('zip_prefix')
+        self.zips = df['zip_prefix'].to_numpy(dtype=np.int64)
+        self.lat = df['lat'].to_numpy(dtype=float)
+        self.lng = df['lng'].to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.zips)
+
+    def locate(self, zips):
+        # zip prefixes -> (lat, lng) arrays, NaN where the prefix is unknown
+        z = pd.to_numeric(pd.Series(np.asarray(zips)), errors='coerce').to_numpy(dtype=float)
+        lat = np.full(len(z), np.nan)
+        lng = np.full(len(z), np.nan)
+        if not len(self.zips):
+            return lat, lng
+        known = ~np.isnan(z)
+        keys = np.where(known, z, -1).astype(np.int64)
+        pos = np.minimum(np.searchsorted(self.zips, keys), len(self.zips) - 1)
+        hit = known & (self.zips[pos] == keys)
+        lat[hit] = self.lat[pos[hit]]
+        lng[hit] = self.lng[pos[hit]]
+        return lat, lng
+
+    def distance_km(self, from_zips, to_zips):
+        return haversine_km(*self.locate(from_zips), *self.locate(to_zips))
+
+def known_median(engine, schema='dwh'):
+    # Median of every located seller -> customer leg on fact_orders (DEFAULT_DISTANCE_KM when none is)
+    median = pd.read_sql(text(f"""
+        SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY distance_km) AS median_km
+        FROM (SELECT DISTINCT order_id, seller_id, distance_km FROM {schema}.fact_orders) legs
+        WHERE distance_km IS NOT NULL
+    """), engine)['median_km'].iloc[0]
+    return float(median) if pd.notna(median) else DEFAULT_DISTANCE_KM
+
+def fill_missing(distance_km, fill=None):
+    # Unknown legs -> `fill`, by default the median known leg of this batch
+    # (DEFAULT_DISTANCE_KM when none is known)
+    d = np.asarray(distance_km, dtype=float)
+    known = ~np.isnan(d)
+    if fill is None:
+        fill = float(np.median(d[known])) if known.any() else DEFAULT_DISTANCE_KM
+    return np.where(known, d, fill)
+
+def line_haul(distance_km):
+    return distance_km * CARRIER_KM_RATE
+
+def sla_grace_days(distance_km):
+    return SLA_GRACE_DAYS + np.floor(distance_km / SLA_KM_PER_GRACE_DAY)
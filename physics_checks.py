@@ -0,0 +1,158 @@
+import time
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# IN-MEMORY PHYSICS CHECKS
+# ==========================================
+# The physics / causality checks of Validation_engine (engine_validation.sql,
+# stateful_casuality.sql) evaluated directly on DataFrames, so a bad simulator
+# batch is rejected before anything is exported or loaded.
+#   marketing: date_id, channel, spend, clicks   (simulator df_marketing, 03 df_marketing)
+#   orders:    date_id, marketing_channel, order_id, acquisition_cost
+#              (simulator df_final_orders, 05 fact_financials frame)
+# Channel columns are labels or channel_dim categoricals (codes = dim_channel keys).
+# Each check reduces its inputs to date x channel first and returns the violating
+# rows with the same columns as the matching validation.violation_* view.
+
+ORGANIC = ('Direct/Organic', 'Organic_SEO')
+MAX_CONVERSION_RATE = 0.40   # demand overflow
+SCALING_MIN_SPEND = 500      # infinite scaling
+SCALING_JUMP = 1.5
+SCALING_EXEMPT = ('Email_Marketing',)
+MAX_LEVERAGE_DELTA = 0.50    # attribution skew
+MAX_ROLLING_DRIFT = 500      # rolling mass balance (7 days)
+
+# Impossible outcomes reject a batch. Waste, spikes and skew are part of the game
+# (the analyst is meant to find them) and are only reported.
+BLOCKING = ('violation_physics_demand_overflow', 'violation_temporal_future_leakage')
+
+class PhysicsViolation(ValueError):
+    def __init__(self, results, blocking=BLOCKING):
+        self.results = results
+        failed = [f"{r['check']} ({r['rows']:,})" for r in results if r['status'] == 'fail' and r['check'] in blocking]
+        super().__init__(f"Physics checks failed: {', '.join(failed)}")
+
+# ==========================================
+# ROLLUPS (date x channel)
+# ==========================================
+
+def marketing_daily(marketing):
+    return marketing.groupby(['date_id', 'channel'], as_index=False, sort=True, observed=True)[['spend', 'clicks']].sum()
+
+def orders_daily(orders):
+    g = orders.groupby(['date_id', 'marketing_channel'], as_index=False, sort=True, observed=True)
+    out = g['order_id'].count().rename(columns={'order_id': 'conversions'})
+    out['item_rows'] = g.size()['size'].to_numpy()
+    out['acquisition_cost'] = g['acquisition_cost'].sum()['acquisition_cost'].to_numpy()
+    return out
+
+def _mkt(marketing, m):
+    return m if m is not None else marketing_daily(marketing)
+
+def _ord(orders, o):
+    return o if o is not None else orders_daily(orders)
+
+# ==========================================
+# CHECKS
+# ==========================================
+
+def demand_overflow(marketing, orders, m=None, o=None):
+    # More conversions than clicks, or an implausible conversion rate
+    t = _mkt(marketing, m)
+    c = _ord(orders, o)
+    df = t.merge(c, left_on=['date_id', 'channel'], right_on=['date_id', 'marketing_channel'])
+    traffic = df['clicks'].to_numpy(dtype=float)
+    conv = df['conversions'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(traffic != 0, conv / traffic, np.nan)
+    bad = (conv > traffic) | (rate > MAX_CONVERSION_RATE)
+    return pd.DataFrame({'date_id': df['date_id'], 'channel': df['channel'], 'traffic_in': df['clicks'],
+                         'conversions_out': df['conversions'], 'conversion_rate': rate})[bad].reset_index(drop=True)
+
+def infinite_scaling(marketing, orders=None, m=None, o=None):
+    # Spend and clicks both jump >150% day over day (no diminishing returns)
+    df = _mkt(marketing, m)
+    df = df[df['spend'] > SCALING_MIN_SPEND].copy()
+    g = df.groupby('channel', sort=False, observed=True)
+    df['prev_spend'] = g['spend'].shift()
+    df['prev_clicks'] = g['clicks'].shift()
+    df['delta_spend'] = df['spend'] - df['prev_spend']
+    df['delta_clicks'] = df['clicks'] - df['prev_clicks']
+    bad = (df['spend'] > df['prev_spend'] * SCALING_JUMP) \
+        & (df['delta_clicks'] > df['prev_clicks'] * SCALING_JUMP) \
+        & ~df['channel'].isin(SCALING_EXEMPT)
+    return df[bad].reset_index(drop=True)
+
+def attribution_skew(marketing, orders, m=None, o=None):
+    # A channel's share of orders far above its share of spend on the same day
+    s = _mkt(marketing, m)
+    total = s.groupby('date_id')['spend'].transform('sum')
+    s = s.assign(share_of_spend=s['spend'] / total.where(total != 1))
+    a = _ord(orders, o)
+    a = a[~a['marketing_channel'].isin(['Direct/Organic', 'Unknown'])]
+    day_rows = a.groupby('date_id')['item_rows'].transform('sum')
+    a = a.assign(share_of_orders=a['item_rows'] / day_rows.where(day_rows != 1))
+    df = s.merge(a, left_on=['date_id', 'channel'], right_on=['date_id', 'marketing_channel'])
+    delta = df['share_of_orders'] - df['share_of_spend']
+    return pd.DataFrame({'date_id': df['date_id'], 'channel': df['channel'],
+                         'spend_share': df['share_of_spend'].round(2), 'order_share': df['share_of_orders'].round(2),
+                         'leverage_delta': delta})[delta > MAX_LEVERAGE_DELTA].reset_index(drop=True)
+
+def rolling_mass_balance(marketing, orders, m=None, o=None):
+    # Platform spend vs ledger CAC, 7-day rolling drift
+    spend = _mkt(marketing, m).groupby('date_id')['spend'].sum()
+    cac = _ord(orders, o).groupby('date_id')['acquisition_cost'].sum()
+    daily = pd.concat([spend, cac], axis=1).fillna(0).sort_index()
+    diff = (daily['spend'] - daily['acquisition_cost']).to_numpy(dtype=float)
+    csum = np.concatenate([[0.0], np.cumsum(diff)])
+    idx = np.arange(1, len(diff) + 1)
+    rolling = csum[idx] - csum[np.maximum(idx - 7, 0)]
+    df = pd.DataFrame({'date_id': daily.index.to_numpy(), 'daily_diff': diff, 'rolling_7d_drift': rolling})
+    return df[np.abs(rolling) > MAX_ROLLING_DRIFT].reset_index(drop=True)
+
+def future_leakage(marketing, orders, m=None, o=None):
+    # Paid orders dated before their channel's first marketing activity
+    first = _mkt(marketing, m).groupby('channel', observed=True)['date_id'].min().rename('first_channel_activity_date')
+    df = _ord(orders, o)
+    df = df[~df['marketing_channel'].isin(ORGANIC)].join(first, on='marketing_channel', how='inner')
+    df = df[df['date_id'] < df['first_channel_activity_date']]
+    return pd.DataFrame({'order_date': df['date_id'], 'marketing_channel': df['marketing_channel'],
+                         'order_count': df['conversions'],
+                         'first_channel_activity_date': df['first_channel_activity_date']}).reset_index(drop=True)
+
+# view name -> (check, incident count of its violation rows)
+CHECKS = {
+    'violation_physics_demand_overflow': (demand_overflow, len),
+    'violation_physics_infinite_scaling': (infinite_scaling, len),
+    'violation_physics_attribution_skew': (attribution_skew, len),
+    'violation_physics_rolling_mass_balance': (rolling_mass_balance, len),
+    'violation_temporal_future_leakage': (future_leakage, lambda df: int(df['order_count'].sum())),
+}
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+def run(marketing, orders, checks=None, fail_fast=False):
+    # -> [{'check', 'status', 'rows', 'seconds', 'violations'}] in CHECKS order
+    m = marketing_daily(marketing)
+    o = orders_daily(orders)
+    results = []
+    for name in (checks or CHECKS):
+        fn, count = CHECKS[name]
+        started = time.perf_counter()
+        violations = fn(marketing, orders, m=m, o=o)
+        rows = count(violations)
+        results.append({'check': name, 'status': 'fail' if rows else 'pass', 'rows': rows,
+                        'seconds': round(time.perf_counter() - started, 4), 'violations': violations})
+        if fail_fast and rows:
+            break
+    return results
+
+def assert_clean(marketing, orders, blocking=BLOCKING):
+    # Runs every check, raises if a blocking one found violations
+    results = run(marketing, orders)
+    if any(r['status'] == 'fail' and r['check'] in blocking for r in results):
+        raise PhysicsViolation(results, blocking)
+    return results
@@ -1,7 +1,5 @@
 import pandas as pd
 from sqlalchemy import create_engine, text
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import os
 import sys
 
@@ -14,15 +12,13 @@ sys.path.append(project_root)
 
 import db_config
 
-DB_USER = db_config.DB_CONFIG['user']
-DB_PASS = db_config.DB_CONFIG['pass']
-DB_HOST = db_config.DB_CONFIG['host']
-DB_NAME = db_config.DB_CONFIG['db']
+DB_NAME = db_config.DUCKDB_PATH if db_config.is_embedded() else db_config.DB_CONFIG['db']
 
 engine = db_config.get_engine()
 
-DATA_FOLDER = os.path.join(project_root, "data")
-JSON_FOLDER = os.path.join(project_root, "json_source")
+# Overridable for fixture / scratch loads (e.g. benchmark.py)
+DATA_FOLDER = os.environ.get("OLIST_DATA_DIR", os.path.join(project_root, "data"))
+JSON_FOLDER = os.environ.get("OLIST_JSON_DIR", os.path.join(project_root, "json_source"))
 
 print(f"📂 Execution Context: {project_root}")
 
@@ -32,19 +28,10 @@ print(f"📂 Execution Context: {project_root}")
 print("\n⚙️  Step 1: Initializing Database Infrastructure...")
 
 try:
-    con = psycopg2.connect(dbname='postgres', user=DB_USER, host=DB_HOST, password=DB_PASS)
-    con.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-    cur = con.cursor()
-    
-    cur.execute(f"SELECT 1 FROM pg_database WHERE datname = '{DB_NAME}'")
-    if not cur.fetchone():
-        cur.execute(f"CREATE DATABASE {DB_NAME}")
+    if db_config.ensure_database():
         print(f"    ✅ Database '{DB_NAME}' created successfully.")
     else:
         print(f"    ℹ️  Database '{DB_NAME}' already exists.")
-    
-    cur.close()
-    con.close()
 except Exception as e:
     print(f"❌ Critical Error in DB Creation: {e}")
     sys.exit(1)
@@ -72,6 +59,13 @@ for csv_file, table_name in files_map.items():
     if os.path.exists(file_path):
         try:
             print(f"    ⏳ Ingesting: {table_name}...")
+            if db_config.is_embedded():
+                # The embedded engine scans the CSV itself (typed, in parallel)
+                with engine.begin() as conn:
+                    conn.execute(text(f"CREATE OR REPLACE TABLE public.{table_name} AS SELECT * FROM read_csv(:path, header = true)"),
+                                 {'path': file_path})
+                print(f"       -> ✅ Success: {table_name}")
+                continue
             chunk_size = 10000
             first_chunk = True
             
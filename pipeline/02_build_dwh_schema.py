@@ -2,6 +2,8 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import os
 import sys
+import uuid
+from datetime import datetime
 
 # ==========================================
 # 1. SETUP PATHS & DB CONNECTION
@@ -13,6 +15,10 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 import db_config
+import stable_hash
+import bulk_writer
+import geo_index
+import channel_dim
 
 engine = db_config.get_engine()
 
@@ -61,7 +67,8 @@ with engine.begin() as conn:
     DROP TABLE IF EXISTS dwh.dim_sellers;
     CREATE TABLE dwh.dim_sellers AS
     SELECT 
-        seller_id, seller_zip_code_prefix, seller_state, seller_city
+        seller_id, seller_zip_code_prefix, seller_state, seller_city,
+        NULL::DOUBLE PRECISION as comm_rate
     FROM public.raw_sellers;
     """
     exec_sql(conn, q_dim_sell, "dim_sellers")
@@ -76,11 +83,39 @@ with engine.begin() as conn:
     """
     exec_sql(conn, q_dim_cust, "dim_customers")
 
+    # Dim Geo Zip (one centroid per zip prefix; raw_geolocation repeats points and
+    # carries a few mis-geocoded rows outside Brazil)
+    q_dim_geo = """
+    DROP TABLE IF EXISTS dwh.dim_geo_zip;
+    CREATE TABLE dwh.dim_geo_zip AS
+    SELECT
+        geolocation_zip_code_prefix as zip_prefix,
+        AVG(geolocation_lat) as lat,
+        AVG(geolocation_lng) as lng,
+        MAX(geolocation_state) as state,
+        COUNT(*) as points
+    FROM (
+        SELECT DISTINCT geolocation_zip_code_prefix, geolocation_lat, geolocation_lng, geolocation_state
+        FROM public.raw_geolocation
+        WHERE geolocation_lat BETWEEN -34 AND 6
+          AND geolocation_lng BETWEEN -74 AND -28
+    ) g
+    GROUP BY 1;
+    """
+    exec_sql(conn, q_dim_geo, "dim_geo_zip")
+
+    # Dim Channel (fixed SMALLINT keys, see channel_dim; upserted, never dropped)
+    channel_dim.ensure_table(conn, schema='dwh')
+    print("    ✅ dim_channel")
+
     # -------------------------------------------------------
     # 2. FACTS (The Core)
     # -------------------------------------------------------
     print("\n   [Facts Layer]")
 
+    # Validation snapshots pinning the current fact tables keep them (moved, not dropped)
+    bulk_writer.release_snapshot(conn, 'dwh.fact_orders', 'replace')
+
     # Fact Orders (Grain: Item Level)
     q_fact_orders = """
     DROP TABLE IF EXISTS dwh.fact_orders;
@@ -100,9 +135,10 @@ with engine.begin() as conn:
         i.price,
         i.freight_value,
         (i.price + i.freight_value) as total_value,
-        NULL::VARCHAR(50) as marketing_channel,
+        NULL::SMALLINT as channel_key,
         NULL::DECIMAL(10,2) as acquisition_cost,
-        NULL::DECIMAL(10,2) as net_profit
+        NULL::DECIMAL(10,2) as net_profit,
+        NULL::DOUBLE PRECISION as distance_km
     FROM public.raw_orders o 
     JOIN public.raw_order_items i ON o.order_id = i.order_id;
     """
@@ -143,10 +179,67 @@ with engine.begin() as conn:
     conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fact_orders_seller ON dwh.fact_orders(seller_id);"))
     conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fact_pay_order ON dwh.fact_payments(order_id);"))
     conn.execute(text("CREATE INDEX IF NOT EXISTS idx_fact_rev_order ON dwh.fact_reviews(order_id);"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_dim_geo_zip ON dwh.dim_geo_zip(zip_prefix);"))
     print("    ✅ Indexes created.")
 
 # -------------------------------------------------------
-# 3. Time Dimension
+# 3. Deterministic Entity Attributes (Hashed Once per Entity)
+# -------------------------------------------------------
+print("\n   [Deterministic Attributes]")
+try:
+    # Seller commission tier (adler32), persisted here so downstream stages
+    # read it instead of re-hashing every run
+    df_sell_hash = pd.read_sql("SELECT seller_id FROM dwh.dim_sellers", engine)
+    df_sell_hash['comm_rate'] = stable_hash.commission_rate(df_sell_hash['seller_id'])
+
+    bulk_writer.write_table(df_sell_hash, 'temp_seller_hash', engine, schema='public')
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE dwh.dim_sellers s SET comm_rate = t.comm_rate
+            FROM temp_seller_hash t WHERE s.seller_id = t.seller_id
+        """))
+        conn.execute(text("DROP TABLE temp_seller_hash"))
+    print(f"    ✅ Hashed {len(df_sell_hash):,} sellers.")
+except Exception as e:
+    print(f"    ❌ Error hashing entity attributes: {e}")
+    sys.exit(1)
+
+# -------------------------------------------------------
+# 4. Seller -> Customer Distances (Zip Centroids)
+# -------------------------------------------------------
+# One haversine pass over every order leg; 05 and the simulator price carrier
+# cost and SLA grace from fact_orders.distance_km (see geo_index)
+print("\n   [Geospatial Distances]")
+try:
+    zip_index = geo_index.ZipIndex(pd.read_sql("SELECT zip_prefix, lat, lng FROM dwh.dim_geo_zip", engine))
+    df_legs = pd.read_sql("""
+        SELECT DISTINCT f.order_id, f.seller_id,
+               s.seller_zip_code_prefix as seller_zip, c.customer_zip_code_prefix as customer_zip
+        FROM dwh.fact_orders f
+        LEFT JOIN dwh.dim_sellers s ON f.seller_id = s.seller_id
+        LEFT JOIN dwh.dim_customers c ON f.customer_id = c.customer_id
+    """, engine)
+    df_legs['distance_km'] = zip_index.distance_km(df_legs['seller_zip'], df_legs['customer_zip'])
+
+    bulk_writer.write_table(df_legs[['order_id', 'seller_id', 'distance_km']], 'temp_order_distance', engine,
+                            schema='public', indexes=[('order_id', 'seller_id')])
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE dwh.fact_orders f SET distance_km = t.distance_km
+            FROM temp_order_distance t WHERE f.order_id = t.order_id AND f.seller_id = t.seller_id
+        """))
+        conn.execute(text("DROP TABLE temp_order_distance"))
+    located = df_legs['distance_km'].notna()
+    print(f"    ✅ {len(zip_index):,} zip centroids | {located.sum():,} / {len(df_legs):,} legs located "
+          f"(median {df_legs.loc[located, 'distance_km'].median():,.0f} km).")
+except Exception as e:
+    print(f"    ❌ Error computing distances: {e}")
+    sys.exit(1)
+
+# -------------------------------------------------------
+# 5. Time Dimension
 # -------------------------------------------------------
 print("\n   [Time Intelligence]")
 try:
@@ -164,4 +257,19 @@ try:
 except Exception as e:
     print(f"    ❌ Error generating dim_date: {e}")
 
+# -------------------------------------------------------
+# 6. Build Stamp (DWH Version)
+# -------------------------------------------------------
+# Consumers that cache DWH-derived data (e.g. the simulator's context snapshot)
+# compare against this id and rebuild only when the warehouse was rebuilt.
+print("\n   [Build Stamp]")
+build_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+with engine.begin() as conn:
+    exec_sql(conn, """
+    DROP TABLE IF EXISTS dwh.build_info;
+    CREATE TABLE dwh.build_info (build_id TEXT PRIMARY KEY, built_at TIMESTAMP NOT NULL);
+    """, "build_info")
+    conn.execute(text("INSERT INTO dwh.build_info VALUES (:build_id, NOW())"), {'build_id': build_id})
+print(f"    ✅ DWH version: {build_id}")
+
 print("\n🎉 PHASE 2 COMPLETE: Data Warehouse Ready.")
\ No newline at end of file
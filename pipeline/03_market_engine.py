@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, text
-from sqlalchemy.types import Integer, String, Float, Numeric
+from sqlalchemy.types import Integer, SmallInteger, Float, Numeric
 import os
 import sys
 
@@ -13,6 +13,10 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 import db_config
+import bulk_writer
+import db_reader
+import drift_monitor
+import channel_dim
 
 engine = db_config.get_engine()
 
@@ -32,7 +36,7 @@ q_dates = """
     WHERE date BETWEEN '2016-09-01' AND '2018-10-31'
     ORDER BY date_id
 """
-df_timeline = pd.read_sql(q_dates, engine)
+df_timeline = db_reader.read_frame(q_dates, engine, narrow=('date_id', 'month'))
 df_timeline['date'] = pd.to_datetime(df_timeline['date'])
 
 def get_seasonality_factor(date):
@@ -158,10 +162,10 @@ for channel, params in channels_config.items():
     
     # Final Metrics Formatting
     df_ch['impressions'] = df_ch['raw_impressions'].astype(int)
-    df_ch['channel'] = channel
+    df_ch['channel_key'] = np.int16(channel_dim.KEYS[channel])  # dwh.dim_channel
     
     # Keep only relevant columns
-    cols = ['date_id', 'channel', 'spend', 'impressions', 'clicks', 'effective_ctr', 'ad_stock']
+    cols = ['date_id', 'channel_key', 'spend', 'impressions', 'clicks', 'effective_ctr', 'ad_stock']
     all_channel_data.append(df_ch[cols])
 
 # Combine all channels
@@ -175,7 +179,7 @@ print("   💾 Saving to 'dwh.fact_marketing_daily'...")
 # Schema Definition
 dtype_map = {
     'date_id': Integer(),
-    'channel': String(),
+    'channel_key': SmallInteger(),
     'spend': Numeric(10, 2),
     'impressions': Integer(),
     'clicks': Integer(),
@@ -188,7 +192,11 @@ df_marketing['spend'] = df_marketing['spend'].round(2)
 df_marketing['effective_ctr'] = df_marketing['effective_ctr'].round(4)
 df_marketing['ad_stock'] = df_marketing['ad_stock'].round(0)
 
-df_marketing.to_sql('fact_marketing_daily', engine, schema='dwh', if_exists='replace', index=False, dtype=dtype_map)
+bulk_writer.write_table(df_marketing, 'fact_marketing_daily', engine, schema='dwh', dtype=dtype_map,
+                        indexes=[('date_id', 'channel_key')])
 
 print(f"   ✅ Generated {len(df_marketing)} marketing records.")
+
+# Spend side of the rolling drift state (CAC lands in 05, see drift_monitor.py)
+drift_monitor.record(engine, spend=df_marketing.groupby('date_id')['spend'].sum())
 print("🎉 Phase 3 Complete.")
\ No newline at end of file
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, text
+from sqlalchemy.types import SmallInteger
 import os
 import sys
 
@@ -12,6 +13,9 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 import db_config
+import bulk_writer
+import db_reader
+import channel_dim
 
 engine = db_config.get_engine()
 SEED = 42
@@ -26,12 +30,12 @@ print("   📥 Loading Market Supply (Clicks) & Market Demand (Orders)...")
 
 # A. Supply: Marketing Activity (From Phase 3)
 q_mkt = """
-    SELECT date_id, channel, clicks, spend
+    SELECT date_id, channel_key, clicks, spend
     FROM dwh.fact_marketing_daily
     WHERE clicks > 0
     ORDER BY date_id
 """
-df_supply = pd.read_sql(q_mkt, engine)
+df_supply = db_reader.read_frame(q_mkt, engine, narrow=('date_id', 'channel_key', 'clicks'))
 
 # B. Demand: Real Orders (From Phase 1 & 2)
 q_demand = """
@@ -39,7 +43,7 @@ q_demand = """
     FROM dwh.fact_orders
     ORDER BY date_id, order_id
 """
-df_demand = pd.read_sql(q_demand, engine)
+df_demand = db_reader.read_frame(q_demand, engine, narrow=('date_id',))
 
 print(f"      -> Supply: {df_supply['clicks'].sum():,} Potential Clicks")
 print(f"      -> Demand: {len(df_demand):,} Real Orders")
@@ -51,12 +55,14 @@ print(f"      -> Demand: {len(df_demand):,} Real Orders")
 print("   ⚙️  Initializing Inventory System...")
 
 # Pivot table for fast lookup
-# Index: date_id, Columns: channels, Values: clicks
-inventory_df = df_supply.pivot(index='date_id', columns='channel', values='clicks').fillna(0)
+# Index: date_id, Columns: channel keys (dwh.dim_channel), Values: clicks
+inventory_df = df_supply.pivot(index='date_id', columns='channel_key', values='clicks').fillna(0)
 inventory_map = inventory_df.to_dict('index')
 
-# Channels list
-channels = list(inventory_df.columns)
+# Channels list, in channel NAME order: the weighted draw below indexes into
+# it, and the name order is what the pivot on channel names used to give,
+# so the same seed keeps attributing the same orders to the same channels
+channels = sorted(inventory_df.columns, key=lambda k: channel_dim.NAMES[k])
 
 # ==========================================
 # 3. ATTRIBUTION LOOP (Stateful Matching)
@@ -106,7 +112,7 @@ for current_date in all_dates:
     assigned_channels_today = []
     
     if total_available_clicks < 1:
-        assigned_channels_today = ['Direct/Organic'] * n_orders
+        assigned_channels_today = [channel_dim.DIRECT] * n_orders
         organic_count += n_orders
     
     else:
@@ -140,14 +146,14 @@ for current_date in all_dates:
                 paid_count += n_paid
             
             # Organic Part
-            assigned_channels_today.extend(['Direct/Organic'] * n_organic)
+            assigned_channels_today.extend([channel_dim.DIRECT] * n_organic)
             organic_count += n_organic
 
     # --- Step C: Register Results ---
     for i, order_id in enumerate(orders_today):
         attribution_results.append({
             'order_id': order_id,
-            'marketing_channel': assigned_channels_today[i]
+            'channel_key': assigned_channels_today[i]
         })
 
 # ==========================================
@@ -160,21 +166,27 @@ print("   💾 Updating 'dwh.fact_orders' with attribution data...")
 
 # Create Temp Table for Fast Update
 df_attr = pd.DataFrame(attribution_results)
-df_attr.to_sql('temp_attribution', engine, if_exists='replace', index=False)
+bulk_writer.write_table(df_attr, 'temp_attribution', engine, schema='public', dtype={'channel_key': SmallInteger()},
+                        indexes=[('order_id',)])
 
 with engine.begin() as conn:
-    # 1. Add Index to Temp Table
-    conn.execute(text("CREATE INDEX idx_temp_attr ON temp_attribution(order_id)"))
-    
-    # 2. Update Fact Table
+    # 0. Validation snapshots pinning fact_orders keep their rows (copy-on-write of the changed days)
+    bulk_writer.release_snapshot(conn, 'dwh.fact_orders', 'modify', partitions="""
+        SELECT DISTINCT f.date_id
+        FROM dwh.fact_orders f JOIN temp_attribution t ON f.order_id = t.order_id
+        WHERE f.channel_key IS DISTINCT FROM t.channel_key
+    """)
+
+    # 1. Update Fact Table (rows whose channel is unchanged are left alone)
     conn.execute(text("""
         UPDATE dwh.fact_orders f
-        SET marketing_channel = t.marketing_channel
+        SET channel_key = t.channel_key
         FROM temp_attribution t
         WHERE f.order_id = t.order_id
+          AND f.channel_key IS DISTINCT FROM t.channel_key
     """))
     
-    # 3. Clean up
+    # 2. Clean up
     conn.execute(text("DROP TABLE temp_attribution"))
 
 print("🎉 Phase 4 Complete: The Bridge is Built.")
@@ -1,10 +1,9 @@
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
-from sqlalchemy.types import Integer, String, Numeric, Float
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.types import Integer, SmallInteger, String, Numeric, Float
 import os
 import sys
-import zlib
 
 # ==========================================
 # 1. SETUP PATHS & DB CONNECTION
@@ -14,29 +13,94 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 import db_config
+import stable_hash
+import bulk_writer
+import db_reader
+import drift_monitor
+import geo_index
+import cohort_engine
+import channel_dim
 
 engine = db_config.get_engine()
 SEED = 42
 np.random.seed(SEED)
 
+# `--full` forces a rebuild of every date instead of only the changed ones
+FULL_REBUILD = '--full' in sys.argv
+
 print("🚀 Phase 5 (Final): Unified Financials with Real P&L & Wasted Spend...")
 
 # ==========================================
-# PART 1: DETERMINISTIC SELLER COMMISSIONS
+# PART 0: CHANGE TRACKING (date_id Partitions)
 # ==========================================
+print("   🔍 0. Detecting Changed Dates...")
+
+# Fingerprint of every input row that feeds a date's financials.
+# A date is recomputed only when its fingerprint differs from the last run.
+q_fingerprint = """
+    WITH mkt AS (
+        SELECT date_id,
+               md5(string_agg(concat_ws('|', channel_key, spend, clicks), ';' ORDER BY channel_key)) as h
+        FROM dwh.fact_marketing_daily
+        GROUP BY 1
+    ),
+    ord AS (
+        SELECT date_id,
+               md5(string_agg(concat_ws('|', order_id, order_item_id, seller_id, order_status,
+                                        channel_key, price, freight_value,
+                                        order_estimated_delivery_date, order_delivered_customer_date, distance_km),
+                              ';' ORDER BY order_id, order_item_id)) as h
+        FROM dwh.fact_orders
+        GROUP BY 1
+    )
+    SELECT COALESCE(m.date_id, o.date_id) as date_id,
+           md5(COALESCE(m.h, '') || COALESCE(o.h, '')) as input_hash
+    FROM mkt m
+    FULL OUTER JOIN ord o ON m.date_id = o.date_id
+"""
+df_state_new = pd.read_sql(q_fingerprint, engine)
 
-print("   🔒 1. Assigning Deterministic Commission Rates...")
+inspector = inspect(engine)
+targets_exist = all(
+    inspector.has_table(t, schema='dwh')
+    for t in ['fact_financials', 'fact_daily_pnl', 'fact_seller_subscriptions', 'etl_financials_state']
+)
+# Ledgers written before dwh.dim_channel (string channels) are rebuilt once
+if targets_exist:
+    with engine.connect() as conn:
+        targets_exist = channel_dim.has_key_column(conn, 'fact_financials')
+
+if FULL_REBUILD or not targets_exist:
+    IS_INCREMENTAL = False
+    changed_dates = set(df_state_new['date_id'])
+else:
+    IS_INCREMENTAL = True
+    df_state_old = pd.read_sql("SELECT date_id, input_hash FROM dwh.etl_financials_state", engine)
+    old_map = df_state_old.set_index('date_id')['input_hash'].to_dict()
+    new_map = df_state_new.set_index('date_id')['input_hash'].to_dict()
+    changed_dates = {d for d in new_map if old_map.get(d) != new_map[d]}
+    changed_dates |= set(old_map) - set(new_map)  # Dates that disappeared upstream
+
+date_ids = sorted(int(d) for d in changed_dates)
+date_params = {'date_ids': date_ids}
+
+print(f"      -> Mode: {'Incremental' if IS_INCREMENTAL else 'Full Rebuild'} | Dates to process: {len(date_ids):,}")
+
+if not date_ids:
+    print("🎉 DONE. No upstream changes detected, financial tables are up to date.")
+    sys.exit(0)
 
-def get_stable_commission(seller_id):
+# ==========================================
+# PART 1: DETERMINISTIC SELLER COMMISSIONS
+# ==========================================
 
-    val = zlib.adler32(seller_id.encode('utf-8'))
-    mod = val % 100
-    if mod < 20: return 0.10      # Enterprise / Top
-    elif mod < 80: return 0.15    # Standard
-    else: return 0.20             # Risky / New
+print("   🔒 1. Assigning Deterministic Commission Rates...")
 
-df_sellers = pd.read_sql("SELECT seller_id FROM dwh.dim_sellers", engine)
-df_sellers['comm_rate'] = df_sellers['seller_id'].apply(get_stable_commission)
+# Tier = adler32(seller_id) % 100 -> 10% / 15% / 20%, hashed once at DWH build (see stable_hash)
+df_sellers = pd.read_sql("SELECT seller_id, comm_rate FROM dwh.dim_sellers", engine)
+missing_rate = df_sellers['comm_rate'].isna()
+if missing_rate.any():
+    df_sellers.loc[missing_rate, 'comm_rate'] = stable_hash.commission_rate(df_sellers.loc[missing_rate, 'seller_id'])
 seller_rate_map = df_sellers.set_index('seller_id')['comm_rate'].to_dict()
 
 # ==========================================
@@ -45,11 +109,12 @@ seller_rate_map = df_sellers.set_index('seller_id')['comm_rate'].to_dict()
 print("   💸 2. Calculating Marketing Efficiency & Wasted Spend...")
 
 # 1. Total Spend per Day (Real Cash Out)
-df_daily_spend = pd.read_sql("""
+df_daily_spend = db_reader.read_frame("""
     SELECT date_id, SUM(spend) as total_marketing_spend
     FROM dwh.fact_marketing_daily
+    WHERE date_id = ANY(:date_ids)
     GROUP BY 1
-""", engine)
+""", engine, date_params, narrow=('date_id',))
 
 # 2. Attributed Spend (Effective CAC)
 
@@ -61,13 +126,15 @@ print("   📦 3. Processing Transactional Financials...")
 # A. Load Data
 q_ops = """
     SELECT 
-        o.order_id, o.date_id, o.marketing_channel, o.order_status,
+        o.order_id, o.date_id, o.channel_key, o.order_status,
         o.order_purchase_timestamp, o.order_estimated_delivery_date, o.order_delivered_customer_date,
-        i.seller_id, i.price, i.freight_value, i.order_item_id
+        i.seller_id, i.price, i.freight_value, i.order_item_id, o.distance_km
     FROM dwh.fact_orders o
     JOIN public.raw_order_items i ON o.order_id = i.order_id
+    WHERE o.date_id = ANY(:date_ids)
 """
-df_ops = pd.read_sql(q_ops, engine)
+df_ops = db_reader.read_frame(q_ops, engine, date_params, narrow=('date_id', 'channel_key', 'order_item_id'))
+df_ops['marketing_channel'] = channel_dim.from_keys(df_ops.pop('channel_key'))  # categorical, codes = dim_channel keys
 
 # B. Calculate Unit Metrics
 df_ops['order_purchase_timestamp'] = pd.to_datetime(df_ops['order_purchase_timestamp'])
@@ -78,41 +145,44 @@ df_ops['actual_days'] = (df_ops['order_delivered_customer_date'] - df_ops['order
 df_ops['estimated_days'] = (df_ops['order_estimated_delivery_date'] - df_ops['order_purchase_timestamp']).dt.days.fillna(0)
 
 # C. Calculate Unit CAC (Attributed Only)
-df_mkt_daily = pd.read_sql("SELECT date_id, channel, spend FROM dwh.fact_marketing_daily", engine)
-df_orders_daily = pd.read_sql("SELECT date_id, marketing_channel as channel, COUNT(order_id) as orders FROM dwh.fact_orders GROUP BY 1,2", engine)
+df_mkt_daily = db_reader.read_frame("SELECT date_id, channel_key, spend FROM dwh.fact_marketing_daily WHERE date_id = ANY(:date_ids)", engine, date_params,
+                                     narrow=('date_id', 'channel_key'))
+df_orders_daily = db_reader.read_frame("SELECT date_id, channel_key, COUNT(order_id) as orders FROM dwh.fact_orders WHERE date_id = ANY(:date_ids) GROUP BY 1,2", engine, date_params,
+                                        narrow=('date_id', 'channel_key', 'orders'))
 
-df_cac_calc = pd.merge(df_mkt_daily, df_orders_daily, on=['date_id', 'channel'], how='left').fillna(0)
+df_cac_calc = pd.merge(df_mkt_daily, df_orders_daily, on=['date_id', 'channel_key'], how='left').fillna(0)
 # CAC = Spend / Orders. If Orders=0, CAC is technically Infinite (Pure Waste).
 # We handle Pure Waste in the Daily P&L table, not here.
 df_cac_calc['unit_cac'] = np.where(df_cac_calc['orders'] > 0, df_cac_calc['spend'] / df_cac_calc['orders'], 0)
-cac_map = df_cac_calc.set_index(['date_id', 'channel'])['unit_cac'].to_dict()
 
 # Distribute CAC to items weighted by Price
-df_ord_gmv = df_ops.groupby('order_id')['price'].sum().reset_index().rename(columns={'price': 'total_gmv'})
+df_ord_gmv = df_ops.groupby('order_id', observed=True)['price'].sum().reset_index().rename(columns={'price': 'total_gmv'})
 df_ops = df_ops.merge(df_ord_gmv, on='order_id')
 df_ops['gmv_share'] = df_ops['price'] / df_ops['total_gmv']
 
-def get_allocated_cac(row):
-    # Direct/Organic is always 0
-    if row['marketing_channel'] == 'Direct/Organic': return 0.0
-    
-    # Get Unit CAC for the channel on that day
-    base_cac = cac_map.get((row['date_id'], row['marketing_channel']), 0.0)
-    return base_cac * row['gmv_share']
-
-df_ops['acquisition_cost'] = df_ops.apply(get_allocated_cac, axis=1)
+# Unit CAC of the item's (day, channel): one index lookup on the smallint keys.
+# Direct/Organic is always 0, as is a channel with no spend that day
+channel_keys = df_ops['marketing_channel'].cat.codes.to_numpy(dtype=np.int64)
+cac_index = pd.MultiIndex.from_arrays([df_cac_calc['date_id'].to_numpy(dtype=np.int64), df_cac_calc['channel_key'].to_numpy(dtype=np.int64)])
+cac_pos = cac_index.get_indexer(pd.MultiIndex.from_arrays([df_ops['date_id'].to_numpy(dtype=np.int64), channel_keys]))
+base_cac = np.where(cac_pos >= 0, df_cac_calc['unit_cac'].to_numpy(dtype=float)[cac_pos], 0.0)
+df_ops['acquisition_cost'] = np.where(channel_keys == channel_dim.DIRECT, 0.0, base_cac * df_ops['gmv_share'].to_numpy(dtype=float))
 
 # D. Financials
-df_ops['comm_rate'] = df_ops['seller_id'].map(seller_rate_map).fillna(0.15)
+df_ops['comm_rate'] = df_ops['seller_id'].map(seller_rate_map).astype(float).fillna(0.15)
 df_ops['commission_revenue'] = np.where(df_ops['order_status']=='delivered', df_ops['price'] * df_ops['comm_rate'], 0.0)
 
-# Logistics (Olist pays carrier cost + 10%, collects freight_value)
-df_ops['carrier_cost'] = df_ops['freight_value'] * 1.10
+# Logistics (Olist pays carrier cost + 10% + line haul per km, collects freight_value)
+# Distance: seller -> customer leg from the zip centroids (median leg of the whole
+# warehouse when unknown: the same fill for incremental and --full runs)
+df_ops['distance_km'] = geo_index.fill_missing(df_ops['distance_km'], fill=geo_index.known_median(engine))
+df_ops['carrier_cost'] = df_ops['freight_value'] * 1.10 + geo_index.line_haul(df_ops['distance_km'])
 df_ops['logistics_margin'] = df_ops['freight_value'] - df_ops['carrier_cost']
 df_ops['ops_cost'] = 1.50
 
-# Penalties
-is_late = (df_ops['actual_days'] > df_ops['estimated_days'] + 2) & (df_ops['order_status']=='delivered')
+# Penalties (long hauls get extra grace days)
+is_late = (df_ops['actual_days'] > df_ops['estimated_days'] + geo_index.sla_grace_days(df_ops['distance_km'])) \
+    & (df_ops['order_status']=='delivered')
 df_ops['sla_penalty'] = np.where(is_late, df_ops['freight_value'] * 0.5, 0.0)
 
 # Net Contribution (Unit Level)
@@ -162,10 +232,30 @@ df_pnl['net_profit_loss'] = (
 print("   💳 5. Calculating SaaS Revenue...")
 # ... (Same Logic as before, kept for completeness) ...
 df_ops['month_id'] = df_ops['order_purchase_timestamp'].dt.to_period('M')
-seller_monthly = df_ops.groupby(['seller_id', 'month_id'])['price'].sum().reset_index()
+seller_monthly = df_ops.groupby(['seller_id', 'month_id'], observed=True)['price'].sum().reset_index()
+
+# The rolling tier depends on a seller's whole history, so on incremental runs the
+# ledger is rebuilt for every seller touched by a changed date, re-using the stored
+# items of the untouched dates instead of reloading them.
+affected_sellers = set(df_ops['seller_id'])
+if IS_INCREMENTAL:
+    df_prev_sellers = pd.read_sql(text("SELECT DISTINCT seller_id FROM dwh.fact_financials WHERE date_id = ANY(:date_ids)"), engine, params=date_params)
+    affected_sellers |= set(df_prev_sellers['seller_id'])
+
+    df_hist = pd.read_sql(text("""
+        SELECT seller_id, date_id / 100 as month_key, SUM(price) as price
+        FROM dwh.fact_financials
+        WHERE seller_id = ANY(:seller_ids) AND NOT (date_id = ANY(:date_ids))
+        GROUP BY 1, 2
+    """), engine, params={**date_params, 'seller_ids': sorted(affected_sellers)})
+    df_hist['month_id'] = pd.to_datetime(df_hist['month_key'].astype(str), format='%Y%m').dt.to_period('M')
+
+    seller_monthly = pd.concat([seller_monthly, df_hist[['seller_id', 'month_id', 'price']]], ignore_index=True)
+    seller_monthly = seller_monthly.groupby(['seller_id', 'month_id'], observed=True)['price'].sum().reset_index()
+
 subs_ledger = []
-for seller_id, group in seller_monthly.groupby('seller_id'):
-    group = group.set_index('month_id').sort_index()
+for seller_id, group in seller_monthly.groupby('seller_id', observed=True):
+    group = group.set_index('month_id')[['price']].sort_index()
     full_range = pd.period_range(start=group.index.min(), end=group.index.max(), freq='M')
     group = group.reindex(full_range).fillna(0)
     group['rolling_gmv'] = group['price'].rolling(3, min_periods=1).mean()
@@ -175,22 +265,54 @@ for seller_id, group in seller_monthly.groupby('seller_id'):
         elif gmv > 2000: tier, fee = 'Pro', 199.90
         else: tier, fee = 'Basic', 49.90
         subs_ledger.append({'date_id': int(period.start_time.strftime('%Y%m01')), 'seller_id': seller_id, 'plan_type': tier, 'subscription_fee': fee})
-df_subs = pd.DataFrame(subs_ledger)
+df_subs = pd.DataFrame(subs_ledger, columns=['date_id', 'seller_id', 'plan_type', 'subscription_fee'])
 
 # ==========================================
-# PART 6: SAVE
+# PART 6: SAVE (Partition Replace)
 # ==========================================
 print("   💾 Saving Tables...")
 
-# 1. Fact Financials (Transaction Level - Unit Economics)
-cols_fin = ['order_id', 'seller_id', 'date_id', 'marketing_channel', 'price', 'acquisition_cost', 'commission_revenue', 'net_contribution']
-df_ops[cols_fin].round(2).to_sql('fact_financials', engine, schema='dwh', if_exists='replace', index=False, chunksize=5000)
+df_ops['channel_key'] = channel_dim.to_keys(df_ops['marketing_channel'])
+cols_fin = ['order_id', 'seller_id', 'date_id', 'channel_key', 'price', 'acquisition_cost', 'commission_revenue', 'net_contribution']
+seller_params = {'seller_ids': sorted(affected_sellers)}
+
+# (table, data, partition predicate, predicate params, indexes)
+outputs = [
+    # 1. Fact Financials (Transaction Level - Unit Economics)
+    ('fact_financials', df_ops[cols_fin].round(2), "date_id = ANY(:date_ids)", date_params, [('date_id',), ('order_id',)]),
+    # 2. Fact Daily P&L (Business Level - Includes Waste)
+    ('fact_daily_pnl', df_pnl.round(2), "date_id = ANY(:date_ids)", date_params, [('date_id',)]),
+    # 3. Subscriptions (partitioned by seller, see PART 5)
+    ('fact_seller_subscriptions', df_subs, "seller_id = ANY(:seller_ids)", seller_params, [('seller_id',), ('date_id',)]),
+    # 4. Change Tracking State
+    ('etl_financials_state', df_state_new[df_state_new['date_id'].isin(changed_dates)], "date_id = ANY(:date_ids)", date_params, [('date_id',)]),
+]
+dtype_map = {'date_id': Integer(), 'channel_key': SmallInteger()}
+
+# One transaction: readers never see a date half-replaced
+with engine.begin() as conn:
+    for table, df_out, predicate, params, indexes in outputs:
+        if IS_INCREMENTAL:
+            bulk_writer.replace_partitions(df_out, table, conn, predicate, params, schema='dwh', dtype=dtype_map)
+        else:
+            bulk_writer.write_table(df_out, table, conn, schema='dwh', dtype=dtype_map, indexes=indexes)
+
+print(f"   ✅ Replaced {len(date_ids):,} date partitions ({len(df_ops):,} financial rows).")
 
-# 2. Fact Daily P&L (Business Level - Includes Waste)
-# This is the NEW table for CFO view
-df_pnl.round(2).to_sql('fact_daily_pnl', engine, schema='dwh', if_exists='replace', index=False)
+# ==========================================
+# PART 7: DRIFT STATE (Spend vs CAC)
+# ==========================================
+# Only the processed dates (and their 7-day neighbours) are touched, see drift_monitor.py
+print("   📉 7. Updating Rolling Drift State...")
+spend_by_day = df_daily_spend.set_index('date_id')['total_marketing_spend'].reindex(date_ids, fill_value=0.0)
+cac_by_day = df_ops['acquisition_cost'].round(2).groupby(df_ops['date_id']).sum().reindex(date_ids, fill_value=0.0)
+drift_monitor.record(engine, spend=spend_by_day, cost=cac_by_day)
 
-# 3. Subscriptions
-df_subs.to_sql('fact_seller_subscriptions', engine, schema='dwh', if_exists='replace', index=False)
+# ==========================================
+# PART 8: CUSTOMER COHORTS (LTV / CAC)
+# ==========================================
+# Months after the last processed one are appended; a changed processed month rebuilds, see cohort_engine.py
+print("   👥 8. Updating Customer Cohorts...")
+cohort_engine.update(engine, months=sorted({d // 100 for d in date_ids}), rebuild_all=not IS_INCREMENTAL)
 
-print("🎉 DONE. Check 'fact_daily_pnl' for Wasted Spend analysis.")
\ No newline at end of file
+print("🎉 DONE. Check 'fact_daily_pnl' for Wasted Spend analysis.")
@@ -8,6 +8,7 @@ from pathlib import Path
 # CONFIGURATION
 # ==========================================
 PIPELINE_FOLDER = "pipeline" 
+VALIDATION_FOLDER = "Validation_engine"
 
 PIPELINE = [
     "01_setup_infrastructure.py",
@@ -17,7 +18,7 @@ PIPELINE = [
     "05_unified_financials.py"
 ]
 
-def run_script(script_name):
+def run_script(script_name, folder=PIPELINE_FOLDER, args=()):
     print(f"\n{'='*70}")
     print(f"▶️  EXECUTING: {script_name}")
     print(f"{'='*70}")
@@ -25,7 +26,7 @@ def run_script(script_name):
     start_time = time.time()
     
     base_path = os.path.dirname(os.path.abspath(__file__))
-    script_path = os.path.join(base_path, PIPELINE_FOLDER, script_name)
+    script_path = os.path.join(base_path, folder, script_name)
     
     if not os.path.exists(script_path):
         print(f"❌ ERROR: File not found: {script_path}")
@@ -34,7 +35,7 @@ def run_script(script_name):
     try:
 
         result = subprocess.run(
-            [sys.executable, "-u", script_path], 
+            [sys.executable, "-u", script_path, *args], 
             check=True,
         )
         
@@ -117,6 +118,13 @@ def main():
     else:
         print(f"\n⚠️  WARNING: Notebook path '{notebook_path}' not found. Skipping.")
 
+    # Phase 3 (optional): Validation suites as parallel checks -> Validation_engine/validation_report.json
+    if '--validate' in sys.argv:
+        validation_args = ['--fail-fast'] if '--fail-fast' in sys.argv else []
+        if not run_script("validation_runner.py", VALIDATION_FOLDER, validation_args):
+            print("\n⛔ VALIDATION FAILED. See Validation_engine/validation_report.json")
+            sys.exit(1)
+
     print(f"\n PIPELINE COMPLETED SUCCESSFULLY.")
     print(f"  Total Time: {time.time() - total_start:.2f}s")
     print("\nNEXT STEP:")
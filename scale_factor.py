@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# SCALE-FACTOR DEMAND UP-SAMPLING
+# ==========================================
+# Builds an N x Olist dataset from the base CSVs in data/ and (optionally) runs
+# the pipeline stages + simulator on it, reporting wall time and peak memory
+# per stage per scale factor.
+#
+# Replica k (k = 1..N-1) of the base set is a copy of every order / item /
+# customer / seller / payment / review with:
+#   - IDs re-tagged (last 8 hex chars = k), so replicas never collide
+#   - each order's purchase time-of-day re-sampled from the base distribution
+#     (same calendar day -> daily volume curve x N), other order timestamps
+#     and the order's items' shipping_limit_date shifted by the same delta
+# Sellers are replicated too, so the orders-per-seller distribution is kept
+# and the seller count grows N x. Products, categories and geolocation are shared.
+# Replicas are generated and streamed one at a time (memory ~ 1 x base).
+#
+# Usage:
+#   OLIST_DB_NAME=olist_sf10 python scale_factor.py --sf 10 --to db --run-stages
+#   python scale_factor.py --sf 10 --to files --out data_sf10
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+DATA_FOLDER = os.path.join(current_dir, "data")
+
+# table -> (csv file, id columns re-tagged per replica)
+SCALED_TABLES = {
+    'raw_orders':      ('olist_orders_dataset.csv', ['order_id', 'customer_id']),
+    'raw_order_items': ('olist_order_items_dataset.csv', ['order_id', 'seller_id']),
+    'raw_customers':   ('olist_customers_dataset.csv', ['customer_id', 'customer_unique_id']),
+    'raw_sellers':     ('olist_sellers_dataset.csv', ['seller_id']),
+    'raw_payments':    ('olist_order_payments_dataset.csv', ['order_id']),
+    'raw_reviews':     ('olist_order_reviews_dataset.csv', ['review_id', 'order_id']),
+}
+SHARED_TABLES = {
+    'raw_products':             'olist_products_dataset.csv',
+    'raw_geolocation':          'olist_geolocation_dataset.csv',
+    'raw_category_translation': 'product_category_name_translation.csv',
+}
+ORDER_TS_COLUMNS = ['order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+                    'order_delivered_customer_date', 'order_estimated_delivery_date']
+ITEM_TS_COLUMNS = ['shipping_limit_date']
+
+STAGES = [
+    ('02_build_dwh_schema', [os.path.join('pipeline', '02_build_dwh_schema.py')]),
+    ('03_market_engine', [os.path.join('pipeline', '03_market_engine.py')]),
+    ('04_attribution_bridge', [os.path.join('pipeline', '04_attribution_bridge.py')]),
+    ('05_unified_financials', [os.path.join('pipeline', '05_unified_financials.py'), '--full']),
+    ('simulator', [os.path.join('generator_app', 'training_engine.py'), '--no-dwh']),
+]
+
+# ==========================================
+# REPLICA GENERATION
+# ==========================================
+
+def _tag(ids, k):
+    # Keep the 32-char hex shape: 24-char prefix + replica number in hex
+    return np.char.add(ids.astype(str).to_numpy().astype('U24'), f"{k:08x}")
+
+def _purchase_shift(orders, k, seed):
+    # Re-sample time-of-day from the base orders; the calendar day is kept
+    rng = np.random.default_rng([seed, k])
+    ts = pd.to_datetime(orders['order_purchase_timestamp'], errors='coerce')
+    tod = (ts - ts.dt.normalize()).dropna().to_numpy()
+    if len(tod) == 0:
+        return pd.Series(pd.Timedelta(0), index=orders.index)
+    new_tod = tod[rng.integers(0, len(tod), len(orders))]
+    return pd.Series(ts.dt.normalize().to_numpy() + new_tod, index=orders.index) - ts
+
+def _shift_columns(out, columns, shift):
+    for col in columns:
+        if col in out.columns:
+            ts = pd.to_datetime(out[col], errors='coerce') + shift
+            out[col] = ts.dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def replicate(df, table, k, seed=7, orders=None):
+    # orders: base raw_orders, needed for raw_order_items (items move with their order)
+    if k == 0:
+        return df
+    out = df.copy()
+    if table == 'raw_orders':
+        _shift_columns(out, ORDER_TS_COLUMNS, _purchase_shift(out, k, seed))
+    elif table == 'raw_order_items' and orders is not None:
+        shift = _purchase_shift(orders, k, seed).set_axis(orders['order_id'])
+        _shift_columns(out, ITEM_TS_COLUMNS, out['order_id'].map(shift).fillna(pd.Timedelta(0)).to_numpy())
+    for col in SCALED_TABLES[table][1]:
+        out[col] = _tag(out[col], k)
+    return out
+
+def iter_replicas(df, table, sf, seed=7, orders=None):
+    for k in range(sf):
+        yield replicate(df, table, k, seed, orders)
+
+def load_base(data_folder=DATA_FOLDER):
+    base = {}
+    for table, (csv_file, _) in SCALED_TABLES.items():
+        base[table] = pd.read_csv(os.path.join(data_folder, csv_file))
+    for table, csv_file in SHARED_TABLES.items():
+        base[table] = pd.read_csv(os.path.join(data_folder, csv_file))
+    return base
+
+# ==========================================
+# SINKS
+# ==========================================
+
+def write_db(base, sf, seed=7):
+    import db_config
+    import bulk_writer
+    if db_config.ensure_database():
+        print(f"    ✅ Database '{db_config.DB_CONFIG['db']}' created.")
+    engine = db_config.get_engine()
+    for table, df in base.items():
+        frames = iter_replicas(df, table, sf, seed, base['raw_orders']) if table in SCALED_TABLES else [df]
+        bulk_writer.write_table(frames, table, engine, schema='public')
+
+def write_files(base, sf, out_folder, seed=7):
+    os.makedirs(out_folder, exist_ok=True)
+    files = {**{t: f for t, (f, _) in SCALED_TABLES.items()}, **SHARED_TABLES}
+    for table, df in base.items():
+        path = os.path.join(out_folder, files[table])
+        started = time.time()
+        rows = 0
+        frames = iter_replicas(df, table, sf, seed, base['raw_orders']) if table in SCALED_TABLES else [df]
+        for i, part in enumerate(frames):
+            part.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+            rows += len(part)
+        print(f"      -> 💾 {files[table]}: {rows:,} rows in {time.time() - started:.2f}s")
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+
+PROC_STATUS = "/proc/self/status"
+
+# Child bootstrap: run the stage script, then record its own peak RSS (VmHWM).
+# ru_maxrss from wait4 is useless on Linux here, it inherits the parent's peak across fork/exec.
+CHILD_BOOTSTRAP = """
+import atexit, os, runpy, sys
+def _dump_peak():
+    with open('/proc/self/status') as f:
+        hwm = [l.split()[1] for l in f if l.startswith('VmHWM')]
+    with open(os.environ['OLIST_PEAK_FILE'], 'w') as out:
+        out.write(hwm[0] if hwm else '')
+atexit.register(_dump_peak)
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+def _peak_rss_mb():
+    # VmHWM (KiB) of this process; None where /proc is unavailable
+    try:
+        with open(PROC_STATUS) as f:
+            for line in f:
+                if line.startswith('VmHWM'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    # Linux >= 4.0: writing 5 to clear_refs resets VmHWM, so each stage gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def measure(label, fn):
+    _reset_peak_rss()
+    started = time.perf_counter()
+    ok = True
+    try:
+        fn()
+    except Exception as e:
+        print(f"   ❌ {label}: {e}")
+        ok = False
+    return {'stage': label, 'ok': ok, 'seconds': time.perf_counter() - started, 'max_rss_mb': _peak_rss_mb()}
+
+def run_stage(label, args, cwd):
+    print(f"\n▶️  {label}")
+    peak_file = os.path.join(cwd, f".peak_{label}")
+    rows_file = os.path.join(cwd, f".rows_{label}")
+    started = time.perf_counter()
+    if os.path.exists(PROC_STATUS):
+        cmd = [sys.executable, "-u", "-c", CHILD_BOOTSTRAP, os.path.join(current_dir, args[0]), *args[1:]]
+    else:
+        cmd = [sys.executable, "-u", os.path.join(current_dir, args[0]), *args[1:]]
+    result = subprocess.run(cmd, cwd=cwd, env={**os.environ, 'OLIST_PEAK_FILE': peak_file, 'OLIST_ROWS_FILE': rows_file})
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if os.path.exists(peak_file):
+        with open(peak_file) as f:
+            raw = f.read().strip()
+        os.remove(peak_file)
+        peak = round(int(raw) / 1024, 1) if raw else None
+
+    # Rows per table the stage wrote through bulk_writer (a table written twice keeps its last count)
+    written = {}
+    if os.path.exists(rows_file):
+        with open(rows_file) as f:
+            for line in f:
+                table, rows = line.rstrip('\n').split('\t')
+                written[table] = int(rows)
+        os.remove(rows_file)
+    return {'stage': label, 'ok': result.returncode == 0, 'seconds': elapsed, 'max_rss_mb': peak, 'written': written}
+
+# ==========================================
+# MAIN
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Up-sample Olist to N x volume and profile the engines on it.")
+    parser.add_argument("--sf", nargs="+", type=int, required=True, help="Scale factor(s), e.g. 1 10 100")
+    parser.add_argument("--to", choices=["db", "files"], default="db")
+    parser.add_argument("--out", default=None,
+                        help="Output folder for --to files (default data_sf<N>; <out>_sf<N> with several --sf)")
+    parser.add_argument("--data", default=DATA_FOLDER, help="Folder with the base Olist CSVs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--run-stages", action="store_true", help="Run 02-05 + simulator after loading (--to db)")
+    parser.add_argument("--force", action="store_true", help="Allow overwriting the default database")
+    parser.add_argument("--report", default="scale_report.json")
+    args = parser.parse_args()
+
+    if args.to == "db" and not args.force and os.environ.get("OLIST_DB_NAME") in (None, "", "olist_engine_db"):
+        print("⛔ Refusing to overwrite the main database. Set OLIST_DB_NAME to a scratch DB (or pass --force).")
+        sys.exit(1)
+
+    print("📥 Loading base Olist CSVs...")
+    base = load_base(args.data)
+    print(f"   -> {len(base['raw_orders']):,} orders / {len(base['raw_order_items']):,} items / "
+          f"{len(base['raw_sellers']):,} sellers / {len(base['raw_customers']):,} customers")
+
+    report = []
+    for sf in args.sf:
+        print(f"\n{'=' * 70}\n📈 SCALE FACTOR {sf}x\n{'=' * 70}")
+        if args.to == "db":
+            rows = [measure("generate_to_db", lambda: write_db(base, sf, args.seed))]
+            if args.run_stages:
+                sim_dir = os.path.join(current_dir, "Training_Output", f"scale_sf{sf}")
+                os.makedirs(sim_dir, exist_ok=True)
+                for label, stage_args in STAGES:
+                    rows.append(run_stage(label, stage_args, cwd=sim_dir if label == 'simulator' else current_dir))
+                    if not rows[-1]['ok']:
+                        break
+        else:
+            if args.out is None:
+                out = os.path.join(current_dir, f"data_sf{sf}")
+            else:
+                out = f"{args.out}_sf{sf}" if len(args.sf) > 1 else args.out  # one folder per scale factor
+            rows = [measure("generate_to_files", lambda: write_files(base, sf, out, args.seed))]
+            rows[0]['out'] = out
+
+        for row in rows:
+            row.update({'scale_factor': sf, 'orders': len(base['raw_orders']) * sf})
+        report.extend(rows)
+
+    print(f"\n📊 {'SF':>4} | {'stage':<24} | {'seconds':>9} | {'peak RSS MB':>11} | ok")
+    for row in report:
+        rss = '-' if row['max_rss_mb'] is None else f"{row['max_rss_mb']:,.1f}"
+        print(f"   {row['scale_factor']:>4} | {row['stage']:<24} | {row['seconds']:>9.2f} | {rss:>11} | {'✅' if row['ok'] else '❌'}")
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Report: {args.report}")
+
+if __name__ == "__main__":
+    main()
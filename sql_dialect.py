@@ -0,0 +1,80 @@
+import re
+
+# ==========================================
+# SQL DIALECT SHIMS (POSTGRES -> DUCKDB)
+# ==========================================
+# The stages are written in Postgres SQL. On the embedded backend
+# (db_config.BACKEND == 'duckdb') every statement passes through translate()
+# right before it reaches the driver, so 01-05 and the simulator run unchanged.
+# DuckDB already speaks most of that SQL: ::TIMESTAMP / ::INT / NULL::DECIMAL
+# casts, UPDATE ... FROM, string_agg(... ORDER BY), md5, NOW() and
+# `= ANY(:list)` pass through as they are. What it lacks is rewritten here:
+#   TO_CHAR(ts, 'YYYYMMDD')  ->  strftime(ts, '%Y%m%d')
+# Schemas: Postgres has `public` on the search_path, DuckDB only `main`.
+# Integer `/` truncates in Postgres (date_id / 100 -> month); DuckDB is switched
+# to the same semantics on connect.
+
+# Postgres TO_CHAR template patterns -> strftime codes
+TO_CHAR_PATTERNS = {
+    'YYYY': '%Y', 'HH24': '%H', 'MM': '%m', 'DD': '%d', 'MI': '%M', 'SS': '%S',
+}
+_PATTERN = re.compile('|'.join(sorted(TO_CHAR_PATTERNS, key=len, reverse=True)))
+_TO_CHAR = re.compile(r'\bTO_CHAR\s*\(', re.IGNORECASE)
+
+def _closing_paren(sql, start):
+    # Index of the ')' closing the '(' just before `start`, and of its last top-level comma
+    depth, comma, i = 1, None, start
+    while i < len(sql):
+        ch = sql[i]
+        if ch == "'":
+            i = sql.index("'", i + 1)  # skip string literals ('' escapes re-enter here)
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                return i, comma
+        elif ch == ',' and depth == 1:
+            comma = i
+        i += 1
+    raise ValueError(f"Unbalanced TO_CHAR( in: {sql[:200]}")
+
+def _to_char(sql):
+    out, pos = [], 0
+    for m in _TO_CHAR.finditer(sql):
+        if m.start() < pos:
+            continue  # nested TO_CHAR: already rewritten with its parent
+        end, comma = _closing_paren(sql, m.end())
+        fmt = sql[comma + 1:end].strip() if comma else ''
+        if not (fmt.startswith("'") and fmt.endswith("'")):
+            continue  # numeric / dynamic templates have no strftime equivalent: leave for the engine to report
+        expr = _to_char(sql[m.end():comma])
+        out.append(sql[pos:m.start()])
+        out.append(f"strftime({expr.strip()}, '{_PATTERN.sub(lambda p: TO_CHAR_PATTERNS[p.group()], fmt[1:-1])}')")
+        pos = end + 1
+    out.append(sql[pos:])
+    return ''.join(out)
+
+def translate(sql):
+    # Postgres statement -> DuckDB statement (unchanged when nothing needs a shim)
+    if 'to_char' in sql.lower():
+        sql = _to_char(sql)
+    return sql
+
+def install(engine):
+    # Hooks an embedded engine: schemas / search_path on connect, translate() on execute
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("CREATE SCHEMA IF NOT EXISTS public")
+        cursor.execute("SET search_path = 'public,main'")  # unqualified names resolve as in Postgres
+        cursor.execute("SET integer_division = true")
+        cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _translate(conn, cursor, statement, parameters, context, executemany):
+        return translate(statement), parameters
+
+    return engine
@@ -0,0 +1,67 @@
+import numpy as np
+
+# ==========================================
+# VECTORIZED DETERMINISTIC HASHING
+# ==========================================
+# Column-at-a-time versions of zlib.adler32 / zlib.crc32.
+# Bit-for-bit identical to zlib for UTF-8 encoded strings, but computed over
+# whole string columns with NumPy instead of one Python call per row.
+
+ADLER_MOD = 65521
+
+def _build_crc_table():
+    table = np.arange(256, dtype=np.uint32)
+    for _ in range(8):
+        table = np.where(table & 1, (table >> 1) ^ np.uint32(0xEDB88320), table >> 1).astype(np.uint32)
+    return table
+
+CRC_TABLE = _build_crc_table()
+
+def _to_byte_matrix(values):
+    # Strings -> (n_rows, max_len) uint8 matrix, zero padded, plus true lengths
+    text = np.asarray(values, dtype=object).astype(str)
+    if len(text) == 0:
+        return np.zeros((0, 1), dtype=np.uint8), np.zeros(0, dtype=np.int64)
+    codepoints = text.view(np.uint32).reshape(len(text), -1)
+
+    # Fast path: pure ASCII (all Olist ids) -> code points are already the UTF-8 bytes
+    if codepoints.max() < 128:
+        return codepoints.astype(np.uint8), np.char.str_len(text).astype(np.int64)
+
+    encoded = np.char.encode(text, 'utf-8')
+    width = max(encoded.dtype.itemsize, 1)
+    matrix = np.frombuffer(encoded.astype(f'S{width}').tobytes(), dtype=np.uint8).reshape(len(encoded), width)
+    lengths = np.char.str_len(encoded).astype(np.int64)
+    return matrix, lengths
+
+def adler32(values):
+    matrix, lengths = _to_byte_matrix(values)
+    data = matrix.astype(np.int64)
+
+    # a = 1 + sum(d_i) ; b = n + sum((n - i) * d_i) = n + n * sum(d_i) - sum(i * d_i)
+    # (padding bytes are 0, so they drop out of every sum)
+    byte_sum = data.sum(axis=1)
+    weighted = data @ np.arange(matrix.shape[1], dtype=np.int64)
+    a = (1 + byte_sum) % ADLER_MOD
+    b = (lengths + lengths * byte_sum - weighted) % ADLER_MOD
+    return ((b << 16) | a).astype(np.uint32)
+
+def crc32(values):
+    matrix, lengths = _to_byte_matrix(values)
+    crc = np.full(len(matrix), 0xFFFFFFFF, dtype=np.uint32)
+
+    # Byte-serial, row-parallel: one table lookup per column position
+    uniform = bool((lengths == matrix.shape[1]).all())
+    for i in range(matrix.shape[1]):
+        nxt = CRC_TABLE[(crc ^ matrix[:, i]) & 0xFF] ^ (crc >> 8)
+        crc = nxt if uniform else np.where(lengths > i, nxt, crc)
+    return crc ^ np.uint32(0xFFFFFFFF)
+
+# ==========================================
+# BUSINESS DERIVATIONS
+# ==========================================
+
+def commission_rate(seller_ids):
+    # Stable seller tier from adler32(seller_id) % 100
+    mod = adler32(seller_ids) % 100
+    return np.select([mod < 20, mod < 80], [0.10, 0.15], default=0.20)  # Enterprise / Standard / Risky
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import cohort_engine
+
+SPLIT_MONTH = 201807
+
+def _orders(seed=7, n=4000):
+    # Order grain as _load_orders returns it on DuckDB: INTEGER date_id -> int32, SMALLINT channel_key -> int16
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2017-01-01', '2018-08-31').strftime('%Y%m%d').astype(int).to_numpy()
+    return pd.DataFrame({
+        'order_id': [f"o{i:05d}" for i in range(n)],
+        'date_id': rng.choice(days, n).astype(np.int32),
+        'channel_key': rng.integers(1, 7, n).astype(np.int16),
+        'customer_unique_id': [f"c{k:04d}" for k in rng.integers(0, 1500, n)],
+        'revenue': rng.uniform(5, 50, n),
+        'contribution': rng.uniform(-5, 20, n),
+        'marketing_cost': rng.uniform(0, 8, n),
+    })
+
+def _keyed(orders):
+    # customer_key / ids as _load_orders builds them
+    keys, ids = pd.factorize(orders['customer_unique_id'], sort=False)
+    return orders.assign(customer_key=keys.astype(np.int32)).reset_index(drop=True), np.asarray(ids, dtype=object)
+
+def _stored(df):
+    # pd.read_sql hands integer columns back as int64
+    return df.astype({c: np.int64 for c in df.columns if df[c].dtype.kind in 'iu'})
+
+def _prior(state, cells):
+    # The cohort sizes / running totals append() reads back
+    sizes = state.groupby(['cohort_month', 'channel_key']).size().rename('cohort_size')
+    totals = cells.groupby(['cohort_month', 'channel_key'])[['contribution', 'marketing_cost']].sum()
+    totals.columns = ['prior_contribution', 'prior_marketing']
+    return _stored(sizes.to_frame().join(totals).fillna(0).reset_index())
+
+def test_append_equals_rebuild():
+    orders = _orders()
+    full_cells, full_state = cohort_engine.build(*_keyed(orders))
+
+    old = orders['date_id'] < SPLIT_MONTH * 100
+    old_cells, old_state = cohort_engine.build(*_keyed(orders[old]))
+    old_cells, old_state = _stored(old_cells), _stored(old_state)
+
+    batch, ids = _keyed(orders[~old])
+    known = old_state[old_state['customer_unique_id'].isin(ids)]
+    new_cells, new_state = cohort_engine.extend(batch, ids, known, _prior(old_state, old_cells))
+
+    cell_key = ['cohort_month', 'channel_key', 'activity_month']
+    cells = pd.concat([old_cells, _stored(new_cells)]).sort_values(cell_key).reset_index(drop=True)
+    expected = _stored(full_cells).sort_values(cell_key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(cells[expected.columns], expected, check_exact=False, atol=1e-6)
+
+    state = pd.concat([old_state[~old_state['customer_unique_id'].isin(ids)], _stored(new_state)])
+    state = state.sort_values('customer_unique_id').reset_index(drop=True)
+    expected = _stored(full_state).sort_values('customer_unique_id').reset_index(drop=True)
+    pd.testing.assert_frame_equal(state, expected)
@@ -0,0 +1,73 @@
+import os
+import sys
+import textwrap
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'generator_app'))
+import job_queue
+
+# Stand-in for training_engine, imported by the spawned workers (they start with
+# the parent's sys.path, where it is put first). data_quality='stuck' never
+# leaves load_context and logs continuously, so it can only be cancelled by terminate().
+FAKE_ENGINE = '''
+import time
+import types
+
+engine = None
+context_snapshot = types.SimpleNamespace(load_or_build=lambda engine: ('fake', {}))
+
+class OlistMasterEngineV5:
+    def __init__(self, difficulty, output_folder, data_quality=None, seed=None):
+        self.stuck = data_quality == 'stuck'
+        self.df_order_headers = self.df_marketing = self.df_processed = self.df_final_orders = [0] * 3
+
+    def load_context(self):
+        while self.stuck:
+            print("x" * 2000)
+
+    def _work(self):
+        for i in range(300):
+            print(f"line {i}")
+            time.sleep(0.005)
+
+    simulate_marketing = run_attribution_engine = calculate_financials = _work
+
+    def export(self, update_dwh=False):
+        pass
+
+    def publish_dwh(self):
+        pass
+'''
+
+def test_terminated_job_does_not_stall_the_others(tmp_path, monkeypatch):
+    (tmp_path / 'training_engine.py').write_text(textwrap.dedent(FAKE_ENGINE))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(job_queue, 'CANCEL_GRACE_SEC', 0.5)
+    jobs = job_queue.JobQueue(max_workers=2, output_root=str(tmp_path / 'out'))
+    try:
+        stuck = jobs.submit('stuck', 'Easy', 'stuck')
+        healthy = jobs.submit('healthy', 'Easy', 'clean')
+        logs_after_kill = 0
+        deadline = time.time() + 60
+        while time.time() < deadline and not (jobs.jobs[healthy]['status'] in ('done', 'failed')
+                                              and jobs.jobs[stuck]['status'] == 'cancelled'):
+            if jobs.jobs[stuck]['cancel_at'] is None and jobs.jobs[stuck]['label'] == 'Loading world context':
+                jobs.cancel(stuck)  # mid-phase, while it floods its pipe
+            for ev in jobs.poll():
+                if ev['job'] == healthy and ev['type'] == 'log' and jobs.jobs[stuck]['status'] == 'cancelled':
+                    logs_after_kill += 1
+            time.sleep(0.01)
+        assert jobs.jobs[stuck]['status'] == 'cancelled'
+        assert jobs.jobs[stuck]['label'] == 'Cancelled (terminated)'
+        assert jobs.jobs[healthy]['status'] == 'done'
+        assert logs_after_kill > 0
+
+        # Later jobs still get through
+        later = jobs.submit('later', 'Easy', 'clean')
+        deadline = time.time() + 60
+        while jobs.jobs[later]['status'] != 'done' and time.time() < deadline:
+            jobs.poll()
+            time.sleep(0.01)
+        assert jobs.jobs[later]['status'] == 'done'
+    finally:
+        jobs.shutdown()
@@ -0,0 +1,28 @@
+import os
+import sys
+import textwrap
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Validation_engine'))
+from validation_runner import SETUP_FILES, SNAPSHOT_FILE, split_statements
+
+def test_split_skips_separators_psql_skips():
+    sql = textwrap.dedent("""
+        \\ir rollups.sql
+        -- one row per day; per channel
+        SELECT 'a;b', E'it\\'s; x', "odd;name" FROM t /* block; /* nested; */ comment */;
+        CREATE FUNCTION f() RETURNS INT AS $$ BEGIN RETURN 1; END $$ LANGUAGE plpgsql;
+        SELECT 'it''s; fine'
+    """)
+    assert split_statements(sql) == [
+        """SELECT 'a;b', E'it\\'s; x', "odd;name" FROM t""",
+        "CREATE FUNCTION f() RETURNS INT AS $$ BEGIN RETURN 1; END $$ LANGUAGE plpgsql",
+        "SELECT 'it''s; fine'",
+    ]
+
+def test_suites_split_into_whole_statements():
+    # Every statement of the shipped suites starts with a SQL keyword (no fragment of a cut one)
+    keywords = ('CREATE', 'DROP', 'SELECT', 'INSERT', 'DO', 'REFRESH', 'ANALYZE', 'WITH', '(')
+    for path in [SNAPSHOT_FILE, *SETUP_FILES]:
+        with open(path, encoding="utf-8") as f:
+            for stmt in split_statements(f.read()):
+                assert stmt.upper().startswith(keywords), f"{os.path.basename(path)}: {stmt[:60]}"